@@ -0,0 +1,470 @@
+import collections
+import random
+import sys
+import time
+
+import numpy as np
+
+from convert_to_numbers import MISSING_DATA_VALUES, convert_to_number
+
+# Largest magnitude that still fits an int64 after truncation
+INT64_LIMIT = 2.0 ** 63
+
+# Cells converted per slice of a large block
+BLOCK_CHUNK_CELLS = 1 << 17
+
+# Ints below this magnitude survive str() and float() unchanged
+EXACT_INT_LIMIT = 2.0 ** 53
+
+# Strings up to this many characters are tried on the digit fast path
+FAST_TEXT_CHARS = 24
+
+# Digits a fast-path string may hold: int(float(text)) is exact up to 15
+FAST_TEXT_DIGITS = 15
+
+# Longest string the code buffer takes: its character counts are 8-bit fields
+BUFFER_TEXT_CHARS = 255
+
+# Per-character counts packed into one uint32, so a single reduceat gives
+# every string its digit, point, comma and other-character counts; spaces
+# (anything str.isspace matches) and the NUL separator count as nothing
+DIGIT_COUNT, POINT_COUNT, COMMA_COUNT, OTHER_COUNT = 1, 1 << 8, 1 << 16, 1 << 24
+CHAR_COUNTS = np.array([DIGIT_COUNT if ord("0") <= code <= ord("9")
+                        else POINT_COUNT if chr(code) == "."
+                        else COMMA_COUNT if chr(code) == ","
+                        else 0 if chr(code).isspace() or code == 0
+                        else OTHER_COUNT for code in range(256)], dtype=np.uint32)
+IS_SPACE = np.array([chr(code).isspace() for code in range(256)], dtype=bool)
+
+# Multiplying packed counts by this adds the four fields up in the top one
+FIELD_SUM = np.uint32(0x01010101)
+
+# Missing tokens after strip(), as little-endian code keys; the empty token
+# is a string of spaces only
+MISSING_KEYS = np.array(sorted({sum(ord(char) << (8 * slot) for slot, char in enumerate(value.strip()))
+                                for value in MISSING_DATA_VALUES if value.strip()}), dtype=np.int64)
+MISSING_KEY_CHARS = max(len(value.strip()) for value in MISSING_DATA_VALUES)
+
+POWERS_OF_TEN = 10 ** np.arange(FAST_TEXT_DIGITS + 1, dtype=np.int64)
+
+# Type classes used by the first pass; unknown types fall back to the scalar reference
+KIND_NONE, KIND_STR, KIND_FLOAT, KIND_INT, KIND_OTHER = 0, 1, 2, 3, 4
+KIND_BY_TYPE = collections.defaultdict(
+    lambda: KIND_OTHER, {type(None): KIND_NONE, str: KIND_STR, float: KIND_FLOAT, int: KIND_INT})
+
+def _truncate_floats(values):
+    """
+    Truncate a float64 array the way int(float(x)) does.
+
+    Args:
+        values: float64 ndarray
+
+    Returns:
+        (converted, fast) where converted is an object array of Python ints and
+        fast is the mask of positions it covers. NaN, infinity and values that
+        do not fit an int64 are left to the scalar reference.
+    """
+    fast = np.isfinite(values) & (np.abs(values) < INT64_LIMIT)
+    converted = np.trunc(values[fast]).astype(np.int64).astype(object)
+    return converted, fast
+
+def _layout_text(strings):
+    """
+    Lay strings out as one latin-1 code buffer, each followed by a NUL.
+
+    Characters outside latin-1 become "?", which keeps every string its
+    length and sends it off the fast paths.
+
+    Args:
+        strings: list of str values
+
+    Returns:
+        (codes, starts, lengths, counts): uint8 codes, the first position and
+        length of every string and its packed CHAR_COUNTS sums; None when a
+        string holds a NUL or is longer than BUFFER_TEXT_CHARS
+    """
+    codes = np.frombuffer(("\x00".join(strings) + "\x00").encode("latin-1", "replace"), dtype=np.uint8)
+    ends = np.flatnonzero(codes == 0)
+    if len(ends) != len(strings):
+        return None
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    if lengths.max() > BUFFER_TEXT_CHARS:
+        return None
+    return codes, starts, lengths, np.add.reduceat(np.take(CHAR_COUNTS, codes), starts, dtype=np.uint32)
+
+def _parse_plain_numbers(codes, starts, lengths, counts):
+    """
+    Parse the strings made only of ASCII digits, commas, spaces and at most one point.
+
+    Rank text such as "23274", "23,274" or "23274.0" is nearly always of
+    this shape, and in a real sheet most of it is distinct, so it is parsed
+    here column by column over the code buffer (see _layout_text) instead
+    of one float() call per string. Commas and spaces are skipped as
+    convert_to_number drops them, the digits are accumulated into one
+    integer and the fraction digits divided off again, which is what
+    int(float(text)) gives as long as the string holds at most
+    FAST_TEXT_DIGITS digits.
+
+    Returns:
+        (index, values): the strings parsed here and their int64 values
+    """
+    digits = counts & 0xFF
+    points = (counts >> 8) & 0xFF
+    index = np.flatnonzero((counts < OTHER_COUNT) & (points <= 1) & (digits >= 1)
+                           & (digits <= FAST_TEXT_DIGITS) & (lengths <= FAST_TEXT_CHARS))
+    values = np.zeros(index.size, dtype=np.int64)
+    if not index.size:
+        return index, values
+
+    first = starts[index]
+    length = lengths[index]
+    has_point = bool(points[index].any())
+    seen_point = np.zeros(index.size, dtype=bool)
+    fraction = np.zeros(index.size, dtype=np.int64)
+    for column in range(int(length.max())):
+        # Past its end a string reads the next one, so mask by length
+        inside = length > column
+        code = codes[np.minimum(first + column, codes.size - 1)]
+        digit = code - np.uint8(ord("0"))
+        take = (digit < 10) & inside
+        values = np.where(take, values * 10 + digit, values)
+        if has_point:
+            seen_point |= (code == ord(".")) & inside
+            fraction += take & seen_point
+
+    with_fraction = np.flatnonzero(fraction)
+    values[with_fraction] //= POWERS_OF_TEN[fraction[with_fraction]]
+    return index, values
+
+def _find_missing(codes, starts, counts):
+    """
+    Find the strings whose stripped text is a missing-data token (or empty).
+
+    Returns:
+        intp ndarray of their positions
+    """
+    kept = (counts * FIELD_SUM) >> 24
+    missing = kept == 0
+    candidates = np.flatnonzero((counts >= OTHER_COUNT) & (kept <= MISSING_KEY_CHARS))
+    if not candidates.size:
+        return np.flatnonzero(missing)
+
+    # Step over leading spaces (rarely more than one)
+    first = starts[candidates]
+    leading = np.flatnonzero(IS_SPACE[codes[first]])
+    while leading.size:
+        first[leading] += 1
+        leading = leading[IS_SPACE[codes[first[leading]]]]
+    # The kept characters are all non-spaces, so a token has to start here
+    length = kept[candidates]
+    key = np.zeros(candidates.size, dtype=np.int64)
+    for slot in range(MISSING_KEY_CHARS):
+        code = codes[np.minimum(first + slot, codes.size - 1)].astype(np.int64)
+        key |= np.where(length > slot, code, 0) << (8 * slot)
+    missing[candidates[np.isin(key, MISSING_KEYS)]] = True
+    return np.flatnonzero(missing)
+
+def _convert_strings(strings):
+    """
+    Convert str values (repeats allowed).
+
+    Missing-token detection and the parsing of plain digit strings (see
+    _parse_plain_numbers) run as vectorized passes over one code buffer;
+    only the remaining strings (signs, exponents, unusual spaces, ...) go
+    through float() one by one.
+
+    Args:
+        strings: list of str values
+
+    Returns:
+        list of (positions, values) pairs covering the strings that
+        convert_to_number does not hand back unchanged; values is what it
+        returns for them (one value or an array matching positions)
+    """
+    if not strings:
+        return []
+
+    layout = _layout_text(strings)
+    if layout is None:
+        # Strings holding a NUL (the buffer's separator) or too long for the
+        # 8-bit counts are converted one by one
+        odd = np.fromiter(("\x00" in value or len(value) > BUFFER_TEXT_CHARS for value in strings),
+                          dtype=bool, count=len(strings))
+        odd_index = np.flatnonzero(odd)
+        odd_converted = np.empty(odd_index.size, dtype=object)
+        odd_converted[:] = [convert_to_number(strings[index]) for index in odd_index.tolist()]
+        rest = np.flatnonzero(~odd)
+        groups = _convert_strings([strings[index] for index in rest.tolist()])
+        return [(odd_index, odd_converted)] + [(rest[changed], converted) for changed, converted in groups]
+
+    codes, starts, lengths, counts = layout
+    missing = _find_missing(codes, starts, counts)
+    plain, plain_values = _parse_plain_numbers(codes, starts, lengths, counts)
+    handled = np.zeros(len(strings), dtype=bool)
+    handled[missing] = True
+    handled[plain] = True
+
+    parsed = []
+    parsed_index = []
+    for index in np.flatnonzero(~handled).tolist():
+        # Same cleaning and parsing rules as convert_to_number (split() drops
+        # exactly the characters isspace() matches)
+        clean_value = "".join(strings[index].strip().replace(",", "").split())
+        try:
+            number = float(clean_value)
+        except (ValueError, TypeError):
+            # Unparseable strings pass through unchanged
+            continue
+        parsed.append(number)
+        parsed_index.append(index)
+
+    parsed_index = np.array(parsed_index, dtype=np.intp)
+    numbers, fast = _truncate_floats(np.array(parsed, dtype=np.float64))
+    # NaN passes through, infinity raises exactly like the scalar version
+    slow = parsed_index[~fast]
+    slow_converted = np.empty(slow.size, dtype=object)
+    slow_converted[:] = [convert_to_number(strings[index]) for index in slow.tolist()]
+
+    # Int64 values become Python ints when stored in an object array
+    return [(missing, ""), (plain, plain_values), (parsed_index[fast], numbers), (slow, slow_converted)]
+
+def _convert_cells(cells, result):
+    """
+    Convert a flat object array of cells into result, which starts as a copy of it.
+
+    Cells that convert to themselves (unparseable text, exact ints) are
+    left as they are.
+    """
+    # Pass 1: classify every cell by its exact type (bools are not ints here)
+    kinds = np.fromiter(map(KIND_BY_TYPE.__getitem__, map(type, cells)),
+                        dtype=np.int8, count=cells.size)
+    is_other = kinds == KIND_OTHER
+
+    result[np.flatnonzero(kinds == KIND_NONE)] = ""
+
+    # Pass 2: floats are truncated in one float64 pass; ints are checked to
+    # survive the round trip through float
+    float_index = np.flatnonzero(kinds == KIND_FLOAT)
+    if float_index.size:
+        converted, fast = _truncate_floats(cells[float_index].astype(np.float64))
+        result[float_index[fast]] = converted
+        is_other[float_index[~fast]] = True
+    int_index = np.flatnonzero(kinds == KIND_INT)
+    if int_index.size:
+        try:
+            ints = cells[int_index].astype(np.float64)
+        except OverflowError:
+            # Integers too large for a float: let the scalar version decide
+            is_other[int_index] = True
+        else:
+            is_other[int_index[~(np.abs(ints) < EXACT_INT_LIMIT)]] = True
+
+    # Pass 3: strings are converted together over one code buffer
+    string_index = np.flatnonzero(kinds == KIND_STR)
+    if string_index.size:
+        for changed, converted in _convert_strings(cells[string_index].tolist()):
+            result[string_index[changed]] = converted
+
+    # Anything else (bools, dates, NaN, huge values) uses the scalar reference
+    for index in np.flatnonzero(is_other):
+        result[index] = convert_to_number(cells[index])
+
+def convert_block(block):
+    """
+    Vectorized equivalent of applying convert_to_number to every cell of a block.
+
+    Args:
+        block: 2D sequence (rows x columns, e.g. the D:AA slice of many rows)
+            or an ndarray of cell values
+
+    Returns:
+        object ndarray of the same shape holding exactly what
+        convert_to_number would return for each cell
+    """
+    values = np.asarray(block, dtype=object)
+    flat = values.ravel()
+    result = flat.copy()
+    # Large blocks go in slices so the intermediate arrays stay cache-sized
+    for begin in range(0, flat.size, BLOCK_CHUNK_CELLS):
+        end = begin + BLOCK_CHUNK_CELLS
+        _convert_cells(flat[begin:end], result[begin:end])
+    return result.reshape(values.shape)
+
+def convert_rows(rows, start_col=4, end_col=27):
+    """
+    Convert columns start_col..end_col (1-based, inclusive) of a list of row tuples.
+
+    Args:
+        rows: list of row tuples as yielded by iter_rows(values_only=True)
+        start_col: First column to convert (4 = D)
+        end_col: Last column to convert (27 = AA)
+
+    Returns:
+        list of row lists with the target columns converted
+    """
+    if not rows:
+        return []
+
+    width = max(len(row) for row in rows)
+    padded = [list(row) + [None] * (width - len(row)) for row in rows]
+    last = min(end_col, width)
+    if last < start_col:
+        return padded
+
+    block = np.empty((len(padded), last - start_col + 1), dtype=object)
+    for slot, row in enumerate(padded):
+        block[slot] = row[start_col - 1:last]
+    converted = convert_block(block).tolist()
+
+    for row, new_values in zip(padded, converted):
+        row[start_col - 1:last] = new_values
+    return padded
+
+def random_cell(rng):
+    """Return a random cell value covering the shapes seen in cutoff sheets."""
+    kind = rng.randrange(12)
+    number = rng.randint(-10 ** 7, 10 ** 7)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return number
+    if kind == 2:
+        return number + rng.choice([0.0, 0.25, 0.5, 0.999, -0.5])
+    if kind == 3:
+        return rng.choice(MISSING_DATA_VALUES + ["\t--", "--\xa0", " N/A ", "na"])
+    if kind == 4:
+        return f"{number:,}" + rng.choice(["", ".0", ".75"])
+    if kind == 5:
+        return rng.choice([" ", "\t", " ", ""]) + str(number) + rng.choice(["", " ", "\n"])
+    if kind == 6:
+        return rng.choice(["abc", "12a", "1.2.3", "E115", "DS Comp. Sc.", "--1", "-", ",", "5\x00",
+                           "\u0967\u0968", " " * 40 + "7", "1" * 16, "9" * 300])
+    if kind == 7:
+        return rng.choice(["1_000", "1e3", "-2.5E2", "nan", "  NaN ", "+7", ".5", "5."])
+    if kind == 8:
+        return rng.choice([True, False, float("nan"), 2 ** 70, -2.0 ** 70, 1e300, 2 ** 53 + 1])
+    if kind == 9:
+        return str(rng.random() * 10 ** rng.randint(0, 8))
+    if kind == 10:
+        return rng.choice(["23274.0", "23,274", "2 3 2 7 4", "23274.0 "])
+    return rng.uniform(-10 ** 6, 10 ** 6)
+
+def same_result(expected, actual):
+    """Return True when two conversion results are identical in type and value."""
+    if type(expected) is not type(actual):
+        return False
+    if isinstance(expected, float) and expected != expected:
+        return actual != actual
+    return expected == actual
+
+def differential_check(cells=200000, columns=24, seed=0):
+    """
+    Compare convert_block against the scalar convert_to_number on random cells.
+
+    Args:
+        cells: Approximate number of random cells to compare
+        columns: Width of the random block
+        seed: Random seed, so a failure can be reproduced
+
+    Returns:
+        int: Number of mismatching cells (0 means the engines agree)
+    """
+    rng = random.Random(seed)
+    rows = max(1, cells // columns)
+    block = [[random_cell(rng) for _ in range(columns)] for _ in range(rows)]
+
+    converted = convert_block(block)
+    mismatches = 0
+    for row_index, row in enumerate(block):
+        for col_index, value in enumerate(row):
+            expected = convert_to_number(value)
+            actual = converted[row_index, col_index]
+            if not same_result(expected, actual):
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"   MISMATCH {value!r}: scalar {expected!r} vs batch {actual!r}")
+
+    # Values the scalar version raises on must raise the same way
+    for value in ["inf", "-Infinity", float("inf"), "1e400"]:
+        try:
+            convert_to_number(value)
+            expected_error = None
+        except Exception as e:
+            expected_error = type(e)
+        try:
+            convert_block([[value]])
+            actual_error = None
+        except Exception as e:
+            actual_error = type(e)
+        if expected_error is not actual_error:
+            mismatches += 1
+            print(f"   MISMATCH {value!r}: scalar raises {expected_error} vs batch {actual_error}")
+
+    print(f"Differential check: {rows * columns} random cells, {mismatches} mismatches")
+    return mismatches
+
+def cutoff_cell(rng):
+    """
+    Return a cell drawn like a real cutoff sheet's D:AA values.
+
+    Ranks go up to 250000 and are drawn afresh for every cell, so the text
+    ranks are mostly distinct: a quarter floats, 15% ints, 15% digit text,
+    10% comma text, 30% " --" and 5% "N/A".
+    """
+    rank = rng.randint(1, 250000)
+    pick = rng.random()
+    if pick < 0.25:
+        return rank + rng.choice([0.0, 0.5])
+    if pick < 0.40:
+        return rank
+    if pick < 0.55:
+        return str(rank)
+    if pick < 0.65:
+        return f"{rank:,}"
+    if pick < 0.95:
+        return " --"
+    return "N/A"
+
+def benchmark(cells=1000000, columns=24, seed=0):
+    """
+    Time the scalar and batch converters on a synthetic cutoff-like block (see cutoff_cell).
+
+    Args:
+        cells: Number of cells in the block
+        columns: Width of the block (24 = D:AA)
+        seed: Random seed
+
+    Returns:
+        dict with scalar_seconds, batch_seconds and speedup
+    """
+    rng = random.Random(seed)
+    rows = max(1, cells // columns)
+    block = np.array([[cutoff_cell(rng) for _ in range(columns)] for _ in range(rows)], dtype=object)
+
+    started = time.perf_counter()
+    scalar = [[convert_to_number(value) for value in row] for row in block.tolist()]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = convert_block(block)
+    batch_seconds = time.perf_counter() - started
+
+    assert batch.tolist() == scalar, "batch converter disagrees with convert_to_number"
+
+    speedup = scalar_seconds / batch_seconds if batch_seconds else float("inf")
+    print(f"{rows * columns} cells: scalar {scalar_seconds:.2f}s, batch {batch_seconds:.2f}s "
+          f"({speedup:.1f}x faster)")
+    return {'scalar_seconds': scalar_seconds, 'batch_seconds': batch_seconds, 'speedup': speedup}
+
+if __name__ == "__main__":
+    # Usage: python batch_convert.py [benchmark_cells]
+    #        python batch_convert.py --check  (differential check only, exits 1 on a mismatch)
+    if sys.argv[1:] == ["--check"]:
+        sys.exit(1 if differential_check() else 0)
+    bench_cells = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    failures = differential_check()
+    benchmark(bench_cells)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,181 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+def find_workbooks(target):
+    """
+    Resolve a directory, glob pattern or single file into a sorted list of workbooks.
+
+    Args:
+        target: Directory (all *.xlsx inside it), glob pattern or file path
+
+    Returns:
+        list of workbook paths, skipping Excel lock files (~$...) and the
+        *_Numbers.xlsx outputs of the streaming mode
+    """
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "*.xlsx"))
+    else:
+        paths = glob.glob(target)
+
+    return sorted(path for path in paths
+                  if not os.path.basename(path).startswith("~$") and not path.endswith("_Numbers.xlsx"))
+
+def process_workbook(file_path, validate=False, streaming=False):
+    """
+    Convert (and optionally validate) one workbook inside a worker process.
+
+    Every exception is caught and reported in the result so that one bad
+    file never stops the rest of the batch. The scripts' console output is
+    captured so that parallel workers do not interleave their progress lines.
+
+    Args:
+        file_path: Workbook to convert
+        validate: Run validate_conversion on the converted workbook
+        streaming: Use the constant-memory streaming conversion
+
+    Returns:
+        dict with file, status, seconds, rows, cells, validated, error and
+        metrics (the worker's phase timings and counters)
+    """
+    # Imported in the worker so the parent process stays light
+    from convert_to_numbers import process_excel_file, process_excel_file_streaming
+    from instrumentation import Metrics
+
+    metrics = Metrics("batch_runner", file_path)
+
+    result = {
+        'file': file_path,
+        'status': 'ok',
+        'seconds': 0.0,
+        'rows': 0,
+        'cells': 0,
+        'validated': None,
+        'error': '',
+    }
+    started = time.perf_counter()
+    captured = io.StringIO()
+
+    try:
+        with contextlib.redirect_stdout(captured):
+            if streaming:
+                stats = process_excel_file_streaming(file_path, metrics=metrics)
+                converted_path = stats['output_path']
+            else:
+                stats = process_excel_file(file_path, metrics=metrics)
+                converted_path = file_path
+            result['rows'] = stats['rows']
+            result['cells'] = stats['cells']
+
+            if validate:
+                from validate_conversion import validate_conversion
+                with metrics.phase("report"):
+                    result['validated'] = validate_conversion(converted_path, metrics=metrics)
+                if not result['validated']:
+                    result['status'] = 'invalid'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+        metrics.count('errors')
+
+    result['seconds'] = time.perf_counter() - started
+    result['metrics'] = metrics.snapshot(status=result['status'])
+    return result
+
+def print_summary(results, wall_seconds):
+    """Print a per-file table of duration, cell counts and status."""
+    print("\n" + "=" * 100)
+    print("BATCH CONVERSION SUMMARY")
+    print("=" * 100)
+    print(f"{'File':<50} {'Status':<8} {'Seconds':>9} {'Rows':>10} {'Cells':>12} {'Valid':>6}")
+    print("-" * 100)
+
+    for result in results:
+        name = os.path.basename(result['file'])
+        if len(name) > 49:
+            name = name[:46] + "..."
+        valid = "-" if result['validated'] is None else ("yes" if result['validated'] else "NO")
+        print(f"{name:<50} {result['status']:<8} {result['seconds']:>9.2f} "
+              f"{result['rows']:>10} {result['cells']:>12} {valid:>6}")
+        if result['error']:
+            print(f"   ❌ {result['error']}")
+
+    total_cells = sum(result['cells'] for result in results)
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    print("-" * 100)
+    print(f"Files: {len(results)}, failed or invalid: {failed}, cells: {total_cells}, "
+          f"wall time: {wall_seconds:.2f}s")
+
+def run_batch(target, workers=None, validate=False, streaming=False, metrics_path=None):
+    """
+    Convert every workbook matched by target on a pool of worker processes.
+
+    Args:
+        target: Directory, glob pattern or file path of the workbooks
+        workers: Number of worker processes (default: number of CPU cores)
+        validate: Also validate each converted workbook
+        streaming: Use the constant-memory streaming conversion
+        metrics_path: Where to write one metrics record per file ("-" for
+            stdout, .jsonl to append, otherwise a JSON list)
+
+    Returns:
+        list of per-file result dicts, in input order
+    """
+    paths = find_workbooks(target)
+    if not paths:
+        print(f"No workbooks found for {target}")
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    print(f"Converting {len(paths)} workbooks with {workers} worker processes...")
+
+    started = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_workbook, path, validate, streaming): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result = {'file': path, 'status': 'failed', 'seconds': 0.0, 'rows': 0,
+                          'cells': 0, 'validated': None, 'error': f"{type(e).__name__}: {e}"}
+            results[path] = result
+            print(f"   {result['status']:<8} {os.path.basename(path)} ({result['seconds']:.2f}s)")
+
+    ordered = [results[path] for path in paths]
+    print_summary(ordered, time.perf_counter() - started)
+
+    if metrics_path:
+        from instrumentation import write_records
+        # A worker that died has no metrics of its own, only the failure
+        records = [result.get('metrics') or {'script': "batch_runner", 'file': result['file'],
+                                              'status': result['status'], 'error': result['error']}
+                   for result in ordered]
+        write_records(metrics_path, records)
+    return ordered
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert many cutoff workbooks in parallel.")
+    parser.add_argument("target", help="Directory of .xlsx files or a glob pattern such as 'cutoffs/*R1*.xlsx'")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU cores)")
+    parser.add_argument("--validate", action="store_true", help="Validate each workbook after converting it")
+    parser.add_argument("--stream", action="store_true", help="Use the constant-memory streaming conversion")
+    parser.add_argument("--metrics", default=None,
+                        help="Write per-file metrics: a .json/.jsonl file, or - for JSON lines on stdout")
+    args = parser.parse_args()
+
+    from instrumentation import report_stream
+    with report_stream({'metrics': args.metrics}):
+        batch_results = run_batch(args.target, args.workers, args.validate, args.stream, args.metrics)
+    raise SystemExit(0 if batch_results and all(r['status'] == 'ok' for r in batch_results) else 1)
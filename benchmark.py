@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from convert_to_numbers import CATEGORY_HEADERS
+from xlsx_reader import column_letter
+
+# Share of each value shape in the generated D:AA cells
+DEFAULT_MIX = {
+    'float': 0.25,    # 23274.5
+    'int': 0.15,      # 23274
+    'text_int': 0.15, # "23274"
+    'comma': 0.1,     # "23,274"
+    'missing': 0.3,   # " --"
+    'na': 0.05,       # "N/A"
+}
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Functions timed by the harness, in the order they have to run
+BENCHMARKS = [
+    ('process_excel_file_streaming', 'convert_to_numbers', 'process_excel_file_streaming'),
+    ('process_excel_file_pipelined', 'pipelined_convert', 'process_excel_file_pipelined'),
+    ('process_excel_file', 'convert_to_numbers', 'process_excel_file'),
+    ('validate_conversion', 'validate_conversion', 'validate_conversion'),
+    ('analyze_conversion_details', 'detailed_analysis', 'analyze_conversion_details'),
+    ('comprehensive_test', 'comprehensive_test', 'comprehensive_test'),
+]
+
+# kcet subcommands timed by --startup, and modules none of them should import
+STARTUP_COMMANDS = ['convert', 'validate', 'analyze', 'test']
+HEAVY_MODULES = ('openpyxl', 'pandas', 'numpy')
+
+def synthetic_value(rng, mix):
+    """Return one D:AA cell value drawn from the configured mix."""
+    rank = rng.randint(1, 250000)
+    pick = rng.random() * sum(mix.values())
+    for kind, share in mix.items():
+        pick -= share
+        if pick < 0:
+            break
+    if kind == 'float':
+        return rank + rng.choice([0.0, 0.5])
+    if kind == 'int':
+        return rank
+    if kind == 'text_int':
+        return str(rank)
+    if kind == 'comma':
+        return f"{rank:,}"
+    if kind == 'na':
+        return "N/A"
+    return " --"
+
+def generate_workbook(file_path, rows, columns=24, extra_columns=2, mix=None, seed=0):
+    """
+    Write a synthetic cutoff workbook with a RawData sheet.
+
+    Columns A:C hold serial number, college and course, the next `columns`
+    columns (D:AA by default) hold ranks in the shapes given by mix, and
+    `extra_columns` text columns follow the target range.
+
+    Args:
+        file_path: Where to save the workbook
+        rows: Number of data rows (a header row is added)
+        columns: Number of category columns starting at D
+        extra_columns: Number of columns after the category columns
+        mix: {kind: share} with kinds float, int, text_int, comma, missing, na
+        seed: Random seed
+
+    Returns:
+        file_path
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    headers = (CATEGORY_HEADERS * (columns // len(CATEGORY_HEADERS) + 1))[:columns]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("RawData")
+    sheet.append(["Sl No.", "College Name", "Course Name"] + headers
+                 + [f"Note {index + 1}" for index in range(extra_columns)])
+    for row in range(1, rows + 1):
+        college = f"E{rng.randint(1, 300):03d} College of Engineering Bangalore"
+        course = rng.choice(["CS Computers", "EC Electronics", "DS Comp. Sc. Engg- Data Sc.", "ME Mechanical"])
+        sheet.append([row, college, course]
+                     + [synthetic_value(rng, mix) for _ in range(columns)]
+                     + [rng.choice(["", "Aided", "Private"]) for _ in range(extra_columns)])
+    workbook.save(file_path)
+    return file_path
+
+def _run_one(module_name, function_name, file_path, columns, cache_dir, queue):
+    """Child process body: time one function on columns with its console output discarded."""
+    os.environ["KCET_SHEET_CACHE"] = cache_dir
+    try:
+        module = __import__(module_name)
+        from convert_to_numbers import peak_rss_mb
+        function = getattr(module, function_name)
+        started = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            function(file_path, columns=columns)
+        queue.put({'seconds': time.perf_counter() - started, 'peak_rss_mb': peak_rss_mb(), 'error': ''})
+    except Exception as e:
+        queue.put({'seconds': None, 'peak_rss_mb': None, 'error': f"{type(e).__name__}: {e}"})
+
+def time_function(module_name, function_name, file_path, columns, cache_dir):
+    """
+    Run one benchmarked function in a fresh process so its peak RSS is its own.
+
+    Args:
+        module_name: Module holding the function
+        function_name: Function to call as function(file_path, columns=columns)
+        file_path: Generated workbook
+        columns: Target column spec, e.g. "D:AA"
+        cache_dir: Sheet cache directory for the child process
+
+    Returns:
+        dict with seconds, peak_rss_mb and error
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_one,
+                              args=(module_name, function_name, file_path, columns, cache_dir, queue))
+    process.start()
+    outcome = queue.get()
+    process.join()
+    return outcome
+
+def run_benchmarks(sizes=None, columns=24, mix=None, seed=0, work_dir=None):
+    """
+    Generate one workbook per size and time every benchmarked function on it.
+
+    The streaming and pipelined conversions run first (they write a separate
+    output file), then the in-place conversion (it creates RawData_Numbers)
+    and the three checkers. The checkers share a fresh sheet cache per size, so the first
+    of them includes building it. Every function is given the column range the
+    workbook was generated with (D plus `columns` columns).
+
+    Returns:
+        list of result dicts (function, rows, cells, seconds, cells_per_sec, peak_rss_mb, error)
+    """
+    sizes = sizes or DEFAULT_SIZES
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="kcet_bench_")
+    results = []
+    column_spec = f"D:{column_letter(3 + columns)}"
+
+    try:
+        for rows in sizes:
+            file_path = os.path.join(work_dir, f"bench_{rows}.xlsx")
+            cache_dir = os.path.join(work_dir, f"cache_{rows}")
+            print(f"Generating {rows} rows x {columns} target columns ({column_spec})...")
+            generate_workbook(file_path, rows, columns, mix=mix, seed=seed)
+            cells = rows * columns
+
+            for label, module_name, function_name in BENCHMARKS:
+                outcome = time_function(module_name, function_name, file_path, column_spec, cache_dir)
+                seconds = outcome['seconds']
+                result = {
+                    'function': label,
+                    'rows': rows,
+                    'cells': cells,
+                    'seconds': seconds,
+                    'cells_per_sec': cells / seconds if seconds else None,
+                    'peak_rss_mb': outcome['peak_rss_mb'],
+                    'error': outcome['error'],
+                }
+                results.append(result)
+                if result['error']:
+                    print(f"   {label:<30} FAILED: {result['error']}")
+                else:
+                    memory = "n/a" if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.0f} MB"
+                    print(f"   {label:<30} {seconds:>8.2f}s {result['cells_per_sec']:>12.0f} cells/s  peak {memory}")
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+def import_profile(code):
+    """
+    Run code in a fresh interpreter under -X importtime.
+
+    Returns:
+        (seconds spent importing, set of top-level packages imported)
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    microseconds = 0
+    packages = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        microseconds += int(self_time)
+        packages.add(name.strip().split(".")[0])
+    return microseconds / 1e6, packages
+
+def run_startup_benchmarks(repeats=5):
+    """
+    Time how long each kcet subcommand takes to start, before it touches a file.
+
+    Each command's imports are profiled in a fresh interpreter (the best of
+    `repeats` runs counts), and "kcet.py --help" is timed end to end. A
+    command that imports openpyxl or pandas is reported as an error, so a
+    stray top-level import shows up as a regression.
+
+    Returns:
+        list of result dicts in the run_benchmarks format, with rows 0
+    """
+    results = []
+    cases = [(f"startup:{command}", f"import kcet; kcet.import_command({command!r})")
+             for command in STARTUP_COMMANDS]
+    cases.append(('startup:help', None))
+
+    for label, code in cases:
+        timings = []
+        heavy = []
+        for _ in range(repeats):
+            if code is None:
+                started = time.perf_counter()
+                subprocess.run([sys.executable, "kcet.py", "--help"], capture_output=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+                timings.append(time.perf_counter() - started)
+            else:
+                seconds, packages = import_profile(code)
+                timings.append(seconds)
+                heavy = sorted(packages.intersection(HEAVY_MODULES))
+        result = {
+            'function': label,
+            'rows': 0,
+            'cells': 0,
+            'seconds': min(timings),
+            'cells_per_sec': None,
+            'peak_rss_mb': None,
+            'error': f"imports {', '.join(heavy)}" if heavy else '',
+        }
+        results.append(result)
+        flag = f"  ({result['error']})" if heavy else ""
+        print(f"   {label:<30} {result['seconds'] * 1000:>8.1f} ms{flag}")
+    return results
+
+def write_results(results, output_path):
+    """Write benchmark results with enough context to compare versions later."""
+    document = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(output_path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+    print(f"Results written to {output_path}")
+
+def compare_results(baseline_path, results):
+    """Print the change in wall time against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as handle:
+        baseline = {(entry['function'], entry['rows']): entry for entry in json.load(handle)['results']}
+
+    print("\n" + "=" * 70)
+    print(f"{'Function':<30} {'Rows':>8} {'Before':>9} {'After':>9} {'Change':>9}")
+    print("-" * 70)
+    for entry in results:
+        before = baseline.get((entry['function'], entry['rows']))
+        if not before or not before['seconds'] or not entry['seconds']:
+            continue
+        change = (entry['seconds'] / before['seconds'] - 1) * 100
+        print(f"{entry['function']:<30} {entry['rows']:>8} {before['seconds']:>8.2f}s "
+              f"{entry['seconds']:>8.2f}s {change:>+8.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark convert/validate/analyze on synthetic workbooks.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated row counts (default: 1000,10000,100000,1000000)")
+    parser.add_argument("--columns", type=int, default=24, help="Target columns starting at D (default: 24 = D:AA)")
+    parser.add_argument("--mix", default=None, help='JSON share per value kind, e.g. \'{"float": 0.5, "missing": 0.5}\'')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--startup", action="store_true",
+                        help="Time the start-up of each kcet subcommand instead of the workbook functions")
+    args = parser.parse_args()
+
+    if args.startup:
+        bench_results = run_startup_benchmarks()
+    else:
+        bench_results = run_benchmarks([int(size) for size in args.sizes.split(",")], args.columns,
+                                       json.loads(args.mix) if args.mix else None, args.seed)
+    write_results(bench_results, args.output)
+    if args.compare:
+        compare_results(args.compare, bench_results)
@@ -0,0 +1,321 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from batch_convert import convert_rows
+from convert_to_numbers import (DEFAULT_COLUMNS, DEFAULT_FILE_PATH, DEFAULT_SHEETS, STREAM_CHUNK_ROWS,
+                                atomic_write_json, count_converted, default_streaming_output, describe_columns,
+                                print_run_report, process_excel_file_streaming)
+from instrumentation import (Metrics, ProgressReporter, parse_script_options, peak_rss_mb, report_stream,
+                             wait_for_exit)
+from xlsx_reader import parse_columns
+
+# A checkpoint is committed after this many rows or this many seconds,
+# whichever comes first (always at a chunk boundary)
+CHECKPOINT_ROWS = 50000
+CHECKPOINT_SECONDS = 30.0
+
+def default_checkpoint_path(output_path):
+    """Return the checkpoint state file used for an output file (<output>.checkpoint.json)."""
+    return output_path + ".checkpoint.json"
+
+def source_fingerprint(file_path, start_col, end_col, sheets):
+    """Identify a source file and conversion settings, so a checkpoint is only resumed against the same input."""
+    status = os.stat(file_path)
+    return {
+        'source': os.path.abspath(file_path),
+        'size': status.st_size,
+        'mtime_ns': status.st_mtime_ns,
+        'start_col': start_col,
+        'end_col': end_col,
+        'sheets': list(sheets),
+    }
+
+class Checkpoint:
+    """
+    Progress record of one conversion, committed every few rows or seconds.
+
+    The converted rows go to an append-only data file; a commit flushes it to
+    disk and then atomically replaces the small JSON state file with the
+    committed row count and the data file's length. After a crash the data
+    file is cut back to the last committed length, so anything written after
+    the last commit is discarded and redone.
+
+    Args:
+        state_path: JSON state file
+        data_path: Append-only data file the state refers to
+        fingerprint: source_fingerprint of the run; a state written for
+            anything else is ignored
+        every_rows: Rows between commits
+        every_seconds: Seconds between commits
+    """
+
+    def __init__(self, state_path, data_path, fingerprint, every_rows=CHECKPOINT_ROWS,
+                 every_seconds=CHECKPOINT_SECONDS):
+        self.state_path = state_path
+        self.data_path = data_path
+        self.fingerprint = fingerprint
+        self.every_rows = every_rows
+        self.every_seconds = every_seconds
+        self.rows = 0
+        self.complete = False
+        self.commits = 0
+        self.seconds = 0.0
+        self._last_rows = 0
+        self._last_time = time.perf_counter()
+
+    def resume(self):
+        """
+        Load the committed state and cut the data file back to it.
+
+        Returns:
+            int: Rows already committed (0 when starting over)
+        """
+        state = None
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as handle:
+                    state = json.load(handle)
+            except (OSError, ValueError):
+                print("Checkpoint is unreadable, starting over...")
+        if state is not None and state.get('fingerprint') != self.fingerprint:
+            print("Checkpoint was written for another source file or column range, starting over...")
+            state = None
+        if state is not None and (not os.path.exists(self.data_path)
+                                  or os.path.getsize(self.data_path) < state['offset']):
+            print("Checkpoint data is missing or short, starting over...")
+            state = None
+
+        if state is None:
+            with open(self.data_path, "wb"):
+                pass
+            self.rows = 0
+            self.complete = False
+        else:
+            os.truncate(self.data_path, state['offset'])
+            self.rows = state['rows']
+            self.complete = state['complete']
+        self._last_rows = self.rows
+        return self.rows
+
+    def due(self, rows):
+        """Check whether a commit is due after rows rows."""
+        return (rows - self._last_rows >= self.every_rows
+                or time.perf_counter() - self._last_time >= self.every_seconds)
+
+    def commit(self, rows, data_handle, complete=False):
+        """
+        Make everything written to data_handle so far durable and record rows as done.
+
+        Args:
+            rows: Data rows converted so far
+            data_handle: Open handle on the data file
+            complete: Whether every row has been converted
+        """
+        started = time.perf_counter()
+        data_handle.flush()
+        os.fsync(data_handle.fileno())
+        offset = os.fstat(data_handle.fileno()).st_size
+        atomic_write_json({'fingerprint': self.fingerprint, 'rows': rows, 'offset': offset,
+                           'complete': complete}, self.state_path)
+        self.rows = rows
+        self.complete = complete
+        self.commits += 1
+        self._last_rows = rows
+        self._last_time = time.perf_counter()
+        self.seconds += self._last_time - started
+
+    def remove(self, keep_data=False):
+        """Delete the state file (and the data file unless keep_data) after a finished run."""
+        paths = [self.state_path] if keep_data else [self.state_path, self.data_path]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+def _report(mode, output_path, rows, processed_cells, resumed_rows, started, metrics, checkpoint, trimmed_cells):
+    elapsed = time.perf_counter() - started
+    print("Conversion completed successfully!")
+    print(f"Total cells processed: {processed_cells}")
+    if resumed_rows:
+        print(f"Resumed after {resumed_rows} rows converted by an earlier run")
+    print(f"Checkpoints: {checkpoint.commits} in {checkpoint.seconds:.2f}s "
+          f"({checkpoint.seconds / elapsed * 100 if elapsed else 0.0:.1f}% of the run)")
+    print(f"File saved: {output_path}")
+    return {
+        'mode': mode,
+        'output_path': output_path,
+        'rows': rows,
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'resumed_rows': resumed_rows,
+        'checkpoints': checkpoint.commits,
+        'checkpoint_seconds': checkpoint.seconds,
+        **({} if trimmed_cells is None else {'trimmed_cells': trimmed_cells}),
+    }
+
+def process_excel_file_checkpointed(file_path=DEFAULT_FILE_PATH, output_path=None, metrics=None,
+                                    columns=DEFAULT_COLUMNS, sheets=DEFAULT_SHEETS):
+    """
+    Convert a workbook in the checkpoint mode, which for xlsx means without checkpoints.
+
+    A checkpoint cannot make an xlsx resume cheaper: the source sheet
+    cannot be entered mid-way and an xlsx file cannot be appended to, so a
+    resumed run would still parse and write the whole workbook and only
+    skip the conversion, a small part of the run. Workbooks are therefore
+    converted by process_excel_file_streaming, which saves through an
+    atomic rename (a killed run leaves output_path untouched and is simply
+    started again) and refuses to overwrite the source, whose styles a
+    values-only write would drop. CSV files resume for real, see
+    process_csv_file_checkpointed.
+
+    Args:
+        file_path: Workbook containing the RawData sheet
+        output_path: Where to save the result (default: <name>_Numbers.xlsx)
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA")
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        dict with the run statistics (see process_excel_file_streaming)
+    """
+    print("Workbooks are not checkpointed (a resume would read and write the whole file again); "
+          "converting in streaming mode, which saves atomically")
+    return process_excel_file_streaming(file_path, output_path, metrics=metrics, columns=columns, sheets=sheets)
+
+def process_csv_file_checkpointed(file_path, output_path=None, checkpoint_rows=CHECKPOINT_ROWS,
+                                  checkpoint_seconds=CHECKPOINT_SECONDS, columns=None, metrics=None):
+    """
+    Convert a CSV file like csv_pipeline.process_csv_file, resumable after a crash.
+
+    The output is written to <output>.partial, which is the checkpoint data
+    file: a rerun cuts it back to the last committed row, skips the source
+    rows before it without converting them, and appends the rest. The
+    partial file is renamed to output_path once every row is written.
+
+    Args:
+        file_path: CSV file to convert (row 1 holds the headers)
+        output_path: Where to write the result (default: <name>_Numbers.csv)
+        checkpoint_rows: Rows between checkpoints
+        checkpoint_seconds: Seconds between checkpoints
+        columns: Target column spec, see csv_pipeline.csv_target_columns
+        metrics: Optional Metrics to record phases and counters in
+
+    Returns:
+        dict with the run statistics (see process_csv_file) plus
+        resumed_rows, checkpoints and checkpoint_seconds
+    """
+    from csv_pipeline import CSV_BUFFER_BYTES, csv_target_columns
+
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if output_path is None:
+        output_path = default_streaming_output(file_path)
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError("CSV mode cannot overwrite the file it is reading")
+
+    started = time.perf_counter()
+    partial_path = output_path + ".partial"
+    with open(file_path, newline="", encoding="utf-8-sig") as handle:
+        header = next(csv.reader(handle), None)
+    if header is None:
+        raise ValueError(f"{file_path} is empty")
+    start_col, end_col = csv_target_columns(header, columns)
+
+    checkpoint = Checkpoint(default_checkpoint_path(output_path), partial_path,
+                            source_fingerprint(file_path, start_col, end_col, ()),
+                            checkpoint_rows, checkpoint_seconds)
+    resumed_rows = checkpoint.resume()
+    if resumed_rows:
+        print(f"Resuming from checkpoint: {resumed_rows} rows already written to {partial_path}")
+
+    rows = 0
+    processed_cells = 0
+    progress = ProgressReporter("rows")
+    chunk = []
+
+    with open(file_path, newline="", encoding="utf-8-sig", buffering=CSV_BUFFER_BYTES) as source, \
+            open(partial_path, "a", newline="", encoding="utf-8", buffering=CSV_BUFFER_BYTES) as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+        next(reader)
+        if not checkpoint.complete and not resumed_rows and target.tell() == 0:
+            writer.writerow(header)
+        print(f"Streaming {file_path}, converting columns {describe_columns(start_col, end_col)} "
+              f"({', '.join(header[start_col - 1:end_col])}) from row 2")
+
+        def flush_chunk():
+            converted_rows = convert_rows(chunk, start_col, end_col)
+            count_converted(metrics,
+                            itertools.chain.from_iterable(values[start_col - 1:end_col] for values in chunk),
+                            itertools.chain.from_iterable(values[start_col - 1:end_col] for values in converted_rows))
+            writer.writerows(converted_rows)
+            chunk.clear()
+            if checkpoint.due(rows):
+                with metrics.phase("checkpoint"):
+                    checkpoint.commit(rows, target)
+
+        if not checkpoint.complete:
+            with metrics.phase("resume"):
+                rows = sum(1 for _ in itertools.islice(reader, resumed_rows))
+            with metrics.phase("convert"):
+                for values in reader:
+                    chunk.append(values)
+                    processed_cells += max(0, min(end_col, len(values)) - start_col + 1)
+                    rows += 1
+                    if len(chunk) >= STREAM_CHUNK_ROWS:
+                        flush_chunk()
+                        progress.update(rows)
+                flush_chunk()
+            if rows < resumed_rows:
+                raise ValueError(f"Checkpoint holds {resumed_rows} rows but {file_path} only has {rows}")
+            with metrics.phase("checkpoint"):
+                checkpoint.commit(rows, target, complete=True)
+        else:
+            rows = resumed_rows
+
+    os.replace(partial_path, output_path)
+    checkpoint.remove(keep_data=True)
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_written', processed_cells)
+
+    return _report('csv-checkpointed', output_path, rows, processed_cells, resumed_rows, started, metrics,
+                   checkpoint, None)
+
+if __name__ == "__main__":
+    # Usage: python checkpointed_convert.py [--metrics FILE | -] [--non-interactive] [--columns D:AA]
+    #                                       source.csv [output.csv] [checkpoint rows] [checkpoint seconds]
+    # Rerun the same command after a crash to resume from the last checkpoint; a
+    # workbook is converted in streaming mode instead (see process_excel_file_checkpointed)
+    args, options = parse_script_options(sys.argv[1:])
+    source_path = args[0] if args else DEFAULT_FILE_PATH
+    run_metrics = Metrics("convert_to_numbers", source_path)
+
+    with report_stream(options):
+        try:
+            if source_path.lower().endswith(".csv"):
+                run_stats = process_csv_file_checkpointed(
+                    source_path, args[1] if len(args) > 1 else None,
+                    int(args[2]) if len(args) > 2 else CHECKPOINT_ROWS,
+                    float(args[3]) if len(args) > 3 else CHECKPOINT_SECONDS,
+                    columns=options['columns'], metrics=run_metrics)
+            else:
+                run_stats = process_excel_file_checkpointed(source_path, args[1] if len(args) > 1 else None,
+                                                            metrics=run_metrics,
+                                                            columns=options['columns'] or DEFAULT_COLUMNS)
+            print_run_report(run_stats)
+            status = "ok"
+        except Exception as e:
+            print(f"Error occurred: {str(e)}")
+            run_metrics.count('errors')
+            run_stats = {'error': str(e)}
+            status = "error"
+            wait_for_exit(options)
+
+    if options['metrics']:
+        run_metrics.emit(options['metrics'], status=status, result=run_stats)
+    sys.exit(0 if status == "ok" else 1)
@@ -1,36 +1,46 @@
-import openpyxl
-from openpyxl import load_workbook
-import random
+import sys
+import time
 
-def comprehensive_test():
+from convert_to_numbers import DEFAULT_FILE_PATH, DEFAULT_SHEETS, describe_columns
+from instrumentation import Metrics, parse_script_options, report_stream, wait_for_exit
+from validation_engine import (CONFIDENCE_LEVEL, QUICK_BANDS, QUICK_SAMPLE_ROWS, run_quick_check, run_validation,
+                               target_columns)
+from xlsx_reader import column_letter
+
+def comprehensive_test(file_path=DEFAULT_FILE_PATH, metrics=None, columns=None, sheets=DEFAULT_SHEETS):
     """
     Comprehensive test suite for the Excel conversion validation.
+
+    Args:
+        file_path: Workbook holding the RawData and RawData_Numbers sheets
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default D:AA, or the category columns of a CSV file)
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        bool: True when all tests passed
     """
+    start_col, end_col = target_columns(file_path, columns)
+    original_name, converted_name = sheets
     print("COMPREHENSIVE CONVERSION TEST SUITE")
     print("=" * 80)
 
-    file_path = r"d:\Anant\VSCodeProjects\Temp_projects\ToNumber.xlsx"
-
     # Test 1: Basic file and sheet existence
     print("1. Testing file and sheet existence...")
     try:
-        workbook = load_workbook(file_path)
-        assert "RawData" in workbook.sheetnames, "RawData sheet missing"
-        assert "RawData_Numbers" in workbook.sheetnames, "RawData_Numbers sheet missing"
+        result = run_validation(file_path, start_col, end_col, original_name=original_name,
+                                converted_name=converted_name, metrics=metrics)
+        assert original_name not in result.missing_sheets, f"{original_name} sheet missing"
+        assert converted_name not in result.missing_sheets, f"{converted_name} sheet missing"
         print("   ✅ Both sheets exist")
     except Exception as e:
         print(f"   ❌ File/Sheet error: {e}")
         return False
 
-    original_sheet = workbook["RawData"]
-    converted_sheet = workbook["RawData_Numbers"]
-
     # Test 2: Sheet dimensions match
     print("2. Testing sheet dimensions...")
-    orig_rows = original_sheet.max_row
-    conv_rows = converted_sheet.max_row
-    orig_cols = original_sheet.max_column
-    conv_cols = converted_sheet.max_column
+    orig_rows, orig_cols = result.original_rows, result.original_cols
+    conv_rows, conv_cols = result.converted_rows, result.converted_cols
 
     if orig_rows == conv_rows and orig_cols == conv_cols:
         print(f"   ✅ Dimensions match: {orig_rows} rows x {orig_cols} columns")
@@ -39,108 +49,44 @@ def comprehensive_test():
 
     # Test 3: Header preservation (row 1)
     print("3. Testing header preservation...")
-    header_errors = 0
-    start_col, end_col = 4, 27  # D to AA
+    header_errors = len(result.header_mismatches)
 
-    for col in range(1, orig_cols + 1):
-        orig_header = original_sheet.cell(row=1, column=col).value
-        conv_header = converted_sheet.cell(row=1, column=col).value
-        if orig_header != conv_header:
-            header_errors += 1
-            if header_errors <= 3:  # Show first 3 errors
-                print(f"   ❌ Header mismatch in column {chr(64+col)}: '{orig_header}' vs '{conv_header}'")
+    for col, orig_header, conv_header in result.header_mismatches[:3]:  # Show first 3 errors
+        print(f"   ❌ Header mismatch in column {column_letter(col)}: '{orig_header}' vs '{conv_header}'")
 
     if header_errors == 0:
         print("   ✅ All headers preserved correctly")
     else:
         print(f"   ❌ {header_errors} header mismatches found")
 
-    # Test 4: Data type conversion in target range
-    print("4. Testing data type conversions in range D-AA...")
-
-    test_results = {
-        'numbers_converted': 0,
-        'missing_preserved': 0,
-        'type_errors': 0,
-        'decimal_removals': 0,
-        'unexpected_changes': 0
-    }
-
-    # Random sampling for performance
-    sample_rows = random.sample(range(2, min(100, orig_rows + 1)), min(20, orig_rows - 1))
-    sample_cols = random.sample(range(start_col, end_col + 1), min(10, end_col - start_col + 1))
-
-    for row in sample_rows:
-        for col in sample_cols:
-            orig_val = original_sheet.cell(row=row, column=col).value
-            conv_val = converted_sheet.cell(row=row, column=col).value
-
-            # Test missing data preservation
-            if orig_val is None or str(orig_val).strip() in [" --", "--", "-- ", " -- ", "", "N/A", "NA"]:
-                if conv_val is None or conv_val == "":
-                    test_results['missing_preserved'] += 1
-                else:
-                    test_results['type_errors'] += 1
-                    print(f"   ❌ Missing data not preserved at {chr(64+col)}{row}: '{orig_val}' -> '{conv_val}'")
-
-            # Test number conversion
-            elif orig_val is not None:
-                try:
-                    orig_num = float(str(orig_val))
-                    expected_int = int(orig_num)
-
-                    if orig_num != expected_int:
-                        test_results['decimal_removals'] += 1
-
-                    if isinstance(conv_val, int) and conv_val == expected_int:
-                        test_results['numbers_converted'] += 1
-                    elif isinstance(conv_val, float) and conv_val == expected_int:
-                        test_results['numbers_converted'] += 1
-                        print(f"   ⚠️ Number converted but still float type at {chr(64+col)}{row}")
-                    else:
-                        test_results['type_errors'] += 1
-                        print(f"   ❌ Number conversion error at {chr(64+col)}{row}: '{orig_val}' -> '{conv_val}'")
-
-                except (ValueError, TypeError):
-                    # Original wasn't a number, check if it changed unexpectedly
-                    if orig_val != conv_val and not (conv_val is None or conv_val == ""):
-                        test_results['unexpected_changes'] += 1
-
-    print(f"   Numbers converted correctly: {test_results['numbers_converted']}")
-    print(f"   Missing data preserved: {test_results['missing_preserved']}")
-    print(f"   Decimal values processed: {test_results['decimal_removals']}")
-    print(f"   Type conversion errors: {test_results['type_errors']}")
-    print(f"   Unexpected changes: {test_results['unexpected_changes']}")
+    # Test 4: Data type conversion in target range (every cell, from the single pass)
+    print(f"4. Testing data type conversions in columns {describe_columns(start_col, end_col)}...")
+
+    for issue in result.error_samples:
+        where = f"{column_letter(issue['column'])}{issue['row']}"
+        if issue['kind'] == 'missing_not_preserved':
+            print(f"   ❌ Missing data not preserved at {where}: '{issue['original']}' -> '{issue['converted']}'")
+        elif issue['kind'] == 'float_type':
+            print(f"   ⚠️ Number converted but still float type at {where}")
+        elif issue['kind'] in ('incorrect_conversion', 'still_decimal', 'not_converted', 'unvalidated'):
+            print(f"   ❌ Number conversion error at {where}: '{issue['original']}' -> '{issue['converted']}'")
+
+    print(f"   Numbers converted correctly: {result.converted_cells}")
+    print(f"   Missing data preserved: {result.preserved_missing}")
+    print(f"   Decimal values processed: {result.decimal_removals}")
+    print(f"   Type conversion errors: {result.cell_errors}")
+    print(f"   Unexpected changes: {result.unexpected_changes}")
 
     # Test 5: Data outside target range should be unchanged
-    print("5. Testing data outside target range (columns A-C, AB+)...")
-    unchanged_errors = 0
-
-    # Test columns A, B, C (before target range)
-    for col in range(1, start_col):
-        for row in random.sample(range(1, min(20, orig_rows + 1)), min(5, orig_rows)):
-            orig_val = original_sheet.cell(row=row, column=col).value
-            conv_val = converted_sheet.cell(row=row, column=col).value
-            if orig_val != conv_val:
-                unchanged_errors += 1
-                if unchanged_errors <= 3:
-                    print(f"   ❌ Unexpected change in column {chr(64+col)}: '{orig_val}' -> '{conv_val}'")
-
-    # Test columns after AA (if any exist)
-    if orig_cols > end_col:
-        for col in range(end_col + 1, min(end_col + 5, orig_cols + 1)):
-            for row in random.sample(range(1, min(20, orig_rows + 1)), min(5, orig_rows)):
-                orig_val = original_sheet.cell(row=row, column=col).value
-                conv_val = converted_sheet.cell(row=row, column=col).value
-                if orig_val != conv_val:
-                    unchanged_errors += 1
-                    if unchanged_errors <= 3:
-                        col_name = ""
-                        if col <= 26:
-                            col_name = chr(64 + col)
-                        else:
-                            col_name = chr(64 + (col - 1) // 26) + chr(64 + ((col - 1) % 26) + 1)
-                        print(f"   ❌ Unexpected change in column {col_name}: '{orig_val}' -> '{conv_val}'")
+    print("5. Testing data outside the target columns...")
+    unchanged_errors = result.outside_range_errors
+
+    shown = 0
+    for issue in result.error_samples:
+        if issue['kind'] == 'outside_range_changed' and shown < 3:
+            shown += 1
+            print(f"   ❌ Unexpected change in column {column_letter(issue['column'])}: "
+                  f"'{issue['original']}' -> '{issue['converted']}'")
 
     if unchanged_errors == 0:
         print("   ✅ Data outside target range unchanged")
@@ -151,46 +97,36 @@ def comprehensive_test():
     print("6. Testing performance and completeness...")
     target_cells = (end_col - start_col + 1) * (orig_rows - 1)  # Exclude header row
     print(f"   Target range contains {target_cells} cells to process")
+    print(f"   Validated {result.total_cells} target cells and {result.outside_cells} cells outside the range")
     print(f"   File dimensions: {orig_rows} rows x {orig_cols} columns")
+    if result.trimmed_cells:
+        print(f"   Skipped {result.trimmed_cells} blank target cells after the last row with data")
 
     # Test 7: Data integrity spot checks
     print("7. Performing data integrity spot checks...")
 
-    # Check some specific patterns
-    spot_check_passed = True
-
     # Check for any float values in converted data within target range
-    float_count = 0
-    for row in range(2, min(orig_rows + 1, 12)):  # Check first 10 data rows
-        for col in range(start_col, end_col + 1):
-            conv_val = converted_sheet.cell(row=row, column=col).value
-            if isinstance(conv_val, float):
-                float_count += 1
-                if float_count <= 3:
-                    print(f"   ⚠️ Float value found at {chr(64+col)}{row}: {conv_val}")
+    float_count = result.converted_floats
 
     if float_count == 0:
         print("   ✅ No unexpected float values found")
     else:
         print(f"   ⚠️ Found {float_count} float values (may be acceptable if they're whole numbers)")
 
-    workbook.close()
-
     # Final assessment
     print("\n" + "=" * 80)
     print("FINAL TEST RESULTS")
     print("=" * 80)
 
-    total_errors = (header_errors + test_results['type_errors'] +
-                   test_results['unexpected_changes'] + unchanged_errors)
+    total_errors = result.total_errors
 
     if total_errors == 0:
         print("🎉 ALL TESTS PASSED! The conversion was successful.")
         print("\nSummary:")
         print(f"✅ Headers preserved correctly")
-        print(f"✅ Numbers converted to integers: {test_results['numbers_converted']}")
-        print(f"✅ Missing data preserved: {test_results['missing_preserved']}")
-        print(f"✅ Decimal values processed: {test_results['decimal_removals']}")
+        print(f"✅ Numbers converted to integers: {result.converted_cells}")
+        print(f"✅ Missing data preserved: {result.preserved_missing}")
+        print(f"✅ Decimal values processed: {result.decimal_removals}")
         print(f"✅ Data outside target range unchanged")
         return True
     else:
@@ -198,27 +134,129 @@ def comprehensive_test():
         print("\nIssues found:")
         if header_errors > 0:
             print(f"❌ Header errors: {header_errors}")
-        if test_results['type_errors'] > 0:
-            print(f"❌ Type conversion errors: {test_results['type_errors']}")
-        if test_results['unexpected_changes'] > 0:
-            print(f"❌ Unexpected changes: {test_results['unexpected_changes']}")
+        if result.cell_errors > 0:
+            print(f"❌ Type conversion errors: {result.cell_errors}")
+        if result.unexpected_changes > 0:
+            print(f"❌ Unexpected changes: {result.unexpected_changes}")
         if unchanged_errors > 0:
             print(f"❌ Changes outside target range: {unchanged_errors}")
         return False
 
-if __name__ == "__main__":
-    try:
-        success = comprehensive_test()
+def format_rate(estimate):
+    """Format a (rate, low, high) estimate as percentages."""
+    rate, low, high = estimate
+    return f"{rate * 100:.3f}% (bounds {low * 100:.3f}% - {high * 100:.3f}%)"
 
-        print(f"\n{'='*80}")
-        if success:
-            print("🎉 CONVERSION VALIDATION: COMPLETE SUCCESS!")
-        else:
-            print("❌ CONVERSION VALIDATION: ISSUES FOUND!")
-        print(f"{'='*80}")
+def quick_check(file_path=DEFAULT_FILE_PATH, sample_rows=QUICK_SAMPLE_ROWS, seed=0, metrics=None,
+                columns=None, sheets=DEFAULT_SHEETS):
+    """
+    Pre-flight check of a stratified row sample, before the full validation.
+
+    Args:
+        file_path: Workbook holding the RawData and RawData_Numbers sheets
+        sample_rows: Number of data rows to check
+        seed: Random seed; the same seed checks the same rows
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default D:AA, or the category columns of a CSV file)
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        bool: True when the sample holds no errors
+    """
+    start_col, end_col = target_columns(file_path, columns)
+    print("QUICK CONVERSION CHECK (STRATIFIED SAMPLE)")
+    print("=" * 80)
 
-        input("\nPress Enter to exit...")
+    started = time.perf_counter()
+    check = run_quick_check(file_path, sample_rows, QUICK_BANDS, seed, start_col, end_col,
+                            original_name=sheets[0], converted_name=sheets[1], metrics=metrics)
+    elapsed = time.perf_counter() - started
+    result = check.validation
 
-    except Exception as e:
-        print(f"❌ Error during comprehensive testing: {str(e)}")
-        input("Press Enter to exit...")
+    if result.missing_sheets:
+        print(f"❌ Missing sheets: {', '.join(result.missing_sheets)}")
+        return False
+
+    sampling = "stratified" if check.stratified else "reservoir (row count unknown)"
+    print(f"Sampled {check.sampled_rows} of {check.total_rows - result.start_row + 1} data rows "
+          f"({sampling}, seed {seed}, {len(check.band_ranges)} row bands) in {elapsed:.2f}s")
+    print(f"Checked {check.checked_cells} target cells, {result.outside_cells} cells outside the range "
+          f"and {result.headers_checked} target headers")
+
+    print(f"\nEstimated cell error rate: {format_rate(check.estimate(check.error_cells, check.checked_cells))}")
+    if check.exhaustive:
+        print("   (every data row was checked, so the rate is exact)")
+    else:
+        print(f"   ({CONFIDENCE_LEVEL:.0%} Wilson bounds; a clean sample bounds the error rate, it does not rule errors out)")
+
+    print("\nBy row band:")
+    for band, (first, last) in enumerate(check.band_ranges):
+        errors, cells = check.band_errors[band], check.band_cells[band]
+        print(f"   Rows {first}-{last}: {errors}/{cells} cells, {format_rate(check.estimate(errors, cells))}")
+
+    print("\nBy column:")
+    failing = [col for col in sorted(check.column_cells) if check.column_errors[col]]
+    for col in failing:
+        errors, cells = check.column_errors[col], check.column_cells[col]
+        print(f"   ❌ {column_letter(col)}: {errors}/{cells} cells, {format_rate(check.estimate(errors, cells))}")
+    if not failing and check.column_cells:
+        worst = max(check.estimate(0, cells)[2] for cells in check.column_cells.values())
+        print(f"   ✅ No errors in any column (per-column upper bound {worst * 100:.3f}%)")
+
+    if result.error_samples:
+        print("\nFirst issues found:")
+        for issue in result.error_samples[:10]:
+            print(f"   {issue['kind']} at {column_letter(issue['column'])}{issue['row']}: "
+                  f"'{issue['original']}' -> '{issue['converted']}'")
+    if result.original_rows != result.converted_rows:
+        print(f"\n❌ Row count mismatch: {result.original_rows} vs {result.converted_rows}")
+
+    print("\n" + "=" * 80)
+    if result.total_errors == 0 and result.original_rows == result.converted_rows:
+        print("✅ QUICK CHECK PASSED - run the full test suite for a complete answer")
+        return True
+    print(f"❌ QUICK CHECK FAILED: {result.total_errors} errors in the sample")
+    return False
+
+if __name__ == "__main__":
+    # Usage: python comprehensive_test.py [--quick [--sample N] [--seed N]]
+    #                                     [--columns D:AA] [--metrics FILE | -] [--non-interactive] [workbook]
+    args, options = parse_script_options(sys.argv[1:])
+    quick = "--quick" in args
+    if quick:
+        args.remove("--quick")
+    quick_options = {'sample_rows': QUICK_SAMPLE_ROWS, 'seed': 0}
+    for flag, key in (("--sample", 'sample_rows'), ("--seed", 'seed')):
+        if flag in args:
+            position = args.index(flag)
+            quick_options[key] = int(args[position + 1])
+            del args[position:position + 2]
+    run_metrics = Metrics("comprehensive_test", args[0] if args else DEFAULT_FILE_PATH)
+
+    with report_stream(options):
+        try:
+            with run_metrics.phase("report"):
+                if quick:
+                    success = quick_check(*args[:1], metrics=run_metrics, columns=options['columns'], **quick_options)
+                else:
+                    success = comprehensive_test(*args[:1], metrics=run_metrics, columns=options['columns'])
+
+            print(f"\n{'='*80}")
+            if success:
+                print("🎉 CONVERSION VALIDATION: COMPLETE SUCCESS!")
+                status = "passed"
+            else:
+                print("❌ CONVERSION VALIDATION: ISSUES FOUND!")
+                status = "failed"
+            print(f"{'='*80}")
+
+            wait_for_exit(options, "\nPress Enter to exit...")
+
+        except Exception as e:
+            print(f"❌ Error during comprehensive testing: {str(e)}")
+            status = "error"
+            wait_for_exit(options)
+
+    if options['metrics']:
+        run_metrics.emit(options['metrics'], status=status)
+    sys.exit(0 if status == "passed" else 1)
@@ -1,6 +1,34 @@
-import openpyxl
-from openpyxl import load_workbook
+import difflib
+import hashlib
+import itertools
+import json
+import os
 import re
+import sys
+import tempfile
+import time
+
+from instrumentation import (Metrics, ProgressReporter, parse_script_options, peak_rss_mb,
+                             report_stream, wait_for_exit)
+from xlsx_reader import XlsxValueReader, column_letter, parse_columns
+
+DEFAULT_FILE_PATH = r"d:\Anant\VSCodeProjects\Temp_projects\ToNumber.xlsx"
+
+# Columns converted and checked by every script (the category cutoff ranks)
+DEFAULT_COLUMNS = "D:AA"
+
+# Source sheet and the sheet holding its converted copy
+DEFAULT_SHEETS = ("RawData", "RawData_Numbers")
+
+# Category headers of columns D:AA in the cutoff sheets
+CATEGORY_HEADERS = ["GM", "GMK", "GMR", "1G", "1K", "1R", "2AG", "2AK", "2AR", "2BG", "2BK", "2BR",
+                    "3AG", "3AK", "3AR", "3BG", "3BK", "3BR", "SCG", "SCK", "SCR", "STG", "STK", "STR"]
+
+# Cell values (after strip) that mean "no cutoff for this category"
+MISSING_DATA_VALUES = ["--", " --", "-- ", " -- ", "", "N/A", "NA", "n/a"]
+
+# Rows buffered per call to the vectorized converter in streaming mode
+STREAM_CHUNK_ROWS = 5000
 
 def convert_to_number(value):
     """
@@ -19,7 +47,7 @@ def convert_to_number(value):
     str_value = str(value).strip()
 
     # Check for missing data indicators
-    if str_value in ["--", " --", "-- ", " -- ", "", "N/A", "NA", "n/a"]:
+    if str_value in MISSING_DATA_VALUES:
         return ""
 
     # Try to convert to number
@@ -37,66 +65,794 @@ def convert_to_number(value):
         # If conversion fails, return the original value
         return value
 
-def process_excel_file():
+def trim_extent(start_col, end_col, start_row, last_row, last_col, declared_rows):
+    """
+    Combine a detected data extent with the target range.
+
+    Args:
+        start_col, end_col: Target column range from the column spec
+        start_row: First data row
+        last_row: Last row holding a value
+        last_col: Last target column holding a value (0 = none)
+        declared_rows: Row count the sheet declares (what max_row reports)
+
+    Returns:
+        dict with start_col, end_col (cut back to last_col), last_row,
+        declared_rows and trimmed_cells, the target cells of the declared
+        range that lie past the detected extent
+    """
+    width = end_col - start_col + 1
+    trimmed_end = min(end_col, last_col) if last_col >= start_col else start_col - 1
+    declared_cells = max(0, declared_rows - start_row + 1) * width
+    kept_cells = max(0, last_row - start_row + 1) * (trimmed_end - start_col + 1)
+    return {
+        'start_col': start_col,
+        'end_col': trimmed_end,
+        'last_row': last_row,
+        'declared_rows': declared_rows,
+        'trimmed_cells': max(0, declared_cells - kept_cells),
+    }
+
+def detect_extent(file_path, sheet_names=("RawData",), columns=DEFAULT_COLUMNS, start_row=2):
     """
-    Process the Excel file to convert columns D to AA from row 2 onwards to numbers.
+    Find where the data really ends, ignoring blank cells left behind by formatting.
+
+    A sheet's declared dimension (openpyxl's max_row) grows with every
+    formatted cell, so it can declare far more rows than it holds. One
+    pass over the sheet XML finds the last row holding a value and the
+    last target column holding one.
+
+    Args:
+        file_path: Workbook to scan
+        sheet_names: Sheets to look for, in order; the first one that exists is scanned
+        columns: Target column spec, e.g. "D:AA"
+        start_row: First data row
+
+    Returns:
+        dict as returned by trim_extent
+    """
+    start_col, end_col = parse_columns(columns)
+    with XlsxValueReader(file_path) as reader:
+        name = next((name for name in sheet_names if name in reader.sheetnames), None)
+        if name is None:
+            raise KeyError(f"None of the sheets {', '.join(sheet_names)} found")
+        last_row, last_col = reader.extent(name, start_col, end_col)
+        dimension = reader.dimension(name)
+    declared_rows = dimension[3] if dimension else last_row
+    return trim_extent(start_col, end_col, start_row, last_row, last_col, declared_rows)
+
+def is_blank_row(values):
+    """Check if no cell of a row holds a value (None and "" count as empty)."""
+    return all(value is None or value == "" for value in values)
+
+def drop_blank_tail(rows, trimmed, is_blank=is_blank_row):
     """
-    file_path = r"d:\Anant\VSCodeProjects\Temp_projects\ToNumber.xlsx"
+    Yield rows, leaving out the blank rows after the last row with a value.
+
+    Blank rows are held back until a row with a value follows them, so the
+    rows that only carry formatting past the data are never passed on and
+    no separate pass is needed to find where the data ends. Held rows are
+    kept run-length encoded, so a long blank tail costs no memory.
+
+    Args:
+        rows: Iterable of rows
+        trimmed: dict whose 'rows' entry is increased by the rows left out
+        is_blank: Callable telling whether a row is blank
+    """
+    held = []  # [row, count] runs of blank rows
+    for values in rows:
+        if not is_blank(values):
+            for blank, count in held:
+                for _ in range(count):
+                    yield blank
+            held.clear()
+            yield values
+        elif held and held[-1][0] == values:
+            held[-1][1] += 1
+        else:
+            held.append([values, 1])
+    trimmed['rows'] = trimmed.get('rows', 0) + sum(count for _, count in held)
+
+def describe_columns(start_col, end_col):
+    """Column range as text, e.g. "D to AA"."""
+    if end_col < start_col:
+        return f"none (no values from column {column_letter(start_col)} on)"
+    return f"{column_letter(start_col)} to {column_letter(end_col)}"
+
+def print_extent(extent):
+    """Print the detected data extent and how many blank cells it skips."""
+    print(f"Data extent: rows up to {extent['last_row']} (declared {extent['declared_rows']}), "
+          f"columns {describe_columns(extent['start_col'], extent['end_col'])}; "
+          f"{extent['trimmed_cells']} blank target cells skipped")
+
+def print_run_report(stats):
+    """Print rows/sec and peak memory for a finished conversion run."""
+    print(f"Mode: {stats['mode']}")
+    print(f"Rows processed: {stats['rows']} in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:.0f} rows/sec)")
+    if stats['peak_rss_mb'] is None:
+        print("Peak RSS: n/a on this platform")
+    else:
+        print(f"Peak RSS: {stats['peak_rss_mb']:.1f} MB")
+    if stats.get('phases'):
+        print("Phases: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats['phases'].items()))
+    if stats.get('bytes') and stats['seconds']:
+        print(f"Read {stats['bytes'] / 1e6:.1f} MB at {stats['bytes'] / 1e6 / stats['seconds']:.1f} MB/s")
+    if 'trimmed_cells' in stats:
+        print(f"Blank cells past the data extent skipped: {stats['trimmed_cells']}")
+
+def atomic_replace(write, file_path):
+    """
+    Write a file through a temporary file in the same directory, then rename it into place.
+
+    The temporary file is flushed to disk before the rename, so file_path
+    holds either its old content or the complete new one, never a partial
+    write, even if the process dies half way.
+
+    Args:
+        write: Callable that writes the new content to the path it is given
+        file_path: File to create or replace
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    os.close(handle)
+    try:
+        write(temp_path)
+        # mkstemp creates the file private; give it the permissions a plain write would have
+        if os.path.exists(file_path):
+            mode = os.stat(file_path).st_mode & 0o7777
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_path, mode)
+        with open(temp_path, "rb+") as written:
+            os.fsync(written.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def atomic_save(workbook, file_path):
+    """Save an openpyxl workbook so that file_path is never left half written (see atomic_replace)."""
+    atomic_replace(workbook.save, file_path)
+
+def atomic_write_json(document, file_path):
+    """Write a JSON document so that file_path is never left half written (see atomic_replace)."""
+    def write(path):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(document, handle)
+    atomic_replace(write, file_path)
+
+def count_converted(metrics, original_values, converted_values):
+    """Fold converted cells (one row or many) into the cells_converted / missing_tokens counters."""
+    missing_tokens = cells_converted = 0
+    for original_value, converted_value in zip(original_values, converted_values):
+        if converted_value == "":
+            if original_value is not None and original_value != "":
+                missing_tokens += 1
+        elif converted_value is not original_value and type(converted_value) is int:
+            cells_converted += 1
+    metrics.count('missing_tokens', missing_tokens)
+    metrics.count('cells_converted', cells_converted)
+
+def process_excel_file(file_path=DEFAULT_FILE_PATH, metrics=None, columns=DEFAULT_COLUMNS, sheets=DEFAULT_SHEETS):
+    """
+    Process the Excel file to convert the target columns from row 2 onwards to numbers.
+
+    Only rows and target columns up to the detected data extent are
+    visited (see detect_extent).
+
+    Args:
+        file_path: Workbook to convert in place
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA")
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        dict with the run statistics (mode, output_path, rows, cells, seconds,
+        rows_per_sec, peak_rss_mb, phases, trimmed_cells)
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    started = time.perf_counter()
+    start_row = 2
+    source_name, numbers_name = sheets
+
+    with metrics.phase("extent"):
+        # The sheet that gets converted: an earlier RawData_Numbers, or the copy of RawData
+        extent = detect_extent(file_path, (numbers_name, source_name), columns, start_row)
+    print_extent(extent)
+    metrics.count('cells_trimmed', extent['trimmed_cells'])
 
     print("Loading Excel file...")
-    workbook = load_workbook(file_path)
+    with metrics.phase("load"):
+        # Imported here so the CSV, table and checker paths start without openpyxl
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path)
 
     # Check if RawData_Numbers sheet exists, if not copy from RawData
-    if "RawData_Numbers" not in workbook.sheetnames:
-        print("Creating RawData_Numbers sheet by copying RawData...")
-        source_sheet = workbook["RawData"]
+    if numbers_name not in workbook.sheetnames:
+        print(f"Creating {numbers_name} sheet by copying {source_name}...")
+        source_sheet = workbook[source_name]
         target_sheet = workbook.copy_worksheet(source_sheet)
-        target_sheet.title = "RawData_Numbers"
+        target_sheet.title = numbers_name
     else:
-        print("Using existing RawData_Numbers sheet...")
-        target_sheet = workbook["RawData_Numbers"]
-
-    # Define the range to process (columns D to AA, rows 2 to last row)
-    start_col = 4  # Column D
-    end_col = 27   # Column AA
-    start_row = 2
+        print(f"Using existing {numbers_name} sheet...")
+        target_sheet = workbook[numbers_name]
 
-    # Find the last row with data
-    last_row = target_sheet.max_row
-    print(f"Processing data from row {start_row} to {last_row}, columns D to AA")
+    # Range to process: target columns, rows 2 to the last row holding data
+    start_col = extent['start_col']
+    end_col = extent['end_col']
+    last_row = extent['last_row']
+    print(f"Processing data from row {start_row} to {last_row}, columns {describe_columns(start_col, end_col)}")
 
     # Process each cell in the specified range
     total_cells = (end_col - start_col + 1) * (last_row - start_row + 1)
     processed_cells = 0
+    written_cells = 0
+    progress = ProgressReporter("cells", total_cells)
 
-    for row in range(start_row, last_row + 1):
-        for col in range(start_col, end_col + 1):
-            cell = target_sheet.cell(row=row, column=col)
-            original_value = cell.value
-            converted_value = convert_to_number(original_value)
+    with metrics.phase("convert"):
+        for row in range(start_row, last_row + 1):
+            for col in range(start_col, end_col + 1):
+                cell = target_sheet.cell(row=row, column=col)
+                original_value = cell.value
+                converted_value = convert_to_number(original_value)
 
-            # Only update if the value changed
-            if converted_value != original_value:
-                cell.value = converted_value
+                # Only update if the value changed
+                if converted_value != original_value:
+                    cell.value = converted_value
+                    written_cells += 1
+                    if converted_value == "":
+                        if original_value is not None:
+                            metrics.count('missing_tokens')
+                    elif type(converted_value) is int:
+                        metrics.count('cells_converted')
 
-            processed_cells += 1
+                processed_cells += 1
 
-            # Progress indicator
-            if processed_cells % 1000 == 0:
-                progress = (processed_cells / total_cells) * 100
-                print(f"Progress: {progress:.1f}% ({processed_cells}/{total_cells} cells)")
+            progress.update(processed_cells)
+
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_written', written_cells)
 
     print("Saving the updated Excel file...")
-    workbook.save(file_path)
-    workbook.close()
+    with metrics.phase("save"):
+        atomic_save(workbook, file_path)
+        workbook.close()
+
+    elapsed = time.perf_counter() - started
+    rows = max(0, last_row - start_row + 1)
 
     print("Conversion completed successfully!")
     print(f"Total cells processed: {processed_cells}")
     print(f"File saved: {file_path}")
 
-if __name__ == "__main__":
+    stats = {
+        'mode': 'full',
+        'output_path': file_path,
+        'rows': rows,
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'trimmed_cells': extent['trimmed_cells'],
+    }
+    return stats
+
+def default_streaming_output(file_path):
+    """Return the default output path for streaming mode (<name>_Numbers.xlsx)."""
+    root, ext = os.path.splitext(file_path)
+    return f"{root}_Numbers{ext or '.xlsx'}"
+
+def process_excel_file_streaming(file_path=DEFAULT_FILE_PATH, output_path=None, metrics=None,
+                                 columns=DEFAULT_COLUMNS, sheets=DEFAULT_SHEETS):
+    """
+    Convert the target columns in constant memory.
+
+    RawData is read with a read-only workbook one row at a time and the
+    converted rows are written through a write-only workbook, so memory use
+    does not grow with the number of rows. Because the source cannot be
+    rewritten while it is being streamed, the result is saved to a new file
+    holding every source sheet (values only) plus a freshly built
+    RawData_Numbers sheet placed right after RawData. Blank rows after the
+    last row with a value are left out of both (see drop_blank_tail).
+
+    Args:
+        file_path: Workbook containing the RawData sheet
+        output_path: Where to save the result (default: <name>_Numbers.xlsx)
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA")
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        dict with the run statistics (mode, output_path, rows, cells, seconds,
+        rows_per_sec, peak_rss_mb, phases, trimmed_cells)
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if output_path is None:
+        output_path = default_streaming_output(file_path)
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError("Streaming mode cannot overwrite the workbook it is reading")
+
+    start_col, end_col = parse_columns(columns)
+    start_row = 2
+    source_name, numbers_name = sheets
+    started = time.perf_counter()
+
+    print("Opening Excel file in read-only mode...")
+    with metrics.phase("load"):
+        from openpyxl import Workbook, load_workbook
+        source = load_workbook(file_path, read_only=True)
+    if source_name not in source.sheetnames:
+        source.close()
+        raise KeyError(f"{source_name} sheet not found")
+
+    output = Workbook(write_only=True)
+    sheet_order = [name for name in source.sheetnames if name != numbers_name]
+    targets = {}
+    for name in sheet_order:
+        targets[name] = output.create_sheet(name)
+        if name == source_name:
+            targets[numbers_name] = output.create_sheet(numbers_name)
+
+    # Pass-through copies of every other sheet
+    with metrics.phase("copy"):
+        for name in sheet_order:
+            if name == source_name:
+                continue
+            for values in source[name].iter_rows(values_only=True):
+                targets[name].append(values)
+
+    print(f"Streaming {source_name}, converting columns {describe_columns(start_col, end_col)} from row {start_row}")
+
+    # Imported here: batch_convert builds on this module's scalar converter
+    from batch_convert import convert_rows
+
+    raw_target = targets[source_name]
+    numbers_target = targets[numbers_name]
+    rows = 0
+    processed_cells = 0
+    trimmed = {'rows': 0}
+    # The row count is unknown up front, so progress is reported in rows
+    progress = ProgressReporter("rows")
+    chunk = []
+
+    def flush_chunk():
+        for values, converted in zip(chunk, convert_rows(chunk, start_col, end_col)):
+            count_converted(metrics, values[start_col - 1:end_col], converted[start_col - 1:end_col])
+            numbers_target.append(converted)
+        chunk.clear()
+
+    with metrics.phase("convert"):
+        raw_rows = drop_blank_tail(source[source_name].iter_rows(values_only=True), trimmed)
+        for row_number, values in enumerate(raw_rows, start=1):
+            raw_target.append(values)
+
+            if row_number < start_row:
+                numbers_target.append(values)
+                continue
+
+            chunk.append(values)
+            processed_cells += max(0, min(end_col, len(values)) - start_col + 1)
+            rows += 1
+
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                flush_chunk()
+                progress.update(rows)
+
+        flush_chunk()
+        source.close()
+
+    trimmed_cells = trimmed['rows'] * (end_col - start_col + 1)
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_written', processed_cells)
+    metrics.count('cells_trimmed', trimmed_cells)
+
+    print(f"Saving converted workbook to {output_path}...")
+    with metrics.phase("save"):
+        atomic_save(output, output_path)
+
+    elapsed = time.perf_counter() - started
+
+    print("Conversion completed successfully!")
+    print(f"Total cells processed: {processed_cells}")
+    print(f"File saved: {output_path}")
+
+    return {
+        'mode': 'streaming',
+        'output_path': output_path,
+        'rows': rows,
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'trimmed_cells': trimmed_cells,
+    }
+
+def row_hash(values):
+    """Return a stable content hash for one row of cell values."""
+    return hashlib.blake2b(repr(tuple(values)).encode("utf-8"), digest_size=16).hexdigest()
+
+def default_manifest_path(file_path):
+    """Return the sidecar manifest path used by the incremental mode."""
+    return file_path + ".manifest.json"
+
+def load_manifest(manifest_path, start_col, end_col):
+    """
+    Load an incremental-conversion manifest.
+
+    Args:
+        manifest_path: Sidecar JSON file
+        start_col: First converted column the caller expects
+        end_col: Last converted column the caller expects
+
+    Returns:
+        list of {'hash', 'converted'} entries (one per data row), or an empty
+        list when the manifest is missing, unreadable or built for other columns
+    """
+    if not os.path.exists(manifest_path):
+        return []
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        print("Manifest is unreadable, converting every row...")
+        return []
+
+    if manifest.get('start_col') != start_col or manifest.get('end_col') != end_col:
+        print("Manifest was built for a different column range, converting every row...")
+        return []
+
+    return manifest.get('rows', [])
+
+def process_excel_file_incremental(file_path=DEFAULT_FILE_PATH, manifest_path=None, metrics=None,
+                                   columns=DEFAULT_COLUMNS, sheets=DEFAULT_SHEETS):
+    """
+    Re-convert only the RawData rows that changed since the previous run.
+
+    A sidecar manifest stores, per data row, a hash of the RawData row and
+    its converted D:AA values. The old and new hash sequences are aligned
+    by content (difflib.SequenceMatcher), so a row inserted or deleted
+    above others only shifts them: unchanged rows are skipped wherever they
+    moved to, and RawData_Numbers gets rows inserted, deleted or rewritten
+    only where the alignment found a change. A changed row whose content
+    already appears elsewhere in the manifest reuses the stored conversion.
+
+    Blank rows after the last row with a value are left out (see
+    drop_blank_tail), and so are dropped from RawData_Numbers.
+
+    Args:
+        file_path: Workbook to convert in place
+        manifest_path: Sidecar manifest (default: <workbook>.manifest.json)
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA")
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        dict with the run statistics, including skipped, updated, inserted
+        and deleted row counts
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if manifest_path is None:
+        manifest_path = default_manifest_path(file_path)
+
+    start_col, end_col = parse_columns(columns)
+    start_row = 2
+    source_name, numbers_name = sheets
+
+    started = time.perf_counter()
+    trimmed = {'rows': 0}
+
+    print("Loading Excel file...")
+    with metrics.phase("load"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path)
+        source_sheet = workbook[source_name]
+        previous = load_manifest(manifest_path, start_col, end_col)
+
+    if numbers_name not in workbook.sheetnames:
+        print(f"Creating {numbers_name} sheet...")
+        target_sheet = workbook.create_sheet(numbers_name, workbook.sheetnames.index(source_name) + 1)
+        # Without the sheet the manifest no longer describes anything
+        previous = []
+    else:
+        target_sheet = workbook[numbers_name]
+
+    if not previous:
+        # Start from a clean sheet so stale rows cannot survive a rebuild
+        target_sheet.delete_rows(1, target_sheet.max_row)
+
+    # Header row is always mirrored
+    for col, value in enumerate(next(source_sheet.iter_rows(max_row=1, values_only=True), ()), start=1):
+        target_sheet.cell(row=1, column=col).value = value
+
+    converted_by_hash = {entry['hash']: entry['converted'] for entry in previous
+                         if entry.get('converted') is not None}
+    width = target_sheet.max_column
+    counts = {'skipped': 0, 'updated': 0, 'inserted': 0, 'deleted': 0}
+    processed_cells = 0
+    progress = ProgressReporter("rows")
+
+    def write_row(row, source_row, content_hash):
+        nonlocal processed_cells
+        values = next(source_sheet.iter_rows(min_row=source_row, max_row=source_row, values_only=True))
+        target_values = list(values)
+        block = target_values[start_col - 1:end_col]
+        if content_hash in converted_by_hash and len(converted_by_hash[content_hash]) == len(block):
+            converted = converted_by_hash[content_hash]
+        else:
+            converted = [convert_to_number(value) for value in block]
+            processed_cells += len(block)
+            count_converted(metrics, block, converted)
+        target_values[start_col - 1:end_col] = converted
+
+        for col in range(1, max(width, len(target_values)) + 1):
+            value = target_values[col - 1] if col <= len(target_values) else None
+            target_sheet.cell(row=row, column=col).value = value
+        metrics.count('cells_written', len(block))
+
+        stored = converted if all(value is None or isinstance(value, (str, int, float)) for value in converted) else None
+        return {'hash': content_hash, 'converted': stored}
+
+    with metrics.phase("convert"):
+        hashes = []
+        data_rows = drop_blank_tail(source_sheet.iter_rows(min_row=start_row, values_only=True), trimmed)
+        for index, values in enumerate(data_rows):
+            progress.update(index)
+            metrics.count('cells_read', max(0, min(end_col, len(values)) - start_col + 1))
+            hashes.append(row_hash(values))
+
+        # Applied bottom-up, so the rows of a block are still at their old
+        # position while it is edited
+        matcher = difflib.SequenceMatcher(None, [entry['hash'] for entry in previous], hashes)
+        entries = [None] * len(hashes)
+        for tag, old_first, old_stop, new_first, new_stop in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                counts['skipped'] += old_stop - old_first
+                entries[new_first:new_stop] = previous[old_first:old_stop]
+                continue
+
+            row = start_row + old_first
+            kept = min(old_stop - old_first, new_stop - new_first)
+            if old_stop - old_first > kept:
+                target_sheet.delete_rows(row + kept, old_stop - old_first - kept)
+            if new_stop - new_first > kept:
+                target_sheet.insert_rows(row + kept, new_stop - new_first - kept)
+            counts['updated'] += kept
+            counts['deleted'] += old_stop - old_first - kept
+            counts['inserted'] += new_stop - new_first - kept
+            for offset, index in enumerate(range(new_first, new_stop)):
+                entries[index] = write_row(row + offset, start_row + index, hashes[index])
+
+    # Anything left below the data: stale rows the manifest did not know
+    # about, or formatting-only rows, which are not counted as deleted
+    last_row = start_row + len(entries) - 1
+    stale_rows = max(0, target_sheet.max_row - last_row)
+    if stale_rows:
+        counts['deleted'] += sum(1 for values in target_sheet.iter_rows(min_row=last_row + 1, values_only=True)
+                                 if any(value is not None for value in values))
+        target_sheet.delete_rows(last_row + 1, stale_rows)
+
+    trimmed_cells = trimmed['rows'] * (end_col - start_col + 1)
+    metrics.count('cells_trimmed', trimmed_cells)
+
+    changed = counts['updated'] + counts['inserted'] + counts['deleted']
+    with metrics.phase("save"):
+        if changed or stale_rows or len(entries) != len(previous):
+            print("Saving the updated Excel file...")
+            atomic_save(workbook, file_path)
+        else:
+            print("No changes since the last run, workbook left untouched")
+        workbook.close()
+
+        atomic_write_json({'start_col': start_col, 'end_col': end_col, 'rows': entries}, manifest_path)
+
+    elapsed = time.perf_counter() - started
+
+    print(f"Rows skipped: {counts['skipped']}, updated: {counts['updated']}, "
+          f"inserted: {counts['inserted']}, deleted: {counts['deleted']}")
+    print(f"Cells converted: {processed_cells}")
+    print(f"Manifest saved: {manifest_path}")
+
+    return {
+        'mode': 'incremental',
+        'output_path': file_path,
+        'rows': len(entries),
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': len(entries) / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'trimmed_cells': trimmed_cells,
+        **counts,
+    }
+
+def convert_to_table(file_path=DEFAULT_FILE_PATH, metrics=None, columns=None, sheets=DEFAULT_SHEETS):
+    """
+    Convert the target columns of RawData (or a CSV file) into a compact in-memory table.
+
+    Only the target columns are read (with the direct xlsx reader) and they
+    are converted in chunks of STREAM_CHUNK_ROWS by the batch converter,
+    with the same rules as convert_to_number. Nothing is written: the
+    result is a cutoff_table.RankBlock holding each column as int64 plus
+    a missing-value bitmap, instead of one Python object per cell. Blank
+    rows after the last row with a value are left out.
+
+    Args:
+        file_path: Workbook containing the RawData sheet, or a CSV file
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA", or the category
+            columns of a CSV file)
+        sheets: (source, converted) sheet names; only the source is read
+
+    Returns:
+        RankBlock with the sheet's row 1 as headers
+    """
+    # Imported here: these modules build on this one
+    from batch_convert import convert_block
+    from cutoff_table import RankBlockBuilder
+    from csv_pipeline import csv_target_columns, is_csv_path, iter_csv_rows, read_csv_header
+
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    start_row = 2
+    reader = None
+
+    with metrics.phase("load"):
+        if is_csv_path(file_path):
+            start_col, end_col = csv_target_columns(read_csv_header(file_path), columns)
+            rows = (values[start_col - 1:end_col] for values in iter_csv_rows(file_path))
+        else:
+            start_col, end_col = parse_columns(columns or DEFAULT_COLUMNS)
+            reader = XlsxValueReader(file_path)
+            if sheets[0] not in reader.sheetnames:
+                reader.close()
+                raise KeyError(f"{sheets[0]} sheet not found")
+            rows = reader.iter_rows(sheets[0], min_col=start_col, max_col=end_col)
+
+    print(f"Converting columns {describe_columns(start_col, end_col)} of {file_path} into a compact table")
+    width = end_col - start_col + 1
+    trimmed = {'rows': 0}
+    progress = ProgressReporter("rows")
+    processed_cells = 0
+
     try:
-        process_excel_file()
-    except Exception as e:
-        print(f"Error occurred: {str(e)}")
-        input("Press Enter to exit...")
+        with metrics.phase("convert"):
+            rows = drop_blank_tail(rows, trimmed)
+            header = list(next(rows, ()))
+            header += [None] * (width - len(header))
+            builder = RankBlockBuilder([str(value).strip() if value not in (None, "") else column_letter(col)
+                                        for col, value in enumerate(header, start=start_col)], start_col)
+            chunk = []
+            first_row = start_row
+
+            def flush_chunk():
+                padded = [list(values) + [None] * (width - len(values)) for values in chunk]
+                converted = convert_block(padded).tolist() if padded else []
+                count_converted(metrics, itertools.chain.from_iterable(padded),
+                                itertools.chain.from_iterable(converted))
+                builder.append(converted, first_row)
+
+            for values in rows:
+                chunk.append(values)
+                processed_cells += len(values)
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    flush_chunk()
+                    first_row += len(chunk)
+                    chunk = []
+                    progress.update(first_row - start_row)
+            flush_chunk()
+            table = builder.build()
+    finally:
+        if reader is not None:
+            reader.close()
+
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_trimmed', trimmed['rows'] * width)
+    return table
+
+# Modes of convert_file (and of the --stream/--pipeline/--incremental/--table/--checkpoint flags)
+CONVERT_MODES = ("full", "stream", "pipeline", "incremental", "table", "checkpoint")
+
+def convert_file(file_path=DEFAULT_FILE_PATH, mode="full", output_path=None, metrics=None, columns=None,
+                 sheets=DEFAULT_SHEETS, workers=None):
+    """
+    Run one conversion mode and return its run statistics.
+
+    A .csv file_path goes through the CSV pipeline in every mode but table.
+
+    Args:
+        file_path: Workbook (or CSV file) to convert
+        mode: One of CONVERT_MODES
+        output_path: Output file (stream, pipeline, checkpoint and CSV) or
+            manifest (incremental); the full mode converts in place and takes none
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA", or the category columns of a CSV file)
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+        workers: Converter processes for the pipeline mode
+
+    Returns:
+        dict with the run statistics (see print_run_report); the table mode
+        adds table_bytes
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if mode not in CONVERT_MODES:
+        raise ValueError(f"Unknown mode {mode} (expected one of {', '.join(CONVERT_MODES)})")
+
+    if file_path.lower().endswith(".csv") and mode == "checkpoint":
+        from checkpointed_convert import process_csv_file_checkpointed
+        return process_csv_file_checkpointed(file_path, output_path, columns=columns, metrics=metrics)
+    if file_path.lower().endswith(".csv") and mode != "table":
+        from csv_pipeline import process_csv_file
+        return process_csv_file(file_path, output_path, columns=columns, metrics=metrics)
+    if mode == "table":
+        from cutoff_table import print_footprint
+        started = time.perf_counter()
+        table = convert_to_table(file_path, metrics=metrics, columns=columns, sheets=sheets)
+        elapsed = time.perf_counter() - started
+        print_footprint(table)
+        return {
+            'mode': 'table',
+            'output_path': None,
+            'rows': table.rows,
+            'cells': table.rows * table.width,
+            'seconds': elapsed,
+            'rows_per_sec': table.rows / elapsed if elapsed else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': dict(metrics.phases),
+            'table_bytes': table.nbytes,
+        }
+
+    columns = columns or DEFAULT_COLUMNS
+    if mode == "stream":
+        return process_excel_file_streaming(file_path, output_path, metrics=metrics, columns=columns, sheets=sheets)
+    if mode == "pipeline":
+        from pipelined_convert import DEFAULT_WORKERS, process_excel_file_pipelined
+        return process_excel_file_pipelined(file_path, output_path, workers or DEFAULT_WORKERS, metrics=metrics,
+                                            columns=columns, sheets=sheets)
+    if mode == "checkpoint":
+        from checkpointed_convert import process_excel_file_checkpointed
+        return process_excel_file_checkpointed(file_path, output_path, metrics=metrics, columns=columns,
+                                               sheets=sheets)
+    if mode == "incremental":
+        return process_excel_file_incremental(file_path, output_path, metrics=metrics, columns=columns,
+                                              sheets=sheets)
+    if output_path is not None:
+        raise ValueError("The full mode converts the workbook in place; use the stream mode to write another file")
+    return process_excel_file(file_path, metrics=metrics, columns=columns, sheets=sheets)
+
+if __name__ == "__main__":
+    # Usage: python convert_to_numbers.py [--stream | --pipeline | --incremental | --table | --checkpoint]
+    #                                     [--metrics FILE | -]
+    #                                     [--non-interactive] [--columns D:AA] [workbook] [output | manifest]
+    #        python convert_to_numbers.py [--columns GM:STR] [options] source.csv [output.csv]
+    args, options = parse_script_options(sys.argv[1:])
+    mode = "full"
+    for flag in ("--stream", "--pipeline", "--incremental", "--table", "--checkpoint"):
+        if flag in args:
+            args.remove(flag)
+            mode = flag[2:]
+    run_metrics = Metrics("convert_to_numbers", args[0] if args else DEFAULT_FILE_PATH)
+    takes_output = mode in ("stream", "pipeline", "incremental", "checkpoint") or (args and args[0].lower().endswith(".csv"))
+
+    with report_stream(options):
+        try:
+            run_stats = convert_file(args[0] if args else DEFAULT_FILE_PATH, mode,
+                                     args[1] if takes_output and len(args) > 1 else None,
+                                     metrics=run_metrics, columns=options['columns'])
+            print_run_report(run_stats)
+            status = "ok"
+        except Exception as e:
+            print(f"Error occurred: {str(e)}")
+            run_metrics.count('errors')
+            run_stats = {'error': str(e)}
+            status = "error"
+            wait_for_exit(options)
+
+    if options['metrics']:
+        run_metrics.emit(options['metrics'], status=status, result=run_stats)
+    sys.exit(0 if status == "ok" else 1)
@@ -0,0 +1,171 @@
+import csv
+import itertools
+import os
+import re
+import sys
+import time
+
+from convert_to_numbers import (CATEGORY_HEADERS, DEFAULT_COLUMNS, STREAM_CHUNK_ROWS, count_converted,
+                                default_streaming_output, describe_columns, print_run_report)
+from instrumentation import Metrics, ProgressReporter, peak_rss_mb
+from xlsx_reader import column_index, parse_columns
+
+# Bytes buffered by the CSV reader and writer between calls to the OS
+CSV_BUFFER_BYTES = 1024 * 1024
+
+# CSV text that Excel would have stored as a number
+INT_TEXT = re.compile(r"-?[0-9]+")
+FLOAT_TEXT = re.compile(r"-?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))(?:[eE][-+]?[0-9]+)?")
+NUMBER_START = frozenset("-.0123456789")
+
+def is_csv_path(file_path):
+    """Check if a path names a CSV file rather than a workbook."""
+    return str(file_path).lower().endswith(".csv")
+
+def csv_value(text):
+    """
+    Type one CSV field the way a spreadsheet would read it.
+
+    Empty fields become None and plain integer or decimal text becomes int
+    or float. Everything else, including "23,274", " 12" and "N/A", stays
+    text, so the validators see the same shapes they see in a workbook.
+    """
+    if not text:
+        return None
+    if text[0] not in NUMBER_START:
+        return text
+    if text.isdigit() and text.isascii():
+        return int(text)
+    if INT_TEXT.fullmatch(text):
+        return int(text)
+    if FLOAT_TEXT.fullmatch(text):
+        return float(text)
+    return text
+
+def iter_csv_rows(file_path):
+    """Yield the rows of a CSV file as tuples of typed values (see csv_value)."""
+    with open(file_path, newline="", encoding="utf-8-sig", buffering=CSV_BUFFER_BYTES) as handle:
+        for row in csv.reader(handle):
+            yield tuple(map(csv_value, row))
+
+def read_csv_header(file_path):
+    """Return the first row of a CSV file as a list of names."""
+    with open(file_path, newline="", encoding="utf-8-sig") as handle:
+        return next(csv.reader(handle), [])
+
+def csv_target_columns(header, spec=None):
+    """
+    Resolve a target column spec against a CSV header.
+
+    Each end of "first:last" is a header name ("GM:STR") or column letters
+    ("D:AA"); a name that is in the header wins. Without a spec the run of
+    category columns (GM ... STR) found in the header is used, or D:AA when
+    the header holds none.
+
+    Returns:
+        (start_col, end_col), 1-based and inclusive
+    """
+    positions = {name.strip(): index + 1 for index, name in reversed(list(enumerate(header)))}
+    if spec is None:
+        found = [positions[name] for name in CATEGORY_HEADERS if name in positions]
+        if found:
+            return min(found), max(found)
+        return parse_columns(DEFAULT_COLUMNS)
+
+    first, _, last = spec.partition(":")
+    bounds = []
+    for end in (first.strip(), (last or first).strip()):
+        bounds.append(positions[end] if end in positions else column_index(end))
+    return bounds[0], bounds[1]
+
+def process_csv_file(file_path, output_path=None, columns=None, metrics=None):
+    """
+    Convert the target columns of a CSV file into a new CSV file, in constant memory.
+
+    Rows are read with the csv module and converted in chunks of
+    STREAM_CHUNK_ROWS by the batch converter, with the same rules as
+    convert_to_number. Every other field is written back exactly as read,
+    and missing-data markers become empty fields.
+
+    Args:
+        file_path: CSV file to convert (row 1 holds the headers)
+        output_path: Where to write the result (default: <name>_Numbers.csv)
+        columns: Target column spec, see csv_target_columns
+        metrics: Optional Metrics to record phases and counters in
+
+    Returns:
+        dict with the run statistics (mode, output_path, rows, cells, seconds,
+        rows_per_sec, peak_rss_mb, phases) plus bytes, the size of the source
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if output_path is None:
+        output_path = default_streaming_output(file_path)
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError("CSV mode cannot overwrite the file it is reading")
+
+    # Imported here: batch_convert builds on convert_to_numbers' scalar converter
+    from batch_convert import convert_rows
+
+    started = time.perf_counter()
+    rows = 0
+    processed_cells = 0
+    progress = ProgressReporter("rows")
+    chunk = []
+
+    with open(file_path, newline="", encoding="utf-8-sig", buffering=CSV_BUFFER_BYTES) as source, \
+            open(output_path, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_BYTES) as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{file_path} is empty")
+        start_col, end_col = csv_target_columns(header, columns)
+        writer.writerow(header)
+        print(f"Streaming {file_path}, converting columns {describe_columns(start_col, end_col)} "
+              f"({', '.join(header[start_col - 1:end_col])}) from row 2")
+
+        def flush_chunk():
+            converted_rows = convert_rows(chunk, start_col, end_col)
+            count_converted(metrics,
+                            itertools.chain.from_iterable(values[start_col - 1:end_col] for values in chunk),
+                            itertools.chain.from_iterable(values[start_col - 1:end_col] for values in converted_rows))
+            writer.writerows(converted_rows)
+            chunk.clear()
+
+        with metrics.phase("convert"):
+            for values in reader:
+                chunk.append(values)
+                processed_cells += max(0, min(end_col, len(values)) - start_col + 1)
+                rows += 1
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    flush_chunk()
+                    progress.update(rows)
+            flush_chunk()
+
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_written', processed_cells)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(file_path)
+
+    print("Conversion completed successfully!")
+    print(f"Total cells processed: {processed_cells}")
+    print(f"File saved: {output_path}")
+
+    return {
+        'mode': 'csv',
+        'output_path': output_path,
+        'rows': rows,
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'bytes': size,
+    }
+
+if __name__ == "__main__":
+    # Usage: python csv_pipeline.py source.csv [output.csv] [columns, e.g. GM or D:AA]
+    args = sys.argv[1:]
+    run_stats = process_csv_file(args[0], args[1] if len(args) > 1 else None, args[2] if len(args) > 2 else None)
+    print_run_report(run_stats)
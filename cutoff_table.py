@@ -0,0 +1,449 @@
+import sys
+import time
+
+import numpy as np
+
+from convert_to_numbers import DEFAULT_FILE_PATH, drop_blank_tail, is_blank_row
+from xlsx_reader import column_index, column_letter
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+class RankRow:
+    """
+    Light view of one row of a RankBlock; nothing is copied until a value is read.
+
+    Index it with a header name ("GM"), a column letter ("D") or a position
+    in the table (0 = first target column). Missing cells read as None.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def row(self):
+        """Sheet row number of this row."""
+        return int(self.table.row_numbers[self.index])
+
+    def __getitem__(self, key):
+        return self.table.value(self.table.position(key), self.index)
+
+    def __len__(self):
+        return self.table.width
+
+    def __iter__(self):
+        return (self.table.value(position, self.index) for position in range(self.table.width))
+
+    def values(self):
+        """The row's values as a tuple (None for missing cells)."""
+        return tuple(self)
+
+    def __repr__(self):
+        return f"RankRow(row={self.row}, values={self.values()!r})"
+
+class RankBlock:
+    """
+    Compact in-memory copy of the converted target columns (D:AA by default).
+
+    values is a (columns x rows) int64 array, so every column is contiguous
+    and costs 8 bytes per cell. missing is the packed bitmap of the cells
+    without an integer (the "" and None cells, 1 bit each); the rare cells
+    holding anything else (text the converter left alone) also have their
+    missing bit set and are kept in the others dict, keyed by
+    (position, row index). row_numbers holds the sheet row of every row.
+
+    Column selections share values with the table they came from; row
+    filters copy only the rows they keep. start_col is None for a selection
+    of scattered columns, which can then only be indexed by header name.
+    """
+
+    def __init__(self, headers, start_col, values, missing, row_numbers, others=None):
+        self.headers = list(headers)
+        self.start_col = start_col
+        self.values = values
+        self.missing = missing
+        self.row_numbers = row_numbers
+        self.others = others or {}
+
+    @property
+    def width(self):
+        return self.values.shape[0]
+
+    @property
+    def rows(self):
+        return len(self.row_numbers)
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        return (RankRow(self, index) for index in range(self.rows))
+
+    def row(self, index):
+        """Return a RankRow view of row index (0-based, negative counts from the end)."""
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError("row index out of range")
+        return RankRow(self, index)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays (the others dict is not counted)."""
+        return self.values.nbytes + self.missing.nbytes + self.row_numbers.nbytes
+
+    def position(self, key):
+        """
+        Turn a column key into a position in the table.
+
+        Args:
+            key: Header name ("GM"), column letters ("D") or an int position;
+                a header name wins over the same letters
+        """
+        if isinstance(key, int):
+            if not -self.width <= key < self.width:
+                raise KeyError(f"Column position {key} out of range")
+            return key % self.width
+        if key in self.headers:
+            return self.headers.index(key)
+        if self.start_col is None:
+            raise KeyError(f"Column {key} not in the table")
+        try:
+            position = column_index(key) - self.start_col
+        except ValueError:
+            position = -1
+        if not 0 <= position < self.width:
+            raise KeyError(f"Column {key} not in the table")
+        return position
+
+    def missing_mask(self, key):
+        """Return a bool array telling which rows of a column have no integer."""
+        return np.unpackbits(self.missing[self.position(key)], count=self.rows).astype(bool)
+
+    def column(self, key):
+        """
+        Return the integers of a column without copying.
+
+        Returns:
+            int64 ndarray view of length rows; missing cells hold 0, see missing_mask
+        """
+        return self.values[self.position(key)]
+
+    def present(self, key):
+        """Return the integers of a column with the missing cells left out."""
+        return self.column(key)[~self.missing_mask(key)]
+
+    def value(self, position, index):
+        """Value at a (position, row index) pair, None when missing."""
+        if (self.missing[position, index >> 3] >> (7 - (index & 7))) & 1:
+            return self.others.get((position, index))
+        return int(self.values[position, index])
+
+    def between(self, key, low=None, high=None):
+        """
+        Return the bool row mask of the cells of a column within low..high (inclusive).
+
+        Missing cells never match.
+        """
+        column = self.column(key)
+        mask = ~self.missing_mask(key)
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+        return mask
+
+    def select(self, keys):
+        """Return a table holding only the given columns (a contiguous range shares memory)."""
+        positions = [self.position(key) for key in keys]
+        start_col = None
+        if positions and positions == list(range(positions[0], positions[-1] + 1)):
+            picked = slice(positions[0], positions[-1] + 1)
+            if self.start_col is not None:
+                start_col = self.start_col + positions[0]
+        else:
+            picked = positions
+        others = {(positions.index(position), index): value
+                  for (position, index), value in self.others.items() if position in positions}
+        return RankBlock([self.headers[position] for position in positions], start_col,
+                         self.values[picked], self.missing[picked], self.row_numbers, others)
+
+    def filter(self, mask):
+        """Return a table holding only the rows where mask (bool array of length rows) is True."""
+        mask = np.asarray(mask, dtype=bool)
+        kept = np.flatnonzero(mask)
+        new_index = {int(index): slot for slot, index in enumerate(kept)}
+        missing = np.unpackbits(self.missing, axis=1, count=self.rows)[:, mask]
+        others = {(position, new_index[index]): value
+                  for (position, index), value in self.others.items() if index in new_index}
+        return RankBlock(self.headers, self.start_col, self.values[:, mask], np.packbits(missing, axis=1),
+                         self.row_numbers[mask], others)
+
+class RankBlockBuilder:
+    """
+    Collect converted rows chunk by chunk and pack them into a RankBlock.
+
+    Args:
+        headers: Names of the target columns
+        start_col: Sheet column of the first target column (4 = D)
+    """
+
+    def __init__(self, headers, start_col):
+        self.headers = list(headers)
+        self.start_col = start_col
+        self._values = []
+        self._missing = []
+        self._row_numbers = []
+        self._others = {}
+        self._rows = 0
+
+    def append(self, block, first_row):
+        """
+        Add converted rows.
+
+        Args:
+            block: Rows of target values only (e.g. the D:AA slice of each row),
+                as returned by convert_to_number: int, "" or untouched values
+            first_row: Sheet row number of the first row in block
+        """
+        count = len(block)
+        if not count:
+            return
+        width = len(self.headers)
+        cells = np.empty((count, width), dtype=object)
+        for slot, values in enumerate(block):
+            values = list(values[:width])
+            cells[slot] = values + [None] * (width - len(values))
+        cells = cells.T
+
+        flat = cells.ravel()
+        is_int = np.fromiter((type(value) is int for value in flat), dtype=bool, count=flat.size)
+        values = np.zeros(flat.size, dtype=np.int64)
+        int_index = np.flatnonzero(is_int)
+        try:
+            values[int_index] = flat[int_index].astype(np.int64)
+        except OverflowError:
+            # Integers beyond int64 are stored like any other odd value
+            for index in int_index:
+                if INT64_MIN <= flat[index] <= INT64_MAX:
+                    values[index] = flat[index]
+                else:
+                    is_int[index] = False
+
+        for index in np.flatnonzero(~is_int):
+            value = flat[index]
+            if value is not None and value != "":
+                position, slot = divmod(int(index), count)
+                self._others[(position, self._rows + slot)] = value
+
+        self._values.append(values.reshape(width, count))
+        self._missing.append(~is_int.reshape(width, count))
+        self._row_numbers.append(np.arange(first_row, first_row + count, dtype=np.int32))
+        self._rows += count
+
+    def build(self):
+        """Return the RankBlock of every row appended so far."""
+        width = len(self.headers)
+        if self._values:
+            values = np.concatenate(self._values, axis=1)
+            missing = np.concatenate(self._missing, axis=1)
+            row_numbers = np.concatenate(self._row_numbers)
+        else:
+            values = np.zeros((width, 0), dtype=np.int64)
+            missing = np.zeros((width, 0), dtype=bool)
+            row_numbers = np.zeros(0, dtype=np.int32)
+        return RankBlock(self.headers, self.start_col, values, np.packbits(missing, axis=1), row_numbers,
+                         self._others)
+
+def rank_block_from_rows(rows, start_col, end_col, start_row=2, chunk_rows=5000, trimmed=None):
+    """
+    Pack already converted rows (values only, row 1 = headers) into a RankBlock.
+
+    Blank rows after the last row with a value are left out (see
+    drop_blank_tail) and counted in trimmed['rows'] when trimmed is given.
+
+    Args:
+        rows: Iterable of full row tuples, as yielded by iter_rows(values_only=True)
+        start_col, end_col: Target column range (1-based, inclusive)
+        start_row: First data row
+        chunk_rows: Rows packed per step
+        trimmed: Optional dict receiving the number of blank rows left out
+    """
+    rows = iter(rows)
+    header_row = next(rows, ())
+    headers = [_header_name(header_row, col) for col in range(start_col, end_col + 1)]
+    for _ in range(start_row - 2):
+        next(rows, None)
+
+    builder = RankBlockBuilder(headers, start_col)
+    trimmed = trimmed if trimmed is not None else {}
+    chunk = []
+    first_row = start_row
+    for values in drop_blank_tail(rows, trimmed,
+                                  is_blank=lambda values: is_blank_row(values[start_col - 1:end_col])):
+        chunk.append(values[start_col - 1:end_col])
+        if len(chunk) >= chunk_rows:
+            builder.append(chunk, first_row)
+            first_row += len(chunk)
+            chunk = []
+    builder.append(chunk, first_row)
+    return builder.build()
+
+def rank_block_from_snapshot(snapshot, start_col, end_col, start_row=2):
+    """
+    Build a RankBlock straight from a sheet_cache snapshot of the converted sheet.
+
+    The integer cells are copied column by column without decoding any
+    row; rows past the last one holding a value are left out.
+    """
+    from sheet_cache import KIND_EMPTY, KIND_INT, KIND_OBJECT
+
+    header_row = snapshot.take_rows([1])[0] if snapshot.rows else ()
+    headers = [_header_name(header_row, col) for col in range(start_col, end_col + 1)]
+    last_row = snapshot.extent()[0]
+    kept = slice(start_row - 1, max(start_row - 1, last_row))
+
+    width = end_col - start_col + 1
+    stored = min(end_col, snapshot.cols) - start_col + 1
+    count = len(range(snapshot.rows)[kept])
+    values = np.zeros((width, count), dtype=np.int64)
+    missing = np.ones((width, count), dtype=bool)
+    others = {}
+    for position in range(max(0, stored)):
+        kinds = np.asarray(snapshot.kinds[start_col - 1 + position, kept])
+        payload = np.asarray(snapshot.payload[start_col - 1 + position, kept])
+        is_int = kinds == KIND_INT
+        values[position, is_int] = payload[is_int]
+        missing[position] = ~is_int
+        # Floats and text are rare in a converted sheet: decode them one by one
+        for index in np.flatnonzero(~is_int & (kinds != KIND_EMPTY)):
+            value = (snapshot.objects[payload[index]] if kinds[index] == KIND_OBJECT
+                     else float(payload[index:index + 1].view(np.float64)[0]))
+            if value != "":
+                others[(position, int(index))] = value
+
+    row_numbers = np.arange(start_row, start_row + count, dtype=np.int32)
+    return RankBlock(headers, start_col, values, np.packbits(missing, axis=1), row_numbers, others)
+
+def _header_name(header_row, col):
+    """Header of column col, or its letter when the header cell is empty."""
+    value = header_row[col - 1] if col <= len(header_row) else None
+    return str(value).strip() if value is not None and str(value).strip() else column_letter(col)
+
+def load_rank_block(file_path, start_col=4, end_col=27, start_row=2, sheet_names=("RawData", "RawData_Numbers"),
+                    backend="cache", cache_dir=None):
+    """
+    Load the converted target columns of a workbook (or CSV file) as a RankBlock.
+
+    With the cache backend the table is copied column by column from the
+    sheet_cache snapshot; otherwise the converted sheet (or the
+    <name>_Numbers.csv copy of a CSV file) is streamed once.
+
+    Args:
+        file_path: Workbook holding the converted sheet, or a CSV source
+        start_col, end_col: Target column range
+        start_row: First data row
+        sheet_names: (source sheet, converted sheet); the converted one is loaded
+        backend, cache_dir: As for validation_engine.open_sheet_rows
+
+    Raises:
+        KeyError: The converted sheet (or CSV file) does not exist
+    """
+    from validation_engine import open_sheet_rows
+    from csv_pipeline import is_csv_path
+
+    converted_name = sheet_names[1]
+    if backend == "cache" and not is_csv_path(file_path):
+        try:
+            from sheet_cache import open_cached_sheets
+            snapshots = open_cached_sheets(file_path, sheet_names, cache_dir=cache_dir)
+            if converted_name not in snapshots:
+                raise KeyError(f"{converted_name} sheet not found")
+            return rank_block_from_snapshot(snapshots[converted_name], start_col, end_col, start_row)
+        except OSError as e:
+            print(f"Sheet cache unavailable ({e}), reading the workbook directly...")
+            backend = "xlsx"
+
+    rows, close = open_sheet_rows(file_path, sheet_names, backend, cache_dir)
+    try:
+        if converted_name not in rows:
+            raise KeyError(f"{converted_name} not found")
+        return rank_block_from_rows(rows[converted_name], start_col, end_col, start_row)
+    finally:
+        close()
+
+def deep_size(objects, seen=None):
+    """Sum sys.getsizeof over objects, counting each distinct object once."""
+    seen = seen if seen is not None else set()
+    total = 0
+    for item in objects:
+        if id(item) not in seen:
+            seen.add(id(item))
+            total += sys.getsizeof(item)
+    return total
+
+def openpyxl_footprint(file_path, sheet_name, start_col, end_col, start_row, last_row):
+    """
+    Estimate the memory openpyxl spends on a block of cells.
+
+    The workbook is loaded the way process_excel_file loads it. Every Cell
+    object in the block is counted with its value, its (row, column) key in
+    the worksheet's cell dict and its share of the dict itself; rows read
+    with iter_rows(values_only=True) are counted as tuples of values.
+
+    Returns:
+        dict with cells, cell_bytes (Cell objects) and tuple_bytes (value tuples)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path)
+    try:
+        sheet = workbook[sheet_name]
+        cells = [cell for row in sheet.iter_rows(min_row=start_row, max_row=last_row,
+                                                 min_col=start_col, max_col=end_col) for cell in row]
+        seen = set()
+        cell_bytes = deep_size(cells, seen) + deep_size((cell.value for cell in cells), seen)
+        cell_bytes += deep_size(((cell.row, cell.column) for cell in cells), set())
+        # The worksheet keeps every Cell in one {(row, column): Cell} dict
+        cell_bytes += sys.getsizeof(sheet._cells) * len(cells) // max(1, len(sheet._cells))
+
+        value_rows = list(sheet.iter_rows(min_row=start_row, max_row=last_row, min_col=start_col,
+                                          max_col=end_col, values_only=True))
+        seen = set()
+        tuple_bytes = deep_size(value_rows, seen) + deep_size(
+            (value for values in value_rows for value in values), seen)
+    finally:
+        workbook.close()
+    return {'cells': len(cells), 'cell_bytes': cell_bytes, 'tuple_bytes': tuple_bytes}
+
+def print_footprint(table, reference=None):
+    """Print the table's memory use, and openpyxl's for the same cells when reference is given."""
+    cells = table.width * table.rows
+    per_cell = table.nbytes / cells if cells else 0.0
+    print(f"Compact table: {table.rows} rows x {table.width} columns, "
+          f"{table.nbytes / 1e6:.2f} MB ({per_cell:.1f} bytes/cell)")
+    if reference:
+        for label, key in (("openpyxl cells", 'cell_bytes'), ("value tuples", 'tuple_bytes')):
+            size = reference[key]
+            print(f"{label + ':':<15} {size / 1e6:.2f} MB ({size / max(1, reference['cells']):.1f} bytes/cell), "
+                  f"{size / table.nbytes if table.nbytes else 0:.1f}x the compact table")
+
+if __name__ == "__main__":
+    # Usage: python cutoff_table.py [workbook] [columns, e.g. D:AA]
+    # Converts RawData into a compact table and compares its footprint with openpyxl's for the same RawData cells
+    from convert_to_numbers import DEFAULT_COLUMNS, convert_to_table
+    from xlsx_reader import parse_columns
+
+    workbook_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE_PATH
+    column_spec = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_COLUMNS
+
+    started = time.perf_counter()
+    converted = convert_to_table(workbook_path, columns=column_spec)
+    print(f"Converted into a table in {time.perf_counter() - started:.2f}s")
+
+    first_col, last_col = parse_columns(column_spec)
+    footprint = openpyxl_footprint(workbook_path, "RawData", first_col, last_col, 2,
+                                   int(converted.row_numbers[-1]) if converted.rows else 1)
+    print_footprint(converted, footprint)
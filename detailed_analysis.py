@@ -1,171 +1,126 @@
-import openpyxl
-from openpyxl import load_workbook
-import pandas as pd
-from collections import defaultdict
+import sys
 
-def analyze_conversion_details():
+from convert_to_numbers import DEFAULT_FILE_PATH, DEFAULT_SHEETS
+from instrumentation import Metrics, parse_script_options, report_stream, wait_for_exit
+from validation_engine import run_validation, target_columns
+from xlsx_reader import column_letter
+
+def analyze_conversion_details(file_path=DEFAULT_FILE_PATH, metrics=None, columns=None, sheets=DEFAULT_SHEETS):
     """
     Provide detailed analysis of the conversion results.
+
+    Args:
+        file_path: Workbook holding the RawData and RawData_Numbers sheets
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default D:AA, or the category columns of a CSV file)
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
     """
-    file_path = r"d:\Anant\VSCodeProjects\Temp_projects\ToNumber.xlsx"
+    # Imported here: stream_stats and cutoff_table pull in NumPy
+    from cutoff_table import print_footprint
+    from stream_stats import QUANTILES, RowStats
 
+    start_col, end_col = target_columns(file_path, columns)
     print("Loading Excel file for detailed analysis...")
-    workbook = load_workbook(file_path)
-
-    original_sheet = workbook["RawData"]
-    converted_sheet = workbook["RawData_Numbers"]
-
-    # Define the range
-    start_col = 4  # Column D
-    end_col = 27   # Column AA
-    start_row = 2
-    last_row = min(original_sheet.max_row, converted_sheet.max_row)
-
-    print(f"Analyzing data from row {start_row} to {last_row}, columns D to AA")
+    # The compact table behind the rank statistics is packed during the same pass as the checks
+    rank_stats = RowStats(start_col, end_col)
+    result = run_validation(file_path, start_col, end_col, original_name=sheets[0], converted_name=sheets[1],
+                            metrics=metrics, on_row=rank_stats)
+    if result.missing_sheets:
+        raise KeyError(f"Missing sheet(s): {', '.join(result.missing_sheets)}")
+
+    last_row = min(result.original_rows, result.converted_rows)
+    columns_processed = [column_letter(col) for col in result.column_stats]
+
+    print(f"Analyzing data from row {result.start_row} to {last_row}, "
+          f"columns {columns_processed[0]} to {columns_processed[-1]}")
+    if result.trimmed_cells:
+        print(f"Skipped {result.trimmed_cells} blank cells after the last row with data")
     print("=" * 80)
 
-    # Statistics tracking
-    stats = {
-        'total_cells': 0,
-        'original_types': defaultdict(int),
-        'converted_types': defaultdict(int),
-        'conversion_patterns': defaultdict(int),
-        'missing_data_indicators': defaultdict(int),
-        'decimal_removals': 0,
-        'columns_processed': []
-    }
-
     # Analyze each column
-    for col in range(start_col, end_col + 1):
-        col_letter = chr(64 + col)
-        stats['columns_processed'].append(col_letter)
-
-        print(f"\nAnalyzing Column {col_letter}:")
+    for col, col_stats in result.column_stats.items():
+        print(f"\nAnalyzing Column {column_letter(col)}:")
         print("-" * 40)
 
-        col_stats = {
-            'original_numbers': 0,
-            'original_floats': 0,
-            'original_integers': 0,
-            'original_missing': 0,
-            'converted_integers': 0,
-            'converted_empty': 0,
-            'decimal_cases': []
-        }
-
-        # Sample some values from this column
-        sample_values = []
-
-        for row in range(start_row, min(start_row + 10, last_row + 1)):
-            stats['total_cells'] += 1
-
-            original_value = original_sheet.cell(row=row, column=col).value
-            converted_value = converted_sheet.cell(row=row, column=col).value
-
-            # Track original types
-            if original_value is None:
-                stats['original_types']['None'] += 1
-                col_stats['original_missing'] += 1
-            elif isinstance(original_value, (int, float)):
-                stats['original_types']['number'] += 1
-                col_stats['original_numbers'] += 1
-                if isinstance(original_value, float):
-                    col_stats['original_floats'] += 1
-                    if original_value != int(original_value):
-                        col_stats['decimal_cases'].append((row, original_value, converted_value))
-                        stats['decimal_removals'] += 1
-                else:
-                    col_stats['original_integers'] += 1
-            else:
-                str_val = str(original_value).strip()
-                stats['original_types']['string'] += 1
-                if str_val in ["--", " --", "-- ", " -- "]:
-                    stats['missing_data_indicators'][str_val] += 1
-                    col_stats['original_missing'] += 1
-
-            # Track converted types
-            if converted_value is None or converted_value == "":
-                stats['converted_types']['empty'] += 1
-                col_stats['converted_empty'] += 1
-            elif isinstance(converted_value, int):
-                stats['converted_types']['integer'] += 1
-                col_stats['converted_integers'] += 1
-            elif isinstance(converted_value, float):
-                stats['converted_types']['float'] += 1
-            else:
-                stats['converted_types']['other'] += 1
-
-            # Track conversion patterns
-            orig_type = type(original_value).__name__
-            conv_type = type(converted_value).__name__
-            stats['conversion_patterns'][f"{orig_type} -> {conv_type}"] += 1
-
-            # Collect sample values
-            if len(sample_values) < 5:
-                sample_values.append((row, original_value, converted_value))
-
         # Print column summary
         print(f"Numbers found: {col_stats['original_numbers']}")
         print(f"Missing data: {col_stats['original_missing']}")
         print(f"Converted to integers: {col_stats['converted_integers']}")
         print(f"Converted to empty: {col_stats['converted_empty']}")
+        if col_stats['missing_tokens']:
+            tokens = sorted(col_stats['missing_tokens'].items(), key=lambda item: -item[1])
+            print("Missing tokens: " + ", ".join(f"'{token}' {count}" for token, count in tokens))
 
-        if col_stats['decimal_cases']:
-            print(f"Decimal removals: {len(col_stats['decimal_cases'])}")
-            for row, orig, conv in col_stats['decimal_cases'][:3]:  # Show first 3
+        if col_stats['decimal_removals']:
+            print(f"Decimal removals: {col_stats['decimal_removals']}")
+            for row, orig, conv in col_stats['decimal_cases']:  # Show first 3
                 print(f"  Row {row}: {orig} -> {conv}")
 
         # Show sample values
         print("Sample values:")
-        for row, orig, conv in sample_values:
+        for row, orig, conv in col_stats['samples']:
             print(f"  Row {row}: '{orig}' -> '{conv}'")
 
     # Overall statistics report
+    total_cells = result.total_cells or 1
     print("\n" + "=" * 80)
     print("DETAILED CONVERSION ANALYSIS")
     print("=" * 80)
 
-    print(f"Total cells analyzed: {stats['total_cells']}")
-    print(f"Columns processed: {', '.join(stats['columns_processed'])}")
-    print(f"Decimal values converted: {stats['decimal_removals']}")
+    print(f"Total cells analyzed: {result.total_cells}")
+    print(f"Columns processed: {', '.join(columns_processed)}")
+    print(f"Decimal values converted: {result.decimal_removals}")
 
     print(f"\nOriginal data types:")
-    for dtype, count in stats['original_types'].items():
-        percentage = (count / stats['total_cells']) * 100
+    for dtype, count in result.original_types.items():
+        percentage = (count / total_cells) * 100
         print(f"  {dtype}: {count} ({percentage:.1f}%)")
 
     print(f"\nConverted data types:")
-    for dtype, count in stats['converted_types'].items():
-        percentage = (count / stats['total_cells']) * 100
+    for dtype, count in result.converted_types.items():
+        percentage = (count / total_cells) * 100
         print(f"  {dtype}: {count} ({percentage:.1f}%)")
 
     print(f"\nMissing data indicators found:")
-    for indicator, count in stats['missing_data_indicators'].items():
+    for indicator, count in result.missing_data_indicators.items():
         print(f"  '{indicator}': {count}")
 
     print(f"\nConversion patterns (top 10):")
-    sorted_patterns = sorted(stats['conversion_patterns'].items(), key=lambda x: x[1], reverse=True)
+    sorted_patterns = sorted(result.conversion_patterns.items(), key=lambda x: x[1], reverse=True)
     for pattern, count in sorted_patterns[:10]:
-        percentage = (count / stats['total_cells']) * 100
+        percentage = (count / total_cells) * 100
         print(f"  {pattern}: {count} ({percentage:.1f}%)")
 
-    workbook.close()
+    # Rank statistics over every row, streamed from the compact table of the converted columns
+    summary = rank_stats.summary()
+    quantile_names = [f"P{fraction * 100:.0f}" for fraction in QUANTILES]
+    print(f"\nConverted rank statistics (all {rank_stats.rows} rows; quantiles and distinct counts are estimates):")
+    print(f"  {'Column':<7}{'Ranks':>8}{'Missing':>8}{'Min':>8}"
+          + "".join(f"{name:>8}" for name in quantile_names) + f"{'Max':>8}{'Mean':>10}{'Distinct':>10}")
+    for header, stats in summary.items():
+        if not stats.count:
+            print(f"  {header:<7}{0:>8}{stats.missing:>8}  no ranks")
+            continue
+        print(f"  {header:<7}{stats.count:>8}{stats.missing:>8}{stats.minimum:>8}"
+              + "".join(f"{value:>8.0f}" for value in stats.quantiles())
+              + f"{stats.maximum:>8}{stats.mean:>10.1f}{stats.distinct.estimate():>10.0f}")
+    print_footprint(rank_stats.block)
 
     # Data integrity checks
     print(f"\n" + "=" * 80)
     print("DATA INTEGRITY SUMMARY")
     print("=" * 80)
 
-    total_numbers = stats['original_types']['number']
-    total_converted_integers = stats['converted_types']['integer']
-    total_missing = stats['original_types']['None'] + sum(stats['missing_data_indicators'].values())
-    total_converted_empty = stats['converted_types']['empty']
+    total_numbers = result.original_types['number']
+    total_converted_integers = result.converted_types['integer']
+    total_missing = result.original_types['None'] + sum(result.missing_data_indicators.values())
+    total_converted_empty = result.converted_types['empty']
 
     print(f"✅ Numbers in original: {total_numbers}")
     print(f"✅ Integers in converted: {total_converted_integers}")
     print(f"✅ Missing in original: {total_missing}")
     print(f"✅ Empty in converted: {total_converted_empty}")
-    print(f"✅ Decimals removed: {stats['decimal_removals']}")
+    print(f"✅ Decimals removed: {result.decimal_removals}")
 
     # Check data preservation
     if total_converted_integers >= total_numbers * 0.95:  # Allow 5% tolerance
@@ -179,10 +134,22 @@ def analyze_conversion_details():
         print(f"⚠️  MISSING DATA WARNING: Some missing data may not have been handled properly")
 
 if __name__ == "__main__":
-    try:
-        analyze_conversion_details()
-        input("\nPress Enter to exit...")
-
-    except Exception as e:
-        print(f"Error during analysis: {str(e)}")
-        input("Press Enter to exit...")
+    # Usage: python detailed_analysis.py [--columns D:AA] [--metrics FILE | -] [--non-interactive] [workbook]
+    args, options = parse_script_options(sys.argv[1:])
+    run_metrics = Metrics("detailed_analysis", args[0] if args else DEFAULT_FILE_PATH)
+
+    with report_stream(options):
+        try:
+            with run_metrics.phase("report"):
+                analyze_conversion_details(*args[:1], metrics=run_metrics, columns=options['columns'])
+            status = "ok"
+            wait_for_exit(options, "\nPress Enter to exit...")
+
+        except Exception as e:
+            print(f"Error during analysis: {str(e)}")
+            status = "error"
+            wait_for_exit(options)
+
+    if options['metrics']:
+        run_metrics.emit(options['metrics'], status=status)
+    sys.exit(0 if status == "ok" else 1)
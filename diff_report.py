@@ -0,0 +1,98 @@
+import csv
+import json
+from collections import defaultdict
+
+from xlsx_reader import column_letter
+
+# Columns of a diff file, in order
+DIFF_FIELDS = ["sheet", "cell", "row", "column", "kind", "severity", "original", "converted", "expected"]
+
+# Bytes the diff writer buffers between writes to disk
+DIFF_BUFFER_BYTES = 1024 * 1024
+
+# Issues echoed to the console before the rest only go to the diff file
+CONSOLE_ISSUE_LIMIT = 20
+
+class DiffSink:
+    """
+    Streaming sink for validation issues, used as the engine's on_error.
+
+    Every issue is written as it is found to a JSONL or CSV file (picked by
+    the extension) through a large write buffer. Only the first
+    console_limit issues are passed to echo. Issues are also counted per
+    column and kind for the closing summary, so the console output stays
+    the same size however many cells are wrong.
+
+    Use it as a context manager, or call close() when the run is over.
+
+    Args:
+        path: .jsonl or .csv file to write (None = count and echo only)
+        sheet: Sheet name recorded with every issue
+        echo: Optional callable printing one issue (e.g. print_issue)
+        console_limit: Issues passed to echo before it goes quiet
+    """
+
+    def __init__(self, path=None, sheet="RawData_Numbers", echo=None, console_limit=CONSOLE_ISSUE_LIMIT):
+        self.path = path
+        self.sheet = sheet
+        self.echo = echo
+        self.console_limit = console_limit
+        self.issues = 0
+        self.echoed = 0
+        self.by_column = defaultdict(lambda: defaultdict(int))
+        self.by_severity = defaultdict(int)
+
+        self._handle = None
+        self._csv = None
+        if path is not None:
+            self._handle = open(path, "w", encoding="utf-8", newline="", buffering=DIFF_BUFFER_BYTES)
+            if path.lower().endswith(".csv"):
+                self._csv = csv.writer(self._handle)
+                self._csv.writerow(DIFF_FIELDS)
+
+    def __call__(self, issue):
+        self.issues += 1
+        self.by_column[issue['column']][issue['kind']] += 1
+        self.by_severity[issue['severity']] += 1
+
+        if self._handle is not None:
+            letter = column_letter(issue['column'])
+            values = [self.sheet, f"{letter}{issue['row']}", issue['row'], letter, issue['kind'],
+                      issue['severity'], issue['original'], issue['converted'], issue['expected']]
+            if self._csv is not None:
+                self._csv.writerow(values)
+            else:
+                self._handle.write(json.dumps(dict(zip(DIFF_FIELDS, values)), default=str) + "\n")
+
+        if self.echo is not None and self.echoed < self.console_limit:
+            self.echoed += 1
+            self.echo(issue)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def print_summary(self):
+        """Print the issue counts and the per-column histogram."""
+        if not self.issues:
+            return
+        if self.issues > self.echoed and self.echo is not None:
+            hidden = self.issues - self.echoed
+            where = f"see {self.path}" if self.path else "use --diff FILE to save them all"
+            print(f"   ... {hidden} more issues not shown ({where})")
+
+        severities = ", ".join(f"{count} {severity}s" for severity, count in sorted(self.by_severity.items()))
+        print(f"\nIssues by column ({severities}):")
+        for column in sorted(self.by_column):
+            kinds = self.by_column[column]
+            detail = ", ".join(f"{kind} {count}" for kind, count in sorted(kinds.items(), key=lambda item: -item[1]))
+            print(f"   {column_letter(column):<4} {sum(kinds.values()):>8}  ({detail})")
+        if self.path:
+            print(f"All {self.issues} issues written to {self.path}")
@@ -0,0 +1,210 @@
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Seconds between two progress lines, whatever the loop granularity
+PROGRESS_INTERVAL = 5.0
+
+# Environment switches for batch jobs (the command-line flags win)
+METRICS_ENV = "KCET_METRICS"
+NON_INTERACTIVE_ENV = "KCET_NON_INTERACTIVE"
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of the current process in megabytes.
+
+    Returns:
+        float, or None when the platform does not expose it (e.g. Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+class Metrics:
+    """
+    Phase timers and counters for one script run.
+
+    Phases (load, convert, save, validate, report, ...) are timed with the
+    phase() context manager and add up when a phase is entered more than
+    once. Phases may nest; the time of an outer phase excludes the phases
+    entered inside it, so the phase times add up to the run time.
+
+    Counters are plain integers: cells_read, cells_written, cells_converted,
+    missing_tokens, errors and whatever else a script finds worth tracking.
+    """
+
+    def __init__(self, script, file_path=None):
+        self.script = script
+        self.file_path = file_path
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counters = defaultdict(int)
+        self._inner_seconds = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase name."""
+        started = time.perf_counter()
+        self._inner_seconds.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            inner = self._inner_seconds.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - inner
+            if self._inner_seconds:
+                self._inner_seconds[-1] += elapsed
+
+    def count(self, name, amount=1):
+        """Add amount to counter name."""
+        self.counters[name] += amount
+
+    def snapshot(self, **extra):
+        """
+        Return the metrics as a JSON-serialisable dict.
+
+        Args:
+            **extra: Additional top-level fields (e.g. status, result)
+        """
+        return {
+            'script': self.script,
+            'file': self.file_path,
+            'started_at': self.started_at,
+            'seconds': round(time.perf_counter() - self.started, 6),
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'counters': dict(self.counters),
+            'peak_rss_mb': peak_rss_mb(),
+            **extra,
+        }
+
+    def emit(self, destination, **extra):
+        """
+        Write the metrics snapshot.
+
+        Args:
+            destination: "-" for one JSON line on stdout, a .jsonl path to
+                append one line per run, any other path to write a JSON document
+            **extra: Additional top-level fields (e.g. status, result)
+        """
+        write_records(destination, [self.snapshot(**extra)], single=True)
+
+    def print_phases(self):
+        """Print the phase timings in the order they finished."""
+        timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"Phases: {timings}")
+
+def write_records(destination, records, single=False):
+    """
+    Write metrics records.
+
+    Args:
+        destination: "-" for one JSON line per record on stdout, a .jsonl
+            path to append one line per record, any other path to write a
+            JSON document
+        records: List of JSON-serialisable dicts
+        single: Write the only record as the document itself instead of a list
+    """
+    if destination == "-":
+        for record in records:
+            print(json.dumps(record, default=str), file=sys.__stdout__, flush=True)
+    elif destination.lower().endswith(".jsonl"):
+        with open(destination, "a", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, default=str) + "\n")
+    else:
+        with open(destination, "w", encoding="utf-8") as handle:
+            json.dump(records[0] if single else records, handle, indent=2, default=str)
+
+class ProgressReporter:
+    """
+    Time-limited progress printer.
+
+    update() is cheap enough to call once per row; a line is printed only
+    when PROGRESS_INTERVAL seconds have passed since the previous one.
+    """
+
+    def __init__(self, unit="cells", total=None, interval=PROGRESS_INTERVAL):
+        self.unit = unit
+        self.total = total
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def update(self, done):
+        now = time.perf_counter()
+        if now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        rate = done / (now - self.started)
+        if self.total:
+            print(f"Progress: {done / self.total * 100:.1f}% ({done}/{self.total} {self.unit}, {rate:.0f} {self.unit}/sec)")
+        else:
+            print(f"Progress: {done} {self.unit} ({rate:.0f} {self.unit}/sec)")
+
+def parse_script_options(args):
+    """
+    Remove the shared --metrics, --non-interactive and --columns options from args.
+
+    Args:
+        args: Command-line arguments (sys.argv[1:])
+
+    Returns:
+        (remaining args, options) where options has 'metrics' (destination
+        or None), 'interactive' (False with --non-interactive, the
+        KCET_NON_INTERACTIVE variable or when stdin is not a terminal) and
+        'columns' (target column spec such as "D:AA", or None for the default)
+    """
+    remaining = []
+    metrics = os.environ.get(METRICS_ENV) or None
+    interactive = not os.environ.get(NON_INTERACTIVE_ENV)
+    columns = None
+
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--metrics":
+            if not args:
+                raise ValueError("--metrics needs a destination (a file or - for stdout)")
+            metrics = args.pop(0)
+        elif arg.startswith("--metrics="):
+            metrics = arg.split("=", 1)[1]
+        elif arg == "--non-interactive":
+            interactive = False
+        elif arg == "--columns":
+            if not args:
+                raise ValueError("--columns needs a column range such as D:AA")
+            columns = args.pop(0)
+        elif arg.startswith("--columns="):
+            columns = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+
+    if not sys.stdin or not sys.stdin.isatty():
+        interactive = False
+    return remaining, {'metrics': metrics, 'interactive': interactive, 'columns': columns}
+
+@contextlib.contextmanager
+def report_stream(options):
+    """Send the human-readable report to stderr while metrics go to stdout."""
+    if options['metrics'] == "-":
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    else:
+        yield
+
+def wait_for_exit(options, message="Press Enter to exit..."):
+    """Keep the console window open, unless the run is non-interactive."""
+    if options['interactive']:
+        input(message)
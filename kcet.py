@@ -0,0 +1,127 @@
+import argparse
+import importlib
+import sys
+
+# Only the standard library is imported up front. Each subcommand imports
+# the script it runs when it is chosen, and openpyxl, NumPy and the sheet
+# cache are only imported by the code paths that use them, so "--help",
+# a CSV conversion or a cached validation never pay for them.
+
+# Script module behind each subcommand, and the name its metrics are recorded under
+COMMANDS = {
+    'convert': 'convert_to_numbers',
+    'validate': 'validate_conversion',
+    'analyze': 'detailed_analysis',
+    'test': 'comprehensive_test',
+}
+
+def import_command(name):
+    """Import and return the script module behind a subcommand."""
+    return importlib.import_module(COMMANDS[name])
+
+def run_convert(args, metrics):
+    """Convert in the chosen mode; a .csv path is converted with the CSV pipeline unless the mode is table."""
+    module = import_command('convert')
+    stats = module.convert_file(args.path, args.mode, args.output, metrics=metrics, columns=args.columns,
+                                sheets=(args.source_sheet, args.converted_sheet), workers=args.workers)
+    module.print_run_report(stats)
+    return "ok", stats
+
+def run_validate(args, metrics):
+    module = import_command('validate')
+    with metrics.phase("report"):
+        passed = module.validate_conversion(args.path, metrics=metrics, workers=args.workers, diff_path=args.diff,
+                                            columns=args.columns, sheets=(args.source_sheet, args.converted_sheet))
+    print("\nConversion validation completed successfully!" if passed
+          else "\nConversion validation found issues. Please review the errors above.")
+    return ("passed" if passed else "failed"), None
+
+def run_analyze(args, metrics):
+    module = import_command('analyze')
+    with metrics.phase("report"):
+        module.analyze_conversion_details(args.path, metrics=metrics, columns=args.columns,
+                                          sheets=(args.source_sheet, args.converted_sheet))
+    return "ok", None
+
+def run_test(args, metrics):
+    module = import_command('test')
+    sheets = (args.source_sheet, args.converted_sheet)
+    with metrics.phase("report"):
+        if args.quick:
+            passed = module.quick_check(args.path, sample_rows=args.sample or module.QUICK_SAMPLE_ROWS,
+                                        seed=args.seed, metrics=metrics, columns=args.columns, sheets=sheets)
+        else:
+            passed = module.comprehensive_test(args.path, metrics=metrics, columns=args.columns, sheets=sheets)
+    print("🎉 CONVERSION VALIDATION: COMPLETE SUCCESS!" if passed else "❌ CONVERSION VALIDATION: ISSUES FOUND!")
+    return ("passed" if passed else "failed"), None
+
+def build_parser():
+    """Return the argument parser for every subcommand."""
+    shared = argparse.ArgumentParser(add_help=False)
+    shared.add_argument("path", help="Workbook (.xlsx) or CSV file")
+    shared.add_argument("--columns", default=None,
+                        help="Target columns, e.g. D:AA (the default); CSV files also take header names (GM:STR)")
+    shared.add_argument("--source-sheet", default="RawData", help="Sheet holding the original values")
+    shared.add_argument("--converted-sheet", default="RawData_Numbers", help="Sheet holding the converted values")
+    shared.add_argument("--metrics", default=None, help="Write run metrics as JSON to FILE (- for stdout)")
+
+    parser = argparse.ArgumentParser(prog="kcet", description="Convert and check KCET cutoff workbooks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", parents=[shared], help="Convert the target columns to integers")
+    # Same as convert_to_numbers.CONVERT_MODES, spelled out so "--help" imports nothing
+    convert.add_argument("--mode", default="full",
+                         choices=("full", "stream", "pipeline", "incremental", "table", "checkpoint"),
+                         help="full (in place), stream or pipeline (new file), incremental (in place, "
+                              "with a manifest), table (in memory only) or checkpoint (resumable CSV "
+                              "conversion; workbooks are streamed)")
+    convert.add_argument("-o", "--output", default=None,
+                         help="Output file (stream, pipeline, checkpoint and CSV) or manifest (incremental)")
+    convert.add_argument("--workers", type=int, default=None, help="Converter processes for --mode pipeline")
+    convert.set_defaults(handler=run_convert)
+
+    validate = commands.add_parser("validate", parents=[shared], help="Check every converted cell")
+    validate.add_argument("--workers", type=int, default=None, help="Validate row ranges on N processes")
+    validate.add_argument("--diff", default=None, help="Write every issue to a .jsonl or .csv file")
+    validate.set_defaults(handler=run_validate)
+
+    analyze = commands.add_parser("analyze", parents=[shared], help="Detailed conversion and rank statistics")
+    analyze.set_defaults(handler=run_analyze)
+
+    test = commands.add_parser("test", parents=[shared], help="Comprehensive test suite")
+    test.add_argument("--quick", action="store_true", help="Check a stratified row sample only")
+    test.add_argument("--sample", type=int, default=None, help="Rows sampled by --quick")
+    test.add_argument("--seed", type=int, default=0, help="Sampling seed for --quick")
+    test.set_defaults(handler=run_test)
+    return parser
+
+def main(argv=None):
+    """
+    Run one subcommand without any prompt.
+
+    Returns:
+        int: Exit status (0 when the conversion succeeded or the checks passed)
+    """
+    args = build_parser().parse_args(argv)
+    from instrumentation import Metrics, report_stream
+
+    metrics = Metrics(COMMANDS[args.command], args.path)
+    options = {'metrics': args.metrics}
+    result = None
+    with report_stream(options):
+        try:
+            status, result = args.handler(args, metrics)
+        except Exception as e:
+            print(f"Error: {e}")
+            metrics.count('errors')
+            status = "error"
+            result = {'error': str(e)}
+
+    if args.metrics:
+        extra = {'result': result} if result is not None else {}
+        metrics.emit(args.metrics, status=status, **extra)
+    return 0 if status in ("ok", "passed") else 1
+
+if __name__ == "__main__":
+    # Usage: python kcet.py {convert,validate,analyze,test} path [options]   (python kcet.py -h for the list)
+    sys.exit(main())
@@ -0,0 +1,436 @@
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from convert_to_numbers import DEFAULT_SHEETS
+from stream_stats import QUANTILES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Rows returned by /filter unless the request asks for another limit
+DEFAULT_FILTER_LIMIT = 1000
+
+# Issue records included in a /validate answer
+VALIDATE_SAMPLE_ISSUES = 20
+
+# Host header names accepted (with any port); anything else is a page that
+# resolved its own name to this address (DNS rebinding)
+ALLOWED_HOSTS = ("localhost", "127.0.0.1")
+
+# Header carrying the per-start token printed by the server
+TOKEN_HEADER = "X-KCET-Token"
+
+def file_stamp(file_path):
+    """
+    Return what identifies the current version of a source: (mtime_ns, size)
+    of the file and, for a CSV file, of its <name>_Numbers.csv copy.
+    """
+    from convert_to_numbers import default_streaming_output
+
+    paths = [file_path]
+    if file_path.lower().endswith(".csv"):
+        paths.append(default_streaming_output(file_path))
+    stamp = []
+    for path in paths:
+        if os.path.exists(path):
+            status = os.stat(path)
+            stamp.append((status.st_mtime_ns, status.st_size))
+        else:
+            stamp.append(None)
+    if stamp[0] is None:
+        raise FileNotFoundError(f"No such file: {file_path}")
+    return tuple(stamp)
+
+class WarmCache:
+    """
+    Parsed tables and computed results per source file, kept in memory.
+
+    Every lookup compares the file's mtime and size with the ones the cached
+    items were built from; when they differ, everything cached for the file
+    is dropped and rebuilt on demand. The cache-wide lock only covers the
+    lookups: each item is built under its own lock, so two requests for the
+    same cold item build it once while hits on other items keep being
+    answered.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.building = {}
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.build_seconds = defaultdict(float)
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def _lookup(self, path, stamp, kind, key):
+        """Return (found, item) for a fresh item; call with the lock held."""
+        entry = self.entries.get(path)
+        if entry is not None and entry['stamp'] != stamp:
+            self.invalidations += 1
+            entry = None
+        if entry is None:
+            entry = self.entries[path] = {'stamp': stamp, 'items': {}}
+        if (kind, key) in entry['items']:
+            self.hits[kind] += 1
+            return True, entry['items'][(kind, key)]
+        return False, None
+
+    def get(self, file_path, kind, key, build):
+        """
+        Return the cached item (kind, key) of a file, building it with build() on a miss.
+
+        Args:
+            file_path: Source file the item is derived from
+            kind: Item family, counted separately in the statistics (e.g. "table")
+            key: Hashable parameters of the item (columns, sheets, ...)
+            build: Callable returning the item
+        """
+        path = os.path.abspath(file_path)
+        stamp = file_stamp(path)
+        with self.lock:
+            found, item = self._lookup(path, stamp, kind, key)
+            if found:
+                return item
+            build_lock = self.building.setdefault((path, kind, key), threading.Lock())
+
+        with build_lock:
+            # Another request may have built it while this one waited
+            with self.lock:
+                found, item = self._lookup(path, stamp, kind, key)
+                if found:
+                    return item
+                self.misses[kind] += 1
+            started = time.perf_counter()
+            try:
+                item = build()
+                with self.lock:
+                    self.build_seconds[kind] += time.perf_counter() - started
+                    entry = self.entries.get(path)
+                    # Not kept when the file changed during the build
+                    if entry is not None and entry['stamp'] == stamp:
+                        entry['items'][(kind, key)] = item
+            finally:
+                with self.lock:
+                    self.building.pop((path, kind, key), None)
+            return item
+
+    def forget(self, file_path):
+        """Drop everything cached for a file."""
+        with self.lock:
+            self.entries.pop(os.path.abspath(file_path), None)
+
+    def stats(self):
+        """Return the hit/miss counters and the cached files as a JSON-serialisable dict."""
+        with self.lock:
+            kinds = sorted(set(self.hits) | set(self.misses))
+            return {
+                'kinds': {kind: {'hits': self.hits[kind], 'misses': self.misses[kind],
+                                 'build_seconds': round(self.build_seconds[kind], 4)} for kind in kinds},
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'invalidations': self.invalidations,
+                'building': sorted(f"{kind}{list(key)}" for _, kind, key in self.building),
+                'files': {path: sorted(f"{kind}{list(key)}" for kind, key in entry['items'])
+                          for path, entry in self.entries.items()},
+            }
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+def _split(value):
+    return None if value is None else [part.strip() for part in value.split(",") if part.strip()]
+
+def _number(value):
+    return None if value is None else float(value)
+
+class KcetService:
+    """
+    Convert, validate, analyze and filter requests answered from a WarmCache.
+
+    Each method takes the parsed query string ({name: [values]}) and returns
+    a JSON-serialisable dict.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or WarmCache()
+        # One conversion at a time; warm requests keep being answered meanwhile
+        self.convert_lock = threading.Lock()
+        # Guards the request counters, which every handler thread updates
+        self.requests_lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.request_seconds = defaultdict(float)
+
+    def _source(self, query):
+        path = _param(query, 'path')
+        if not path:
+            raise ValueError("path is required")
+        sheets = (_param(query, 'source_sheet', DEFAULT_SHEETS[0]), _param(query, 'converted_sheet', DEFAULT_SHEETS[1]))
+        return path, _param(query, 'columns'), sheets
+
+    def _validation(self, path, columns, sheets):
+        from validation_engine import run_validation, target_columns
+
+        def build():
+            start_col, end_col = target_columns(path, columns)
+            return run_validation(path, start_col, end_col, original_name=sheets[0], converted_name=sheets[1])
+        return self.cache.get(path, 'validation', (columns, sheets), build)
+
+    def _table(self, path, columns, sheets):
+        from cutoff_table import load_rank_block
+        from validation_engine import target_columns
+
+        def build():
+            start_col, end_col = target_columns(path, columns)
+            return load_rank_block(path, start_col, end_col, 2, sheets)
+        return self.cache.get(path, 'table', (columns, sheets), build)
+
+    def validate(self, query):
+        """Validation counters of a workbook and its first issues."""
+        path, columns, sheets = self._source(query)
+        result = self._validation(path, columns, sheets)
+        return {
+            'path': path,
+            'passed': not result.missing_sheets and result.errors == 0,
+            'missing_sheets': result.missing_sheets,
+            'rows': result.converted_rows,
+            'total_cells': result.total_cells,
+            'converted_cells': result.converted_cells,
+            'preserved_missing': result.preserved_missing,
+            'errors': result.errors,
+            'total_errors': result.total_errors,
+            'float_warnings': result.float_warnings,
+            'unexpected_changes': result.unexpected_changes,
+            'outside_range_errors': result.outside_range_errors,
+            'trimmed_cells': result.trimmed_cells,
+            'issues': result.error_samples[:VALIDATE_SAMPLE_ISSUES],
+        }
+
+    def analyze(self, query):
+        """Per-column rank statistics (count, missing, min, max, mean, quantiles, distinct)."""
+        path, columns, sheets = self._source(query)
+
+        def build():
+            from stream_stats import summarize_table
+
+            table = self._table(path, columns, sheets)
+            summary = {}
+            for header, stats in summarize_table(table).items():
+                summary[header] = {
+                    'count': stats.count,
+                    'missing': stats.missing,
+                    'min': stats.minimum,
+                    'max': stats.maximum,
+                    'mean': stats.mean,
+                    'quantiles': dict(zip((f"p{int(fraction * 100)}" for fraction in QUANTILES), stats.quantiles())),
+                    'distinct': round(stats.distinct.estimate()),
+                }
+            return {'path': path, 'rows': table.rows, 'columns': summary}
+        return self.cache.get(path, 'analysis', (columns, sheets), build)
+
+    def filter(self, query):
+        """Rows of a rank band, filtered by course, college and city codes (see rank_query.CutoffTable.query)."""
+        from rank_query import METRO_EXPORT_COURSES, load_table
+
+        path, _, sheets = self._source(query)
+        table = self.cache.get(path, 'query_table', (sheets[1],), lambda: load_table(path, sheet_name=sheets[1]))
+        courses = _param(query, 'courses')
+        row_ids = table.query(_param(query, 'category', "GM"), _number(_param(query, 'min')),
+                              _number(_param(query, 'max')),
+                              METRO_EXPORT_COURSES if courses == "metro" else _split(courses),
+                              _split(_param(query, 'colleges')), _split(_param(query, 'cities')))
+        columns = _split(_param(query, 'fields')) or table.header
+        indexes = [table.column_index(name) for name in columns]
+        limit = int(_param(query, 'limit', DEFAULT_FILTER_LIMIT))
+        rows = []
+        matched = 0
+        for row_id in row_ids:
+            matched += 1
+            if len(rows) < limit:
+                row = table.rows[row_id]
+                rows.append([row[index] if index < len(row) else None for index in indexes])
+        return {'path': path, 'header': [table.header[index] for index in indexes], 'matched': matched,
+                'rows': rows}
+
+    def convert(self, query):
+        """Run a conversion (see convert_to_numbers.convert_file); cached items of the file are dropped."""
+        from convert_to_numbers import convert_file, default_streaming_output
+        from instrumentation import Metrics
+
+        path, columns, sheets = self._source(query)
+        mode = _param(query, 'mode', "full")
+        if mode == "table":
+            table = self._table(path, columns, sheets)
+            return {'path': path, 'mode': 'table', 'rows': table.rows, 'cells': table.rows * table.width,
+                    'table_bytes': table.nbytes}
+
+        # Only the default <name>_Numbers output (or in place, for the full
+        # mode) may be written: a request must not pick which file to overwrite
+        output_path = _param(query, 'output')
+        if output_path is not None and os.path.abspath(output_path) != os.path.abspath(default_streaming_output(path)):
+            raise ValueError(f"output must be left out or be {default_streaming_output(path)}")
+        with self.convert_lock:
+            stats = convert_file(path, mode, None, metrics=Metrics("convert_to_numbers", path),
+                                 columns=columns, sheets=sheets)
+        self.cache.forget(path)
+        if stats.get('output_path'):
+            self.cache.forget(stats['output_path'])
+        return stats
+
+    def stats(self, query):
+        """Cache hit/miss statistics plus request counts and mean latency per endpoint."""
+        document = self.cache.stats()
+        with self.requests_lock:
+            document['requests'] = {name: {'count': count,
+                                           'mean_ms': round(self.request_seconds[name] / count * 1000, 3)}
+                                    for name, count in self.requests.items()}
+        return document
+
+    def record(self, name, seconds):
+        with self.requests_lock:
+            self.requests[name] += 1
+            self.request_seconds[name] += seconds
+
+# Endpoint -> (KcetService method, HTTP methods allowed)
+ENDPOINTS = {
+    '/validate': ('validate', ("GET",)),
+    '/analyze': ('analyze', ("GET",)),
+    '/filter': ('filter', ("GET",)),
+    '/convert': ('convert', ("POST",)),
+    '/stats': ('stats', ("GET",)),
+}
+
+class KcetRequestHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP front end of the KcetService held by the server."""
+
+    server_version = "kcet-server/1"
+
+    def _answer(self, method):
+        url = urlparse(self.path)
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return self._send(404, {'error': f"Unknown endpoint {url.path}", 'endpoints': sorted(ENDPOINTS)})
+        name, methods = endpoint
+        if method not in methods:
+            return self._send(405, {'error': f"{url.path} takes {' or '.join(methods)}"})
+
+        host = self.headers.get('Host') or ""
+        hostname = host[:host.rindex(":")] if ":" in host else host
+        if hostname.lower() not in ALLOWED_HOSTS:
+            return self._send(403, {'error': f"Host {host!r} is not allowed"})
+        if not hmac.compare_digest((self.headers.get(TOKEN_HEADER) or "").encode("utf-8"),
+                                   self.server.token.encode("utf-8")):
+            return self._send(403, {'error': f"Missing or wrong {TOKEN_HEADER} header"})
+
+        query = parse_qs(url.query)
+        if method == "POST":
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                # JSON only: a form post is what a foreign page can send without asking
+                content_type = (self.headers.get('Content-Type') or "").split(";")[0].strip().lower()
+                if content_type != "application/json":
+                    return self._send(415, {'error': "POST bodies must be application/json"})
+                try:
+                    body = json.loads(self.rfile.read(length).decode("utf-8"))
+                except ValueError as e:
+                    return self._send(400, {'error': f"Bad JSON body: {e}"})
+                if not isinstance(body, dict):
+                    return self._send(400, {'error': "The JSON body must be an object"})
+                query.update({name: [",".join(map(str, value)) if isinstance(value, list) else str(value)]
+                              for name, value in body.items() if value is not None})
+        service = self.server.service
+        started = time.perf_counter()
+        try:
+            document = getattr(service, name)(query)
+            status = 200
+        except FileNotFoundError as e:
+            document, status = {'error': str(e)}, 404
+        except (KeyError, ValueError) as e:
+            document, status = {'error': str(e)}, 400
+        except Exception as e:
+            document, status = {'error': f"{type(e).__name__}: {e}"}, 500
+        elapsed = time.perf_counter() - started
+        service.record(name, elapsed)
+        if isinstance(document, dict) and name != 'stats':
+            document = dict(document, elapsed_ms=round(elapsed * 1000, 3))
+        self._send(status, document)
+
+    def _send(self, status, document):
+        body = json.dumps(document, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._answer("GET")
+
+    def do_POST(self):
+        self._answer("POST")
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None, token=None):
+    """
+    Create (without starting) the HTTP server.
+
+    A client that gets through can read and convert any file the server
+    process can, so every request must name localhost or 127.0.0.1 in its
+    Host header and carry the token in an X-KCET-Token header; a browser
+    page can do neither without the server's consent.
+
+    Args:
+        host: Address to bind
+        port: Port (0 picks a free one)
+        service: KcetService to answer from (default: a new one)
+        token: Shared secret (default: a random one, see server.token)
+    """
+    server = ThreadingHTTPServer((host, port), KcetRequestHandler)
+    server.daemon_threads = True
+    server.service = service or KcetService()
+    server.token = token or secrets.token_urlsafe(24)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve convert/validate/analyze/filter requests from warm, "
+                                                 "in-memory copies of the workbooks.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to bind (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default {DEFAULT_PORT})")
+    parser.add_argument("--warm", action="append", default=[],
+                        help="Workbook to validate and load before serving (repeatable)")
+    parser.add_argument("--token-file", default=None,
+                        help="Also write the request token to this file (readable by the owner only)")
+    args = parser.parse_args()
+
+    # Build and conversion progress messages go to the server's log, not
+    # stdout; redirected once here because concurrent builds share sys.stdout
+    sys.stdout = sys.stderr
+    kcet_server = make_server(args.host, args.port)
+    for warm_path in args.warm:
+        started = time.perf_counter()
+        kcet_server.service.validate({'path': [warm_path]})
+        print(f"Warmed {warm_path} in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    if args.token_file:
+        descriptor = os.open(args.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as handle:
+            handle.write(kcet_server.token + "\n")
+    print(f"Serving on http://{args.host}:{kcet_server.server_address[1]} "
+          f"({', '.join(sorted(ENDPOINTS))})", file=sys.stderr)
+    print(f"{TOKEN_HEADER}: {kcet_server.token}", file=sys.stderr)
+    try:
+        kcet_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        kcet_server.server_close()
@@ -0,0 +1,293 @@
+import argparse
+import csv
+import math
+import random
+import sys
+import time
+
+from rank_query import COLLEGE_HEADERS, code_prefix
+
+# Columns added to an export, as in the hand-made Bangalore metro export
+METRO_HEADERS = ("Nearest Metro Station", "Distance from Metro (km)")
+
+# Mean Earth radius used by haversine_km
+EARTH_RADIUS_KM = 6371.0088
+
+# Side of a grid cell in degrees (about 5.5 km of latitude); a city's
+# stations then spread over a few dozen cells
+GRID_CELL_DEGREES = 0.05
+
+# Header names accepted in the coordinate files (case-insensitive)
+STATION_HEADERS = ("Station", "Station Name", "Name")
+CAMPUS_HEADERS = ("College Code", "Code") + COLLEGE_HEADERS
+LATITUDE_HEADERS = ("Latitude", "Lat")
+LONGITUDE_HEADERS = ("Longitude", "Lon", "Lng", "Long")
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(lon2 - lon1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _find_header(header, candidates, file_path):
+    lowered = {str(name).strip().lower(): index for index, name in reversed(list(enumerate(header)))}
+    for candidate in candidates:
+        if candidate.lower() in lowered:
+            return lowered[candidate.lower()]
+    raise ValueError(f"{file_path}: no {candidates[0]} column (expected one of {', '.join(candidates)})")
+
+def _read_points(file_path, key_headers):
+    """Yield (key, latitude, longitude) for every row of a coordinate CSV with a key and both coordinates."""
+    with open(file_path, newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        key_col = _find_header(header, key_headers, file_path)
+        lat_col = _find_header(header, LATITUDE_HEADERS, file_path)
+        lon_col = _find_header(header, LONGITUDE_HEADERS, file_path)
+        for line, row in enumerate(reader, start=2):
+            if len(row) <= max(key_col, lat_col, lon_col) or not row[key_col].strip():
+                continue
+            try:
+                latitude, longitude = float(row[lat_col]), float(row[lon_col])
+            except ValueError:
+                raise ValueError(f"{file_path}:{line}: bad coordinates {row[lat_col]!r}, {row[lon_col]!r}") from None
+            yield row[key_col].strip(), latitude, longitude
+
+def load_stations(file_path):
+    """
+    Load metro station coordinates.
+
+    The CSV needs a station name column (Station or Name) and Latitude and
+    Longitude columns in decimal degrees; other columns (e.g. Line) are ignored.
+
+    Returns:
+        list of (name, latitude, longitude)
+    """
+    return list(_read_points(file_path, STATION_HEADERS))
+
+def load_campuses(file_path):
+    """
+    Load college campus coordinates keyed by college code.
+
+    The key column is College Code/Code, or a College Name column whose
+    cells start with the code ("E115 S J B Institute ..."), as in the exports.
+
+    Returns:
+        dict: {college code: (latitude, longitude)}
+    """
+    return {code_prefix(key): (latitude, longitude)
+            for key, latitude, longitude in _read_points(file_path, CAMPUS_HEADERS)}
+
+class StationGrid:
+    """
+    Uniform latitude/longitude grid over metro stations for nearest-station lookups.
+
+    Each station goes into the bucket of the cell it falls in. A lookup
+    searches rings of cells around the query's cell, nearest ring first, and
+    stops once no unsearched cell can hold a station closer than the best
+    one found, so it only measures the few stations around the query.
+
+    Args:
+        stations: Iterable of (name, latitude, longitude)
+        cell_degrees: Side of a grid cell in degrees
+    """
+
+    def __init__(self, stations, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.buckets = {}
+        self.size = 0
+        for name, latitude, longitude in stations:
+            self.buckets.setdefault(self._cell(latitude, longitude), []).append((name, latitude, longitude))
+            self.size += 1
+        if self.buckets:
+            rows = [cell[0] for cell in self.buckets]
+            cols = [cell[1] for cell in self.buckets]
+            self.extent = (min(rows), max(rows), min(cols), max(cols))
+            self.max_latitude = max(abs(latitude) for bucket in self.buckets.values() for _, latitude, _ in bucket)
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _ring(self, row, col, radius):
+        """Yield the cells at Chebyshev distance radius from (row, col) that hold stations."""
+        if radius == 0:
+            cells = [(row, col)]
+        else:
+            cells = [(row + offset, col + side) for offset in range(-radius, radius + 1) for side in (-radius, radius)]
+            cells += [(row + side, col + offset) for offset in range(-radius + 1, radius) for side in (-radius, radius)]
+        for cell in cells:
+            bucket = self.buckets.get(cell)
+            if bucket:
+                yield bucket
+
+    def nearest(self, latitude, longitude):
+        """
+        Return the station nearest to a point.
+
+        Returns:
+            (name, distance in km), or (None, None) when the grid is empty
+        """
+        if not self.size:
+            return None, None
+        row, col = self._cell(latitude, longitude)
+        low_row, high_row, low_col, high_col = self.extent
+        last_radius = max(abs(row - low_row), abs(row - high_row), abs(col - low_col), abs(col - high_col))
+        # A cell of ring r + 1 is more than r cells away in latitude or in
+        # longitude; a degree of longitude is shortest at the highest latitude in play
+        shortest_degree_km = EARTH_RADIUS_KM * math.radians(1) * math.cos(
+            math.radians(min(90.0, max(abs(latitude), self.max_latitude))))
+
+        best_name, best_km = None, math.inf
+        for radius in range(last_radius + 1):
+            for bucket in self._ring(row, col, radius):
+                for name, station_lat, station_lon in bucket:
+                    distance = haversine_km(latitude, longitude, station_lat, station_lon)
+                    if distance < best_km:
+                        best_name, best_km = name, distance
+            if best_km <= radius * self.cell_degrees * shortest_degree_km:
+                break
+        return best_name, best_km
+
+class MetroEnricher:
+    """
+    Nearest-station lookup by college code, computed once per college.
+
+    Args:
+        stations: Iterable of (name, latitude, longitude), e.g. from load_stations
+        campuses: {college code: (latitude, longitude)}, e.g. from load_campuses
+        decimals: Decimal places kept in the distance column
+    """
+
+    def __init__(self, stations, campuses, decimals=1):
+        self.grid = StationGrid(stations)
+        self.campuses = campuses
+        self.decimals = decimals
+        self.cache = {}
+        self.lookups = 0
+
+    def lookup(self, college):
+        """
+        Return (nearest station, distance in km) for a college code or "<code> <name>" cell.
+
+        Colleges without campus coordinates get (None, None).
+        """
+        code = code_prefix(college)
+        self.lookups += 1
+        if code not in self.cache:
+            campus = self.campuses.get(code)
+            if campus is None:
+                self.cache[code] = (None, None)
+            else:
+                name, distance = self.grid.nearest(*campus)
+                self.cache[code] = (name, round(distance, self.decimals))
+        return self.cache[code]
+
+    def enrich_rows(self, header, rows):
+        """
+        Attach the metro columns to a batch of rows.
+
+        Existing METRO_HEADERS columns are overwritten in place; otherwise the
+        two columns are appended.
+
+        Args:
+            header: Header names of rows (needs a College Name or College column)
+            rows: Iterable of row sequences
+
+        Returns:
+            (new header, list of new rows as lists)
+        """
+        header = [str(name) for name in header]
+        college_col = _find_header(header, COLLEGE_HEADERS, "rows")
+        lowered = [name.strip().lower() for name in header]
+        targets = []
+        for name in METRO_HEADERS:
+            if name.lower() in lowered:
+                targets.append(lowered.index(name.lower()))
+            else:
+                targets.append(len(header))
+                header.append(name)
+
+        enriched = []
+        for row in rows:
+            row = list(row) + [None] * (len(header) - len(row))
+            values = self.lookup(row[college_col])
+            for target, value in zip(targets, values):
+                row[target] = value
+            enriched.append(row)
+        return header, enriched
+
+    @property
+    def missing_colleges(self):
+        """Codes looked up that have no campus coordinates."""
+        return sorted(code for code, (name, _) in self.cache.items() if name is None)
+
+def enrich_csv(input_path, output_path, enricher):
+    """
+    Write a copy of a CSV export with the metro columns filled in.
+
+    Returns:
+        int: Number of rows written
+    """
+    with open(input_path, newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        header, rows = enricher.enrich_rows(header, reader)
+    with open(output_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+def check_grid(stations=300, queries=20000, seed=0):
+    """
+    Compare StationGrid.nearest with a scan over every station on random
+    points around Bangalore, and time both.
+
+    Returns:
+        dict with mismatches, grid_seconds and scan_seconds
+    """
+    rng = random.Random(seed)
+    points = [(f"S{index}", rng.uniform(12.75, 13.25), rng.uniform(77.35, 77.85)) for index in range(stations)]
+    probes = [(rng.uniform(12.6, 13.4), rng.uniform(77.2, 78.0)) for _ in range(queries)]
+    grid = StationGrid(points)
+
+    started = time.perf_counter()
+    found = [grid.nearest(latitude, longitude) for latitude, longitude in probes]
+    grid_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [min((haversine_km(latitude, longitude, station_lat, station_lon), name)
+                    for name, station_lat, station_lon in points) for latitude, longitude in probes]
+    scan_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for (name, _), (_, expected_name) in zip(found, expected) if name != expected_name)
+    return {'mismatches': mismatches, 'grid_seconds': grid_seconds, 'scan_seconds': scan_seconds}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill in the nearest metro station and its distance for an export.")
+    parser.add_argument("export", nargs="?", help="CSV export with a College Name column")
+    parser.add_argument("--stations", help="CSV of metro stations (Station, Latitude, Longitude)")
+    parser.add_argument("--campuses", help="CSV of college campuses (Code or College Name, Latitude, Longitude)")
+    parser.add_argument("-o", "--output", default=None, help="Output CSV (default: <export>_Metro.csv)")
+    parser.add_argument("--check", action="store_true", help="Check the grid index against a full scan and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        outcome = check_grid()
+        print(f"Grid: {outcome['grid_seconds'] * 1000:.1f} ms, full scan: {outcome['scan_seconds'] * 1000:.1f} ms, "
+              f"mismatches: {outcome['mismatches']}")
+        sys.exit(1 if outcome['mismatches'] else 0)
+    if not (args.export and args.stations and args.campuses):
+        parser.error("export, --stations and --campuses are required")
+
+    base = args.export[:-4] if args.export.lower().endswith(".csv") else args.export
+    output = args.output or base + "_Metro.csv"
+    metro = MetroEnricher(load_stations(args.stations), load_campuses(args.campuses))
+    started = time.perf_counter()
+    count = enrich_csv(args.export, output, metro)
+    elapsed = time.perf_counter() - started
+    print(f"{count} rows enriched from {len(metro.cache)} colleges in {elapsed * 1000:.1f} ms: {output}")
+    if metro.missing_colleges:
+        print(f"No campus coordinates for: {', '.join(metro.missing_colleges)}")
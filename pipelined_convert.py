@@ -0,0 +1,371 @@
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from openpyxl import Workbook, load_workbook
+
+from batch_convert import convert_rows
+from convert_to_numbers import (DEFAULT_COLUMNS, DEFAULT_FILE_PATH, DEFAULT_SHEETS, atomic_save, count_converted,
+                                default_streaming_output, describe_columns, drop_blank_tail, print_run_report)
+from instrumentation import Metrics, ProgressReporter, peak_rss_mb
+from xlsx_reader import XlsxValueReader, parse_columns
+
+# Rows per chunk handed from the reader to the converters; smaller than the
+# streaming mode's chunks so the three stages overlap early
+PIPELINE_CHUNK_ROWS = 1000
+
+# Chunks allowed in each queue, and in flight between reader and writer
+PIPELINE_QUEUE_CHUNKS = 4
+PIPELINE_MAX_IN_FLIGHT = 16
+
+DEFAULT_WORKERS = 2
+
+# Seconds a blocked stage waits before checking whether the pipeline stopped
+POLL_SECONDS = 0.1
+
+# Seconds the writer waits for a stage process to exit before terminating it
+JOIN_SECONDS = 5
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when another stage has failed."""
+
+def _put(target, item, stop):
+    """Put item on a bounded queue, giving up once the pipeline is stopped."""
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            target.put(item, timeout=POLL_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+def _acquire(slots, stop):
+    """Take one in-flight slot, giving up once the pipeline is stopped."""
+    while not slots.acquire(timeout=POLL_SECONDS):
+        if stop.is_set():
+            raise PipelineStopped()
+
+def _get(source, stop):
+    """Take the next item from a queue, giving up once the pipeline is stopped."""
+    while True:
+        try:
+            return source.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if stop.is_set():
+                raise PipelineStopped()
+
+def _read_stage(file_path, sheet_name, start_row, workers, read_queue, write_queue, slots, stop):
+    """
+    Reader process: parse the sheet with XlsxValueReader and queue it in numbered chunks.
+
+    Chunks are (sequence number, first sheet row, rows); the header rows
+    before start_row travel as a chunk of their own. Ends with one None per
+    converter and a ('reader', trimmed rows, busy seconds) message to the writer.
+    """
+    busy = 0.0
+    trimmed = {'rows': 0}
+    try:
+        with XlsxValueReader(file_path) as reader:
+            rows = drop_blank_tail(reader.iter_rows(sheet_name), trimmed)
+            sequence = 0
+            first_row = 1
+            while True:
+                _acquire(slots, stop)
+                chunk_started = time.perf_counter()
+                limit = start_row - 1 if sequence == 0 and start_row > 1 else PIPELINE_CHUNK_ROWS
+                chunk = [values for _, values in zip(range(limit), rows)]
+                busy += time.perf_counter() - chunk_started
+                if not chunk:
+                    slots.release()
+                    break
+                _put(read_queue, (sequence, first_row, chunk), stop)
+                sequence += 1
+                first_row += len(chunk)
+        for _ in range(workers):
+            _put(read_queue, None, stop)
+        _put(write_queue, ('reader', trimmed['rows'], busy), stop)
+    except PipelineStopped:
+        read_queue.cancel_join_thread()
+        write_queue.cancel_join_thread()
+    except Exception as e:
+        stop.set()
+        write_queue.put(('error', e))
+
+def _convert_stage(start_col, end_col, start_row, read_queue, write_queue, stop):
+    """
+    Converter process: run the batch converter over every chunk the reader queues.
+
+    Sends ('chunk', sequence, first row, rows, converted rows) for each chunk
+    and ends with ('converter', busy seconds, counters) once it reads None.
+    """
+    busy = 0.0
+    tally = Metrics("pipelined_convert")
+    try:
+        while True:
+            item = _get(read_queue, stop)
+            if item is None:
+                break
+            sequence, first_row, chunk = item
+            chunk_started = time.perf_counter()
+            if first_row < start_row:
+                converted = chunk
+            else:
+                converted = convert_rows(chunk, start_col, end_col)
+                count_converted(tally, (value for values in chunk for value in values[start_col - 1:end_col]),
+                                (value for values in converted for value in values[start_col - 1:end_col]))
+            busy += time.perf_counter() - chunk_started
+            _put(write_queue, ('chunk', sequence, first_row, chunk, converted), stop)
+        _put(write_queue, ('converter', busy, dict(tally.counters)), stop)
+    except PipelineStopped:
+        write_queue.cancel_join_thread()
+    except Exception as e:
+        stop.set()
+        write_queue.put(('error', e))
+
+def process_excel_file_pipelined(file_path=DEFAULT_FILE_PATH, output_path=None, workers=DEFAULT_WORKERS,
+                                 metrics=None, columns=DEFAULT_COLUMNS, sheets=DEFAULT_SHEETS):
+    """
+    Convert the target columns with reading, converting and writing overlapped.
+
+    Produces the same workbook as the streaming mode, but the work runs in
+    three stages connected by bounded multiprocessing queues: a reader
+    process parses RawData with XlsxValueReader into chunks of rows, a pool
+    of converter processes runs the batch converter over whole chunks, and
+    the calling process copies the other sheets and then writes RawData and
+    RawData_Numbers rows back in their original order. The stages are
+    separate processes, so they overlap on separate cores instead of taking
+    turns under the GIL. A full queue blocks the stage feeding it, and at
+    most PIPELINE_MAX_IN_FLIGHT chunks exist at any time, so memory stays
+    bounded however far the reader gets ahead. Blank rows after the last row
+    with a value are left out (see drop_blank_tail).
+
+    RawData is read without styles, so a date-formatted cell in it comes
+    through as its serial number (the streaming mode writes a date).
+
+    Args:
+        file_path: Workbook containing the RawData sheet
+        output_path: Where to save the result (default: <name>_Numbers.xlsx)
+        workers: Number of converter processes
+        metrics: Optional Metrics to record phases and counters in
+        columns: Target column spec (default "D:AA")
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
+
+    Returns:
+        dict with the run statistics (mode, output_path, rows, cells, seconds,
+        rows_per_sec, peak_rss_mb, phases, trimmed_cells) plus stage_seconds, the busy time
+        of the read, convert and write stages (their sum exceeds the wall
+        time by the amount of overlap)
+    """
+    metrics = metrics or Metrics("convert_to_numbers", file_path)
+    if output_path is None:
+        output_path = default_streaming_output(file_path)
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError("Pipelined mode cannot overwrite the workbook it is reading")
+
+    start_col, end_col = parse_columns(columns)
+    start_row = 2
+    source_name, numbers_name = sheets
+    started = time.perf_counter()
+
+    print("Opening Excel file in read-only mode...")
+    with metrics.phase("load"):
+        source = load_workbook(file_path, read_only=True)
+    if source_name not in source.sheetnames:
+        source.close()
+        raise KeyError(f"{source_name} sheet not found")
+
+    output = Workbook(write_only=True)
+    sheet_order = [name for name in source.sheetnames if name != numbers_name]
+    targets = {}
+    for name in sheet_order:
+        targets[name] = output.create_sheet(name)
+        if name == source_name:
+            targets[numbers_name] = output.create_sheet(numbers_name)
+
+    print(f"Pipelining {source_name} with {workers} converter processes, "
+          f"columns {describe_columns(start_col, end_col)} from row {start_row}")
+
+    context = multiprocessing.get_context()
+    read_queue = context.Queue(maxsize=PIPELINE_QUEUE_CHUNKS)
+    write_queue = context.Queue(maxsize=PIPELINE_QUEUE_CHUNKS)
+    slots = context.Semaphore(PIPELINE_MAX_IN_FLIGHT)
+    stop = context.Event()
+    stage_seconds = {'read': 0.0, 'convert': 0.0, 'write': 0.0}
+    processes = [context.Process(target=_read_stage, name="pipeline-reader", daemon=True,
+                                 args=(file_path, source_name, start_row, workers, read_queue, write_queue,
+                                       slots, stop))]
+    processes += [context.Process(target=_convert_stage, name=f"pipeline-converter-{index + 1}", daemon=True,
+                                  args=(start_col, end_col, start_row, read_queue, write_queue, stop))
+                  for index in range(workers)]
+
+    raw_target = targets[source_name]
+    numbers_target = targets[numbers_name]
+    rows = 0
+    processed_cells = 0
+    trimmed_rows = 0
+    progress = ProgressReporter("rows")
+    pending = {}
+    next_sequence = 0
+    finished = 0
+
+    try:
+        for process in processes:
+            process.start()
+
+        # Pass-through copies of every other sheet, while the reader gets ahead
+        with metrics.phase("copy"):
+            for name in sheet_order:
+                if name == source_name:
+                    continue
+                for values in source[name].iter_rows(values_only=True):
+                    targets[name].append(values)
+
+        with metrics.phase("convert"):
+            # The reader and every converter send one closing message
+            while finished < len(processes):
+                try:
+                    item = write_queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    failed = [process.name for process in processes if process.exitcode not in (None, 0)]
+                    if failed:
+                        raise RuntimeError(f"Pipeline stage {failed[0]} exited unexpectedly")
+                    continue
+                if item[0] == 'error':
+                    raise item[1]
+                if item[0] == 'reader':
+                    _, trimmed_rows, stage_seconds['read'] = item
+                    finished += 1
+                    continue
+                if item[0] == 'converter':
+                    _, busy, counters = item
+                    stage_seconds['convert'] += busy
+                    for name, amount in counters.items():
+                        metrics.count(name, amount)
+                    finished += 1
+                    continue
+                pending[item[1]] = item
+
+                # Write every chunk that is next in line
+                while next_sequence in pending:
+                    _, _, first_row, chunk, converted = pending.pop(next_sequence)
+                    chunk_started = time.perf_counter()
+                    for values, converted_values in zip(chunk, converted):
+                        raw_target.append(values)
+                        numbers_target.append(converted_values)
+                    if first_row >= start_row:
+                        rows += len(chunk)
+                        processed_cells += sum(max(0, min(end_col, len(values)) - start_col + 1) for values in chunk)
+                    stage_seconds['write'] += time.perf_counter() - chunk_started
+                    next_sequence += 1
+                    slots.release()
+                    progress.update(rows)
+    finally:
+        # Releases the other stages if the writer is leaving early
+        stop.set()
+        for process in processes:
+            process.join(JOIN_SECONDS)
+            if process.is_alive():
+                process.terminate()
+        source.close()
+
+    if pending:
+        raise RuntimeError(f"Pipeline ended with {len(pending)} chunks not written")
+
+    trimmed_cells = trimmed_rows * (end_col - start_col + 1)
+    metrics.count('cells_read', processed_cells)
+    metrics.count('cells_written', processed_cells)
+    metrics.count('cells_trimmed', trimmed_cells)
+
+    print(f"Saving converted workbook to {output_path}...")
+    with metrics.phase("save"):
+        atomic_save(output, output_path)
+
+    elapsed = time.perf_counter() - started
+
+    print("Conversion completed successfully!")
+    print(f"Total cells processed: {processed_cells}")
+    print(f"File saved: {output_path}")
+
+    return {
+        'mode': 'pipelined',
+        'output_path': output_path,
+        'rows': rows,
+        'cells': processed_cells,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': dict(metrics.phases),
+        'trimmed_cells': trimmed_cells,
+        'stage_seconds': stage_seconds,
+    }
+
+def compare_with_streaming(file_path, workers=DEFAULT_WORKERS, repeats=3):
+    """
+    Time the streaming and pipelined modes on the same workbook.
+
+    Each mode runs repeats times (best time kept) with its console output
+    discarded, and the two outputs are checked to hold the same values.
+
+    Returns:
+        dict with streaming_seconds, pipelined_seconds, speedup and identical
+    """
+    import contextlib
+
+    from convert_to_numbers import process_excel_file_streaming
+
+    root, ext = os.path.splitext(file_path)
+    streaming_output = f"{root}_stream_check{ext}"
+    pipelined_output = f"{root}_pipeline_check{ext}"
+    timings = {'streaming': [], 'pipelined': []}
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for _ in range(repeats):
+            with contextlib.redirect_stdout(devnull):
+                streaming_stats = process_excel_file_streaming(file_path, streaming_output)
+                pipelined_stats = process_excel_file_pipelined(file_path, pipelined_output, workers)
+            timings['streaming'].append(streaming_stats['seconds'])
+            timings['pipelined'].append(pipelined_stats['seconds'])
+
+    first = load_workbook(streaming_output, read_only=True)
+    second = load_workbook(pipelined_output, read_only=True)
+    try:
+        identical = first.sheetnames == second.sheetnames and all(
+            list(first[name].iter_rows(values_only=True)) == list(second[name].iter_rows(values_only=True))
+            for name in first.sheetnames)
+    finally:
+        first.close()
+        second.close()
+        os.remove(streaming_output)
+        os.remove(pipelined_output)
+
+    streaming_seconds = min(timings['streaming'])
+    pipelined_seconds = min(timings['pipelined'])
+    print(f"Streaming: {streaming_seconds:.2f}s, pipelined ({workers} converters): {pipelined_seconds:.2f}s, "
+          f"speedup {streaming_seconds / pipelined_seconds:.2f}x")
+    stages = pipelined_stats['stage_seconds']
+    print(f"Pipelined stage busy time: read {stages['read']:.2f}s, convert {stages['convert']:.2f}s, "
+          f"write {stages['write']:.2f}s")
+    print("Outputs identical" if identical else "❌ Outputs differ")
+
+    return {
+        'streaming_seconds': streaming_seconds,
+        'pipelined_seconds': pipelined_seconds,
+        'speedup': streaming_seconds / pipelined_seconds,
+        'identical': identical,
+    }
+
+if __name__ == "__main__":
+    # Usage: python pipelined_convert.py [--compare] [workbook] [output] [workers]
+    args = sys.argv[1:]
+    if "--compare" in args:
+        args.remove("--compare")
+        compare_with_streaming(args[0] if args else DEFAULT_FILE_PATH,
+                               int(args[1]) if len(args) > 1 else DEFAULT_WORKERS)
+    else:
+        run_stats = process_excel_file_pipelined(args[0] if args else DEFAULT_FILE_PATH,
+                                                 args[1] if len(args) > 1 else None,
+                                                 int(args[2]) if len(args) > 2 else DEFAULT_WORKERS)
+        print_run_report(run_stats)
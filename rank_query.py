@@ -0,0 +1,293 @@
+import argparse
+import contextlib
+import csv
+import sqlite3
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Course codes used for the Bangalore CS/EC metro export (KCET25 prompts.txt)
+METRO_EXPORT_COURSES = ("AD", "AI", "CA", "CB", "CC", "CD", "CF", "CS", "CY",
+                        "DS", "EC", "ES", "EV", "IC", "IE", "RI", "TC")
+
+# Spellings found in college names, mapped to one city name
+KNOWN_CITIES = {
+    "bangalore": "Bangalore", "bengaluru": "Bangalore",
+    "mysore": "Mysore", "mysuru": "Mysore",
+    "mangalore": "Mangalore", "mangaluru": "Mangalore",
+    "belgaum": "Belagavi", "belagavi": "Belagavi",
+    "hubli": "Hubballi", "hubballi": "Hubballi",
+    "dharwad": "Dharwad", "tumkur": "Tumakuru", "tumakuru": "Tumakuru",
+    "davangere": "Davangere", "shimoga": "Shivamogga", "shivamogga": "Shivamogga",
+    "hassan": "Hassan", "mandya": "Mandya", "udupi": "Udupi", "manipal": "Udupi",
+    "bellary": "Ballari", "ballari": "Ballari", "bidar": "Bidar",
+    "gulbarga": "Kalaburagi", "kalaburagi": "Kalaburagi", "bijapur": "Vijayapura",
+    "vijayapura": "Vijayapura", "raichur": "Raichur", "chikmagalur": "Chikkamagaluru",
+    "chikkamagaluru": "Chikkamagaluru", "kolar": "Kolar", "karwar": "Karwar",
+}
+
+COLLEGE_HEADERS = ("College Name", "College")
+COURSE_HEADERS = ("Course Name", "Course")
+
+def code_prefix(value):
+    """Return the code at the start of a "<code> <name>" cell ("E115 S J B ..." -> "E115")."""
+    if value is None:
+        return ""
+    return str(value).strip().split(" ", 1)[0]
+
+def city_of(college_name):
+    """
+    Guess the city of a college from its name.
+
+    Returns:
+        The normalised city of the last known city word in the name, or the
+        last word of the name when no known city appears
+    """
+    if not college_name:
+        return ""
+    words = str(college_name).replace(",", " ").replace("-", " ").split()
+    for word in reversed(words):
+        city = KNOWN_CITIES.get(word.lower().strip("."))
+        if city:
+            return city
+    return words[-1] if words else ""
+
+def as_rank(value):
+    """Return a cutoff rank as a number, or None for empty/non-numeric cells."""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+class Dictionary:
+    """Dictionary encoding of a text column: each distinct value gets a small int id."""
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def encode(self, value):
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        return self.ids[value]
+
+    def lookup(self, values):
+        """Return the set of ids for the given values (case-insensitive); unknown values are ignored."""
+        wanted = {str(value).lower() for value in values}
+        return {code for value, code in self.ids.items() if str(value).lower() in wanted}
+
+class CutoffTable:
+    """
+    In-memory cutoff table with rank-range lookups and encoded filters.
+
+    College code, course code and city are dictionary-encoded into int
+    arrays. Each category column gets a rank index (ranks sorted ascending
+    with the matching row ids) on first use, so a rank band is found with
+    two bisections and only the rows inside it are filtered.
+    """
+
+    def __init__(self, header, rows):
+        self.header = [str(name) for name in header]
+        self.rows = [tuple(row) for row in rows]
+        self.columns = {name.lower(): index for index, name in enumerate(self.header)}
+
+        college_col = self._find(COLLEGE_HEADERS)
+        course_col = self._find(COURSE_HEADERS)
+        self.colleges = Dictionary()
+        self.courses = Dictionary()
+        self.cities = Dictionary()
+        self.college_ids = array('i')
+        self.course_ids = array('i')
+        self.city_ids = array('i')
+        for row in self.rows:
+            college = row[college_col] if college_col is not None and college_col < len(row) else None
+            course = row[course_col] if course_col is not None and course_col < len(row) else None
+            self.college_ids.append(self.colleges.encode(code_prefix(college)))
+            self.course_ids.append(self.courses.encode(code_prefix(course)))
+            self.city_ids.append(self.cities.encode(city_of(college)))
+
+        self._rank_index = {}
+
+    def _find(self, candidates):
+        for candidate in candidates:
+            if candidate.lower() in self.columns:
+                return self.columns[candidate.lower()]
+        return None
+
+    def column_index(self, name):
+        """Return the position of a column by header name (case-insensitive)."""
+        try:
+            return self.columns[str(name).lower()]
+        except KeyError:
+            raise KeyError(f"Unknown column: {name}") from None
+
+    def rank_index(self, category):
+        """Return (sorted ranks, row ids) for a category column, building it once."""
+        key = str(category).lower()
+        if key not in self._rank_index:
+            col = self.column_index(category)
+            pairs = sorted(
+                (rank, row_id)
+                for row_id, row in enumerate(self.rows)
+                if col < len(row) and (rank := as_rank(row[col])) is not None
+            )
+            self._rank_index[key] = ([rank for rank, _ in pairs], array('i', (row_id for _, row_id in pairs)))
+        return self._rank_index[key]
+
+    def query(self, category="GM", rank_min=None, rank_max=None, courses=None, colleges=None, cities=None):
+        """
+        Yield row ids inside a rank band, in ascending rank order.
+
+        Args:
+            category: Category column to filter and sort on (e.g. "GM", "2AG")
+            rank_min: Lowest rank to include (None = no lower bound)
+            rank_max: Highest rank to include (None = no upper bound)
+            courses: Course codes to keep, e.g. ("CS", "DS") (None = all)
+            colleges: College codes to keep, e.g. ("E115",) (None = all)
+            cities: Cities to keep, e.g. ("Bangalore",) (None = all)
+        """
+        ranks, row_ids = self.rank_index(category)
+        low = 0 if rank_min is None else bisect_left(ranks, rank_min)
+        high = len(ranks) if rank_max is None else bisect_right(ranks, rank_max)
+
+        course_set = None if courses is None else self.courses.lookup(courses)
+        college_set = None if colleges is None else self.colleges.lookup(colleges)
+        city_set = None if cities is None else self.cities.lookup(cities)
+
+        for position in range(low, high):
+            row_id = row_ids[position]
+            if course_set is not None and self.course_ids[row_id] not in course_set:
+                continue
+            if college_set is not None and self.college_ids[row_id] not in college_set:
+                continue
+            if city_set is not None and self.city_ids[row_id] not in city_set:
+                continue
+            yield row_id
+
+    def export_csv(self, output, row_ids, columns=None, metro=None):
+        """
+        Stream the selected rows to CSV.
+
+        Args:
+            output: File path or an open text file
+            row_ids: Iterable of row ids (e.g. from query)
+            columns: Header names to write (default: every column)
+            metro: Optional metro_enrich.MetroEnricher; the nearest station and
+                its distance are appended to every row
+
+        Returns:
+            int: Number of rows written
+        """
+        columns = list(columns or self.header)
+        indexes = [self.column_index(name) for name in columns]
+
+        handle = open(output, "w", newline="", encoding="utf-8") if isinstance(output, str) else output
+        try:
+            writer = csv.writer(handle)
+            extra_header = []
+            if metro is not None:
+                from metro_enrich import METRO_HEADERS
+                extra_header = list(METRO_HEADERS)
+            writer.writerow([self.header[index] for index in indexes] + extra_header)
+            written = 0
+            for row_id in row_ids:
+                row = self.rows[row_id]
+                values = [row[index] if index < len(row) else None for index in indexes]
+                if metro is not None:
+                    values.extend(metro.lookup(self.colleges.values[self.college_ids[row_id]]))
+                writer.writerow(values)
+                written += 1
+        finally:
+            if isinstance(output, str):
+                handle.close()
+        return written
+
+def load_from_sqlite(db_path, table="For_KCET25_R1"):
+    """Load a cutoff table written by sqlite_loader."""
+    connection = sqlite3.connect(db_path)
+    try:
+        cursor = connection.execute(f'SELECT * FROM "{table.replace(chr(34), chr(34) * 2)}" ORDER BY rowid')
+        header = [description[0] for description in cursor.description]
+        return CutoffTable(header, cursor.fetchall())
+    finally:
+        connection.close()
+
+def load_from_workbook(file_path, sheet_name="RawData_Numbers"):
+    """Load a cutoff table from a converted sheet (read through the sheet cache)."""
+    from validation_engine import open_sheet_rows
+
+    sheets, close = open_sheet_rows(file_path, (sheet_name,))
+    try:
+        if sheet_name not in sheets:
+            raise KeyError(f"{sheet_name} sheet not found")
+        rows = sheets[sheet_name]
+        header = next(rows, ())
+        return CutoffTable(header, list(rows))
+    finally:
+        close()
+
+def load_from_csv(csv_path):
+    """Load a cutoff table from a CSV export."""
+    with open(csv_path, newline="", encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        return CutoffTable(header, list(reader))
+
+def load_table(source, table="For_KCET25_R1", sheet_name="RawData_Numbers"):
+    """Load a cutoff table from a .db/.sqlite, .csv or .xlsx file."""
+    lowered = source.lower()
+    if lowered.endswith((".db", ".sqlite", ".sqlite3")):
+        return load_from_sqlite(source, table)
+    if lowered.endswith(".csv"):
+        return load_from_csv(source)
+    return load_from_workbook(source, sheet_name)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export cutoff rows for a rank band.")
+    parser.add_argument("source", help="SQLite database, converted workbook or CSV")
+    parser.add_argument("--category", default="GM", help="Category column to filter and sort on")
+    parser.add_argument("--min", type=float, default=None, dest="rank_min", help="Lowest rank")
+    parser.add_argument("--max", type=float, default=None, dest="rank_max", help="Highest rank")
+    parser.add_argument("--courses", default=None,
+                        help="Comma-separated course codes, or 'metro' for the CS/EC export list")
+    parser.add_argument("--colleges", default=None, help="Comma-separated college codes")
+    parser.add_argument("--cities", default=None, help="Comma-separated cities, e.g. Bangalore")
+    parser.add_argument("--columns", default=None, help="Comma-separated columns to export")
+    parser.add_argument("--table", default="For_KCET25_R1", help="SQLite table name")
+    parser.add_argument("--stations", default=None,
+                        help="Metro station coordinates CSV; adds the nearest station and distance (needs --campuses)")
+    parser.add_argument("--campuses", default=None, help="College campus coordinates CSV, keyed by college code")
+    parser.add_argument("-o", "--output", default=None, help="CSV file (default: stdout)")
+    args = parser.parse_args()
+
+    def split(value):
+        return None if value is None else [part.strip() for part in value.split(",") if part.strip()]
+
+    started = time.perf_counter()
+    # Keep loader progress messages out of a CSV written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        cutoffs = load_table(args.source, args.table)
+    loaded = time.perf_counter()
+
+    course_filter = METRO_EXPORT_COURSES if args.courses == "metro" else split(args.courses)
+    matches = cutoffs.query(args.category, args.rank_min, args.rank_max,
+                            course_filter, split(args.colleges), split(args.cities))
+    export_columns = split(args.columns)
+    metro = None
+    if args.stations or args.campuses:
+        if not (args.stations and args.campuses):
+            parser.error("--stations and --campuses go together")
+        from metro_enrich import MetroEnricher, load_campuses, load_stations
+        metro = MetroEnricher(load_stations(args.stations), load_campuses(args.campuses))
+    count = cutoffs.export_csv(args.output or sys.stdout, matches, export_columns, metro)
+    finished = time.perf_counter()
+
+    print(f"{count} rows exported (load {loaded - started:.3f}s, query+export {(finished - loaded) * 1000:.1f} ms)",
+          file=sys.stderr)
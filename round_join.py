@@ -0,0 +1,311 @@
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import sys
+import time
+from array import array
+
+from convert_to_numbers import DEFAULT_COLUMNS
+from rank_query import COLLEGE_HEADERS, COURSE_HEADERS, as_rank, code_prefix
+from xlsx_reader import parse_columns
+
+# Join key columns written ahead of the ranks
+KEY_HEADERS = ("College Code", "Course Code", "College Name", "Course Name")
+
+# Rows handed to executemany per call when writing SQLite
+WRITE_BATCH_ROWS = 50000
+
+MISSING = math.nan
+
+def parse_source(spec):
+    """
+    Split a "LABEL=PATH[@TABLE]" source spec.
+
+    The label defaults to the file name without its extension (so files
+    with the same name in different folders need an explicit label) and the
+    table (SQLite sources only) to sqlite_loader's default table.
+
+    Returns:
+        (label, path, table)
+    """
+    label, separator, path = spec.partition("=")
+    if not separator:
+        label, path = os.path.splitext(os.path.basename(spec))[0], spec
+    path, _, table = path.partition("@")
+    return label, path, table or None
+
+def open_source(path, table=None, sheet_name="RawData_Numbers"):
+    """
+    Open the converted rows of one round.
+
+    Args:
+        path: Converted workbook (read through the sheet cache), CSV export or
+            SQLite database written by sqlite_loader
+        table: SQLite table (default For_KCET25_R1)
+        sheet_name: Sheet of a workbook to read
+
+    Returns:
+        (header, row iterator, close)
+    """
+    if path.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        connection = sqlite3.connect(path)
+        name = table or "For_KCET25_R1"
+        cursor = connection.execute(f'SELECT * FROM "{name.replace(chr(34), chr(34) * 2)}" ORDER BY rowid')
+        return [description[0] for description in cursor.description], cursor, connection.close
+
+    from validation_engine import open_sheet_rows
+
+    sheets, close = open_sheet_rows(path, (sheet_name,))
+    if sheet_name not in sheets:
+        close()
+        raise KeyError(f"{path}: {sheet_name} sheet not found")
+    rows = sheets[sheet_name]
+    return [value for value in next(rows, ())], rows, close
+
+def _find(header, candidates):
+    lowered = {str(name).strip().lower(): index for index, name in reversed(list(enumerate(header)))}
+    for candidate in candidates:
+        if candidate.lower() in lowered:
+            return lowered[candidate.lower()]
+    return None
+
+class RoundJoin:
+    """
+    Hash join of several rounds (or years) of converted cutoffs on (college code, course code).
+
+    Each round is streamed once. A key seen for the first time gets the next
+    slot, and every round keeps one array of ranks per category indexed by
+    slot, so memory grows with the number of distinct college/course pairs
+    times rounds, not with the rows read. Rounds that lack a category or a
+    key leave blanks.
+
+    Args:
+        categories: Category headers to join (e.g. GM, 1G, ...), in output order
+    """
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.slots = {}
+        self.names = []
+        self.labels = []
+        self.ranks = []
+        self.stats = []
+
+    def _grow(self, count):
+        for columns in self.ranks:
+            for ranks in columns:
+                ranks.extend([MISSING] * (count - len(ranks)))
+
+    def add_round(self, label, header, rows):
+        """
+        Stream one round's rows into the join.
+
+        Rows without a college or course code are skipped; when a key repeats
+        inside a round the first row wins.
+
+        Returns:
+            dict with label, rows, keys, new_keys, duplicates, skipped and
+            missing_categories
+        """
+        if label in self.labels:
+            raise ValueError(f"{label}: a round with this label was already added")
+        college_col = _find(header, COLLEGE_HEADERS)
+        course_col = _find(header, COURSE_HEADERS)
+        if college_col is None or course_col is None:
+            raise ValueError(f"{label}: needs a college and a course column")
+        category_cols = [_find(header, (category,)) for category in self.categories]
+
+        columns = [array('d') for _ in self.categories]
+        self.labels.append(label)
+        self.ranks.append(columns)
+        self._grow(len(self.names))
+        seen = set()
+        stats = {'label': label, 'rows': 0, 'keys': 0, 'new_keys': 0, 'duplicates': 0, 'skipped': 0,
+                 'missing_categories': [category for category, col in zip(self.categories, category_cols)
+                                        if col is None]}
+        present = [(position, col) for position, col in enumerate(category_cols) if col is not None]
+
+        for row in rows:
+            stats['rows'] += 1
+            college = row[college_col] if college_col < len(row) else None
+            course = row[course_col] if course_col < len(row) else None
+            key = (code_prefix(college), code_prefix(course))
+            if not key[0] or not key[1]:
+                stats['skipped'] += 1
+                continue
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self.slots[key] = len(self.names)
+                self.names.append((college, course))
+                self._grow(slot + 1)
+                stats['new_keys'] += 1
+            elif slot in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(slot)
+            for position, col in present:
+                rank = as_rank(row[col]) if col < len(row) else None
+                if rank is not None:
+                    columns[position][slot] = rank
+
+        stats['keys'] = len(seen)
+        self.stats.append(stats)
+        return stats
+
+    def output_header(self):
+        """
+        Return the joined header: the keys, then per category one column per
+        round followed by the movement between consecutive rounds ("GM R2-R1")
+        and, with more than two rounds, between the first and the last.
+        """
+        header = list(KEY_HEADERS)
+        for category in self.categories:
+            header.extend(f"{category} {label}" for label in self.labels)
+            header.extend(f"{category} {label}-{previous}" for previous, label in self._pairs())
+        return header
+
+    def _pairs(self):
+        pairs = list(zip(self.labels, self.labels[1:]))
+        if len(self.labels) > 2:
+            pairs.append((self.labels[0], self.labels[-1]))
+        return pairs
+
+    def iter_rows(self):
+        """
+        Yield one joined row per key, in first-seen order.
+
+        A movement is the later closing rank minus the earlier one, so a
+        positive value means the course closed at a higher (easier) rank; it
+        is blank when either rank is.
+        """
+        positions = {label: index for index, label in enumerate(self.labels)}
+        pairs = [(positions[previous], positions[label]) for previous, label in self._pairs()]
+        for (college_code, course_code), slot in self.slots.items():
+            college, course = self.names[slot]
+            row = [college_code, course_code, college, course]
+            for position in range(len(self.categories)):
+                values = [_number(columns[position][slot]) for columns in self.ranks]
+                row.extend(values)
+                row.extend(None if values[before] is None or values[after] is None else values[after] - values[before]
+                           for before, after in pairs)
+            yield row
+
+def _number(value):
+    if value != value:
+        return None
+    return int(value) if value.is_integer() else value
+
+def write_csv(join, output_path):
+    """Write the joined rows to CSV. Returns the number of rows written."""
+    written = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(join.output_header())
+        for row in join.iter_rows():
+            writer.writerow(row)
+            written += 1
+    return written
+
+def write_sqlite(join, db_path, table):
+    """
+    Replace a SQLite table with the joined rows, indexed on the join key.
+
+    Returns:
+        int: Number of rows written
+    """
+    header = join.output_header()
+
+    def quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    definitions = [f"{quote(name)} TEXT" for name in KEY_HEADERS]
+    definitions += [f"{quote(name)} INTEGER" for name in header[len(KEY_HEADERS):]]
+    placeholders = ", ".join("?" for _ in header)
+
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            connection.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+            connection.execute(f"CREATE TABLE {quote(table)} ({', '.join(definitions)})")
+            written = 0
+            rows = join.iter_rows()
+            while True:
+                batch = [row for _, row in zip(range(WRITE_BATCH_ROWS), rows)]
+                if not batch:
+                    break
+                connection.executemany(f"INSERT INTO {quote(table)} VALUES ({placeholders})", batch)
+                written += len(batch)
+            connection.execute(f"CREATE INDEX {quote(table + '_key')} ON {quote(table)} "
+                               f"({quote(KEY_HEADERS[0])}, {quote(KEY_HEADERS[1])})")
+    finally:
+        connection.close()
+    return written
+
+def join_rounds(sources, output_path, columns=DEFAULT_COLUMNS, sheet_name="RawData_Numbers", table=None):
+    """
+    Join the converted cutoffs of several rounds or years and write the rank movements.
+
+    The categories are the headers of the target columns of the first
+    source; later sources are matched by header name, so their columns may
+    be in a different order.
+
+    Args:
+        sources: List of "LABEL=PATH[@TABLE]" specs (see parse_source), oldest first
+        output_path: .csv file, or .db/.sqlite database (the table is replaced)
+        columns: Target column spec of the first source (default "D:AA")
+        sheet_name: Converted sheet of workbook sources
+        table: Output SQLite table (default: round_movement)
+
+    Returns:
+        dict with rounds (per-round stats), keys, rows_written and seconds
+    """
+    if len(sources) < 2:
+        raise ValueError("Need at least two sources to compare")
+    started = time.perf_counter()
+    start_col, end_col = parse_columns(columns)
+    parsed = [parse_source(spec) for spec in sources]
+    labels = [label for label, _, _ in parsed]
+    duplicates = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate round labels: {', '.join(duplicates)}; "
+                         f"name each source with LABEL=PATH (e.g. R1=R1/KCET.xlsx)")
+    join = None
+
+    for label, path, source_table in parsed:
+        header, rows, close = open_source(path, source_table, sheet_name)
+        try:
+            if join is None:
+                categories = [str(name).strip() for name in header[start_col - 1:end_col] if name is not None]
+                join = RoundJoin(categories)
+            stats = join.add_round(label, header, rows)
+        finally:
+            close()
+        missing = f", no {', '.join(stats['missing_categories'])}" if stats['missing_categories'] else ""
+        print(f"{label}: {stats['rows']} rows, {stats['keys']} keys ({stats['new_keys']} new), "
+              f"{stats['duplicates']} duplicates, {stats['skipped']} without a key{missing}")
+
+    if output_path.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        written = write_sqlite(join, output_path, table or "round_movement")
+    else:
+        written = write_csv(join, output_path)
+    elapsed = time.perf_counter() - started
+    print(f"{written} college/course rows x {len(join.categories)} categories joined in {elapsed:.2f}s: {output_path}")
+    return {'rounds': join.stats, 'keys': len(join.slots), 'rows_written': written, 'seconds': elapsed}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join converted cutoffs of several rounds/years on college and course.")
+    parser.add_argument("sources", nargs="+",
+                        help="LABEL=PATH[@TABLE], oldest first: converted workbooks, CSV exports or SQLite databases")
+    parser.add_argument("-o", "--output", default="round_movement.csv", help="Output .csv or .db file")
+    parser.add_argument("--table", default=None, help="Output SQLite table (default: round_movement)")
+    parser.add_argument("--columns", default=DEFAULT_COLUMNS, help="Category columns of the first source (default D:AA)")
+    parser.add_argument("--sheet", default="RawData_Numbers", help="Converted sheet of workbook sources")
+    args = parser.parse_args()
+
+    try:
+        join_rounds(args.sources, args.output, args.columns, args.sheet, args.table)
+    except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
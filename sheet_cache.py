@@ -0,0 +1,457 @@
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from validation_engine import is_missing_data
+from xlsx_reader import XlsxValueReader
+
+# KCET_SHEET_CACHE overrides the location (the benchmark points it at a temp dir)
+DEFAULT_CACHE_DIR = (os.environ.get("KCET_SHEET_CACHE")
+                     or os.path.join(os.path.expanduser("~"), ".cache", "kcet_sheets"))
+DEFAULT_CACHE_LIMIT_MB = 1024
+
+# Cell kinds stored in the snapshot; the payload array holds the value itself
+# (int), the float bits (float) or an index into the pickled object table
+KIND_EMPTY, KIND_INT, KIND_FLOAT, KIND_OBJECT = 0, 1, 2, 3
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Rows decoded per step when a snapshot is iterated row by row
+DECODE_CHUNK_ROWS = 4096
+
+# Rows encoded per step when a snapshot is built (a multiple of 8, so every
+# step's missing bitmap packs into whole bytes)
+ENCODE_CHUNK_ROWS = 4096
+
+# A build lock untouched for this long belongs to a build that died
+BUILD_LOCK_STALE_SECONDS = 600
+BUILD_LOCK_POLL_SECONDS = 0.1
+
+INDEX_FILE = "index.json"
+META_FILE = "meta.json"
+
+# Bumped whenever the snapshot files change; older entries are rebuilt
+SNAPSHOT_FORMAT = 3
+
+def content_hash(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SheetSnapshot:
+    """
+    Columnar, memory-mapped copy of one worksheet's values.
+
+    kinds and payload are (columns x rows) arrays opened with mmap_mode="r",
+    so a column is contiguous on disk and is read without copying. missing
+    is the packed missing-value bitmap (is_missing_data for every cell, one
+    bit per row), also left memory-mapped; missing_rows unpacks a slice of
+    it. widths is the length of every row as the workbook reader returned it.
+    """
+
+    def __init__(self, directory, name, rows, cols):
+        self.name = name
+        self.rows = rows
+        self.cols = cols
+        self.kinds = np.load(os.path.join(directory, f"{name}.kinds.npy"), mmap_mode="r")
+        self.payload = np.load(os.path.join(directory, f"{name}.payload.npy"), mmap_mode="r")
+        self.missing = np.load(os.path.join(directory, f"{name}.missing.npy"), mmap_mode="r")
+        self.widths = np.load(os.path.join(directory, f"{name}.widths.npy"), mmap_mode="r")
+        self._objects_path = os.path.join(directory, f"{name}.objects.pkl")
+        self._objects = None
+        self._object_table = None
+
+    @property
+    def objects(self):
+        """The pickled object table, loaded on first use (a worker that only reads numbers never loads it)."""
+        if self._objects is None:
+            with open(self._objects_path, "rb") as handle:
+                self._objects = pickle.load(handle)
+        return self._objects
+
+    @property
+    def object_table(self):
+        """The object list as an object ndarray, built on first use so payload indexes can pick from it."""
+        if self._object_table is None:
+            table = np.empty(len(self.objects), dtype=object)
+            table[:] = self.objects
+            self._object_table = table
+        return self._object_table
+
+    def missing_rows(self, start=0, stop=None):
+        """
+        Unpack the missing-value bits of rows start..stop-1 (0-based).
+
+        Only the packed bytes covering the slice are read.
+
+        Returns:
+            (columns x rows) bool ndarray
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if stop <= start:
+            return np.zeros((self.cols, 0), dtype=bool)
+        first = start >> 3
+        bits = np.unpackbits(self.missing[:, first:(stop + 7) >> 3], axis=1)
+        return bits[:, start - (first << 3):stop - (first << 3)].astype(bool)
+
+    def extent(self, min_col=1, max_col=None):
+        """
+        Return (last_row, last_col) of the cells that hold a value.
+
+        Same rules as XlsxValueReader.extent: empty cells and "" do not
+        count, last_col only looks at min_col..max_col, 0 means none found.
+        """
+        filled = self.kinds != KIND_EMPTY
+        is_object = self.kinds == KIND_OBJECT
+        if is_object.any():
+            blank = np.zeros(len(self.objects), dtype=bool)
+            blank[:] = self.object_table == ""
+            filled[is_object] = ~blank[self.payload[is_object]]
+
+        rows = np.flatnonzero(filled.any(axis=0))
+        columns = np.flatnonzero(filled[min_col - 1:max_col].any(axis=1))
+        last_row = int(rows[-1]) + 1 if len(rows) else 0
+        last_col = int(columns[-1]) + min_col if len(columns) else 0
+        return last_row, last_col
+
+    def _decode(self, index):
+        """Decode the rows picked by index (0-based slice or array) into a (columns x rows) object array."""
+        kinds = self.kinds[:, index]
+        payload = self.payload[:, index]
+        values = np.empty(kinds.shape, dtype=object)
+
+        is_int = kinds == KIND_INT
+        values[is_int] = payload[is_int].astype(object)
+        is_float = kinds == KIND_FLOAT
+        values[is_float] = payload.view(np.float64)[is_float].astype(object)
+        is_object = kinds == KIND_OBJECT
+        if is_object.any():
+            values[is_object] = self.object_table[payload[is_object]]
+        return values
+
+    def iter_rows(self, min_row=1, max_row=None):
+        """
+        Yield row tuples like openpyxl's iter_rows(values_only=True).
+
+        Args:
+            min_row: First row to yield (1-based)
+            max_row: Last row to yield (default: last row of the sheet)
+        """
+        stop = self.rows if max_row is None else min(max_row, self.rows)
+        for start in range(min_row - 1, stop, DECODE_CHUNK_ROWS):
+            yield from self._row_tuples(slice(start, min(start + DECODE_CHUNK_ROWS, stop)))
+
+    def take_rows(self, row_numbers):
+        """
+        Return the row tuples of arbitrary rows, without touching the rows in between.
+
+        Args:
+            row_numbers: Ascending 1-based row numbers; those past the last row are skipped
+
+        Returns:
+            list of row tuples, in the order of row_numbers
+        """
+        index = np.asarray([row - 1 for row in row_numbers if row <= self.rows], dtype=np.intp)
+        return self._row_tuples(index)
+
+    def _row_tuples(self, index):
+        block = self._decode(index)
+        widths = self.widths[index]
+        if (widths == self.cols).all():
+            return list(map(tuple, block.T.tolist()))
+        # Rows shorter than the widest one keep their own length
+        return [tuple(values[:width]) for values, width in zip(block.T.tolist(), widths.tolist())]
+
+def _encode_rows(rows, width, objects, codes):
+    """
+    Encode row tuples into kinds, payload, packed missing and row-width arrays.
+
+    objects and codes are the object table and its (type, value) -> index
+    map; they are shared by every chunk of a sheet and extended in place.
+    """
+    count = len(rows)
+    kinds = np.zeros((width, count), dtype=np.uint8)
+    payload = np.zeros((width, count), dtype=np.int64)
+    missing = np.zeros((width, count), dtype=bool)
+    floats = payload.view(np.float64)
+
+    for r, values in enumerate(rows):
+        for c, value in enumerate(values):
+            if value is None:
+                missing[c, r] = True
+                continue
+            value_type = type(value)
+            if value_type is int and INT64_MIN <= value <= INT64_MAX:
+                kinds[c, r] = KIND_INT
+                payload[c, r] = value
+            elif value_type is float:
+                kinds[c, r] = KIND_FLOAT
+                floats[c, r] = value
+            else:
+                kinds[c, r] = KIND_OBJECT
+                # Text repeats a lot (" --" placeholders, names): each distinct value is stored once
+                key = (value_type, value)
+                code = codes.get(key)
+                if code is None:
+                    code = codes[key] = len(objects)
+                    objects.append(value)
+                payload[c, r] = code
+                missing[c, r] = is_missing_data(value)
+
+    widths = np.fromiter((len(values) for values in rows), dtype=np.int32, count=count)
+    return kinds, payload, np.packbits(missing, axis=1), widths
+
+def _encode_sheet(row_iter):
+    """
+    Encode a sheet's rows ENCODE_CHUNK_ROWS at a time.
+
+    Only one chunk of row tuples is alive at once; the encoded chunks are
+    then copied into the full (columns x rows) arrays, each freed as soon
+    as it has been copied.
+
+    Returns:
+        (kinds, payload, missing, objects, widths), missing packed by rows
+    """
+    parts = []
+    objects = []
+    codes = {}
+    chunk = []
+    for values in row_iter:
+        chunk.append(values)
+        if len(chunk) >= ENCODE_CHUNK_ROWS:
+            parts.append(_encode_rows(chunk, max(len(values) for values in chunk), objects, codes))
+            chunk = []
+    if chunk:
+        parts.append(_encode_rows(chunk, max(len(values) for values in chunk), objects, codes))
+
+    rows = sum(len(part[3]) for part in parts)
+    width = max((len(part[0]) for part in parts), default=0)
+    kinds = np.zeros((width, rows), dtype=np.uint8)
+    payload = np.zeros((width, rows), dtype=np.int64)
+    missing = np.zeros((width, (rows + 7) >> 3), dtype=np.uint8)
+    widths = np.zeros(rows, dtype=np.int32)
+
+    start = 0
+    parts.reverse()
+    while parts:
+        part_kinds, part_payload, part_missing, part_widths = parts.pop()
+        part_width, count = part_kinds.shape
+        stop = start + count
+        kinds[:part_width, start:stop] = part_kinds
+        payload[:part_width, start:stop] = part_payload
+        # Chunks hold a multiple of 8 rows, so their bitmaps start on a byte
+        missing[:part_width, start >> 3:(stop + 7) >> 3] = part_missing
+        widths[start:stop] = part_widths
+        start = stop
+    return kinds, payload, missing, objects, widths
+
+@contextlib.contextmanager
+def _build_lock(directory):
+    """
+    Hold the lock file of a cache entry while its snapshot is built.
+
+    The lock is a file created with O_EXCL, which behaves the same on every
+    platform. A lock older than BUILD_LOCK_STALE_SECONDS was left behind by
+    a build that died and is taken over.
+    """
+    lock_path = directory + ".lock"
+    while True:
+        try:
+            handle = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > BUILD_LOCK_STALE_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                # Released (or taken over) meanwhile: try again right away
+                continue
+            time.sleep(BUILD_LOCK_POLL_SECONDS)
+    try:
+        os.write(handle, str(os.getpid()).encode("ascii"))
+        os.close(handle)
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def build_snapshot(file_path, directory, sheet_names):
+    """
+    Parse the workbook once with the direct xlsx reader and write the columnar snapshot.
+
+    The files are written to a private staging directory next to the entry
+    and moved into place at the end; the caller holds the entry's build lock.
+
+    Args:
+        file_path: Source workbook
+        directory: Cache entry directory to create
+        sheet_names: Sheets to snapshot (missing ones are recorded as absent)
+
+    Returns:
+        dict: {sheet name: {'rows', 'cols'}} for the sheets that exist
+    """
+    parent, key = os.path.split(directory)
+    staging = tempfile.mkdtemp(prefix=f"{key}.", suffix=".tmp", dir=parent)
+    try:
+        reader = XlsxValueReader(file_path)
+        sheets = {}
+        try:
+            for name in sheet_names:
+                if name not in reader.sheetnames:
+                    continue
+                kinds, payload, missing, objects, widths = _encode_sheet(reader.iter_rows(name))
+                np.save(os.path.join(staging, f"{name}.kinds.npy"), kinds)
+                np.save(os.path.join(staging, f"{name}.payload.npy"), payload)
+                np.save(os.path.join(staging, f"{name}.missing.npy"), missing)
+                np.save(os.path.join(staging, f"{name}.widths.npy"), widths)
+                with open(os.path.join(staging, f"{name}.objects.pkl"), "wb") as handle:
+                    pickle.dump(objects, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                sheets[name] = {'rows': len(widths), 'cols': len(kinds)}
+                del kinds, payload, missing, objects, widths
+        finally:
+            reader.close()
+
+        with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as handle:
+            json.dump({'format': SNAPSHOT_FORMAT, 'source': os.path.abspath(file_path), 'sheets': sheets,
+                       'requested': list(sheet_names)}, handle)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return sheets
+
+def _entry_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+def evict(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_LIMIT_MB * 1024 * 1024, keep=None):
+    """
+    Delete least-recently-used snapshots until the cache fits in max_bytes.
+
+    Args:
+        cache_dir: Cache root
+        max_bytes: Total size budget for all snapshots
+        keep: Entry directory that must not be evicted (the one in use)
+
+    Returns:
+        int: Number of snapshots removed
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        meta = os.path.join(entry.path, META_FILE)
+        # Staging directories of builds in progress are not entries yet
+        if entry.is_dir() and not entry.name.endswith(".tmp") and os.path.exists(meta):
+            entries.append((os.path.getmtime(meta), entry.path, _entry_size(entry.path)))
+
+    total = sum(size for _, _, size in entries)
+    removed = 0
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+def _read_meta(meta_path, sheet_names):
+    """Return an entry's metadata, or None when it is absent, outdated or lacks a requested sheet."""
+    try:
+        with open(meta_path, "r", encoding="utf-8") as handle:
+            meta = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != SNAPSHOT_FORMAT or not set(sheet_names) <= set(meta.get('requested', [])):
+        return None
+    return meta
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+def _write_index(cache_dir, index):
+    # One staging file per writer: sharded validation and threaded callers open the cache at once
+    handle, staging = tempfile.mkstemp(prefix=f"{INDEX_FILE}.", suffix=".tmp", dir=cache_dir)
+    with os.fdopen(handle, "w", encoding="utf-8") as handle:
+        json.dump(index, handle)
+    os.replace(staging, os.path.join(cache_dir, INDEX_FILE))
+
+def open_cached_sheets(file_path, sheet_names=("RawData", "RawData_Numbers"),
+                       cache_dir=None, max_mb=DEFAULT_CACHE_LIMIT_MB):
+    """
+    Return memory-mapped snapshots of the requested sheets, building them if needed.
+
+    The snapshot is keyed by the workbook's size, mtime and content hash:
+    an unchanged size and mtime is a hit without reading the file, otherwise
+    the content hash decides whether an existing snapshot still applies
+    (e.g. a file that was only touched). Anything else re-parses the
+    workbook.
+
+    Args:
+        file_path: Workbook to read
+        sheet_names: Sheets to snapshot
+        cache_dir: Cache root (default: ~/.cache/kcet_sheets)
+        max_mb: LRU size budget for the whole cache
+
+    Returns:
+        dict: {sheet name: SheetSnapshot} for the sheets that exist
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stat = os.stat(file_path)
+    source = os.path.abspath(file_path)
+    index = _read_index(cache_dir)
+    known = index.get(source)
+
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        digest = known['sha256']
+    else:
+        digest = content_hash(file_path)
+
+    key = f"{digest[:32]}-{stat.st_size}"
+    directory = os.path.join(cache_dir, key)
+    meta_path = os.path.join(directory, META_FILE)
+
+    meta = _read_meta(meta_path, sheet_names)
+    if meta is None:
+        with _build_lock(directory):
+            # Another thread or process may have built it while this one waited
+            meta = _read_meta(meta_path, sheet_names)
+            if meta is None:
+                print(f"Building sheet cache for {os.path.basename(file_path)}...")
+                started = time.perf_counter()
+                build_snapshot(file_path, directory, sheet_names)
+                meta = _read_meta(meta_path, sheet_names)
+                print(f"Sheet cache built in {time.perf_counter() - started:.2f}s")
+                evict(cache_dir, max_mb * 1024 * 1024, keep=directory)
+    # Touch the entry so LRU eviction sees it as recently used
+    os.utime(meta_path)
+
+    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    if index.get(source) != entry:
+        index[source] = entry
+        _write_index(cache_dir, index)
+
+    return {
+        name: SheetSnapshot(directory, name, info['rows'], info['cols'])
+        for name, info in meta['sheets'].items()
+        if name in sheet_names
+    }
@@ -0,0 +1,304 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+from batch_convert import convert_rows
+from convert_to_numbers import DEFAULT_FILE_PATH, convert_to_number
+
+DEFAULT_DB_PATH = r"D:\Anant\VSCodeProjects\SQLite\KCET_2025.db"
+DEFAULT_TABLE = "For_KCET25_R1"
+
+# Rows handed to executemany per call (all of them go into one transaction)
+LOAD_BATCH_ROWS = 50000
+
+# Load-time page cache: negative values are KiB, so this is 256 MB
+LOAD_CACHE_SIZE = -262144
+
+# Header names of the columns that get a secondary index after the load
+GM_HEADERS = ("GM",)
+COLLEGE_HEADERS = ("College Code", "College Name", "College")
+COURSE_HEADERS = ("Course Code", "Course Name", "Course")
+
+def quote_identifier(name):
+    """Quote a column or table name for SQLite."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def column_names(header):
+    """
+    Turn the sheet's header row into unique, non-empty column names.
+
+    Args:
+        header: Tuple of header cell values (row 1)
+
+    Returns:
+        list of column names, in sheet order
+    """
+    names = []
+    seen = set()
+    for col, value in enumerate(header, start=1):
+        name = str(value).strip() if value is not None and str(value).strip() else f"Column_{get_column_letter(col)}"
+        unique = name
+        suffix = 2
+        while unique.lower() in seen:
+            unique = f"{name}_{suffix}"
+            suffix += 1
+        seen.add(unique.lower())
+        names.append(unique)
+    return names
+
+def find_column(names, candidates):
+    """Return the first column name matching one of candidates (case-insensitive), or None."""
+    lowered = {name.lower(): name for name in names}
+    for candidate in candidates:
+        if candidate.lower() in lowered:
+            return lowered[candidate.lower()]
+    return None
+
+def code_expression(column):
+    """
+    SQL expression for the code prefix of a "<code> <name>" column.
+
+    College and course names in the cutoff sheets start with their code
+    ("E115 S J B Institute...", "DS Comp. Sc. Engg- Data Sc."), so the code is
+    everything before the first space.
+    """
+    quoted = quote_identifier(column)
+    return f"substr({quoted}, 1, instr({quoted} || ' ', ' ') - 1)"
+
+def infer_column_type(values, is_target):
+    """
+    Pick the declared SQLite type for one column from a sample of its values.
+
+    Columns in the converted range are always INTEGER; the others are
+    INTEGER or REAL when every sampled value is numeric, TEXT otherwise.
+    """
+    if is_target:
+        return "INTEGER"
+    present = [value for value in values if value is not None and value != ""]
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "INTEGER"
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return "REAL"
+    return "TEXT"
+
+def canonical_value(value):
+    """
+    Canonical text of a cell for the reconciliation checksum.
+
+    SQLite column affinity may store 5 as '5' (TEXT) or 5.0 as 5 (INTEGER);
+    the canonical form treats those as equal while any real change to the
+    data still changes the checksum.
+    """
+    if value is None:
+        return "\x00"
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        number = value
+    else:
+        try:
+            number = float(str(value))
+        except (ValueError, OverflowError):
+            return "s" + str(value)
+    if isinstance(number, float):
+        if number != number or number in (float("inf"), float("-inf")):
+            return "f" + repr(number)
+        if number.is_integer():
+            return "i" + str(int(number))
+        return "f" + repr(number)
+    return "i" + str(number)
+
+def update_checksum(digest, row):
+    """Fold one row into a running SHA-256 checksum."""
+    digest.update("\x1f".join(canonical_value(value) for value in row).encode("utf-8"))
+    digest.update(b"\x1e")
+
+def reconcile_row(values, start_col, end_col):
+    """
+    Row in the form both reconciliation checksums are taken over.
+
+    Cells start_col..end_col go through the scalar convert_to_number (a blank
+    result becomes None, as loaded), so a sheet row and its table row agree
+    whatever the batch converter did. Trailing empty cells are dropped, which
+    makes a short sheet row equal to its NULL-padded table row while a cell
+    beyond the table's columns still changes the checksum.
+    """
+    values = list(values)
+    for index in range(start_col - 1, min(end_col, len(values))):
+        values[index] = convert_to_number(values[index])
+    values = [None if value == "" else value for value in values]
+    while values and values[-1] is None:
+        values.pop()
+    return values
+
+def load_rawdata_to_sqlite(file_path=DEFAULT_FILE_PATH, db_path=DEFAULT_DB_PATH, table=DEFAULT_TABLE,
+                           sheet_name="RawData", start_col=4, end_col=27):
+    """
+    Load the converted RawData sheet into a SQLite table and reconcile it.
+
+    The sheet is streamed (read-only workbook), columns start_col..end_col
+    are converted with the batch converter and the rows are inserted with
+    executemany inside a single transaction, with WAL journaling,
+    synchronous=OFF and a large page cache during the load. Indexes on the
+    GM rank, college code and course code are built afterwards. The source
+    rows are checksummed as they are read and the table is re-read and
+    checksummed the same way (see reconcile_row), so a lost, altered or
+    truncated row fails the check. Non-empty cells to the right of the
+    header row cannot be stored; they are counted and also fail the check.
+    The table is replaced if it already exists; the workbook is not modified.
+
+    Args:
+        file_path: Workbook with the source sheet
+        db_path: SQLite database file (created if missing)
+        table: Table to (re)create
+        sheet_name: Sheet to load
+        start_col: First column to convert to integers (4 = D)
+        end_col: Last column to convert to integers (27 = AA)
+
+    Returns:
+        dict with rows, db_rows, dropped_cells, seconds, rows_per_sec, checksum,
+        db_checksum and verified
+    """
+    started = time.perf_counter()
+
+    print(f"Opening {sheet_name} in read-only mode...")
+    workbook = load_workbook(file_path, read_only=True)
+    if sheet_name not in workbook.sheetnames:
+        workbook.close()
+        raise KeyError(f"{sheet_name} sheet not found")
+    rows = workbook[sheet_name].iter_rows(values_only=True)
+
+    header = next(rows, None)
+    if header is None:
+        workbook.close()
+        raise ValueError(f"{sheet_name} sheet is empty")
+    names = column_names(header)
+    width = len(names)
+
+    db_dir = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute(f"PRAGMA cache_size={LOAD_CACHE_SIZE}")
+    connection.execute("PRAGMA temp_store=MEMORY")
+
+    quoted_table = quote_identifier(table)
+    insert_sql = (f"INSERT INTO {quoted_table} VALUES ("
+                  + ", ".join("?" for _ in names) + ")")
+    digest = hashlib.sha256()
+    loaded = 0
+    dropped_cells = 0
+    created = False
+
+    def flush(batch):
+        nonlocal loaded, created
+        converted = []
+        for values in convert_rows(batch, start_col, end_col):
+            values = (values + [None] * width)[:width]
+            for index in range(start_col - 1, min(end_col, width)):
+                if values[index] == "":
+                    values[index] = None
+            converted.append(values)
+
+        if not created:
+            columns_sql = ", ".join(
+                f"{quote_identifier(name)} "
+                f"{infer_column_type([row[index] for row in converted], start_col <= index + 1 <= end_col)}"
+                for index, name in enumerate(names))
+            connection.execute(f"DROP TABLE IF EXISTS {quoted_table}")
+            connection.execute(f"CREATE TABLE {quoted_table} ({columns_sql})")
+            created = True
+
+        connection.executemany(insert_sql, converted)
+        loaded += len(converted)
+        print(f"   Loaded {loaded} rows...")
+
+    try:
+        connection.execute("BEGIN")
+        batch = []
+        for values in rows:
+            update_checksum(digest, reconcile_row(values, start_col, end_col))
+            dropped_cells += sum(1 for value in values[width:] if value is not None and value != "")
+            batch.append(values)
+            if len(batch) >= LOAD_BATCH_ROWS:
+                flush(batch)
+                batch = []
+        flush(batch)
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        connection.close()
+        raise
+    finally:
+        workbook.close()
+
+    load_seconds = time.perf_counter() - started
+
+    print("Creating indexes...")
+    index_columns = [
+        ("gm", find_column(names, GM_HEADERS), False),
+        ("college_code", find_column(names, COLLEGE_HEADERS), True),
+        ("course_code", find_column(names, COURSE_HEADERS), True),
+    ]
+    for suffix, column, is_code in index_columns:
+        if column is None:
+            print(f"   Skipping {suffix} index (column not found)")
+            continue
+        target = code_expression(column) if is_code and not column.lower().endswith("code") else quote_identifier(column)
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(f'idx_{table}_{suffix}')} "
+                           f"ON {quoted_table} ({target})")
+    connection.execute("ANALYZE")
+    connection.execute("PRAGMA synchronous=NORMAL")
+
+    print("Reconciling table with the sheet...")
+    db_digest = hashlib.sha256()
+    db_rows = 0
+    for values in connection.execute(f"SELECT * FROM {quoted_table} ORDER BY rowid"):
+        update_checksum(db_digest, reconcile_row(values, start_col, end_col))
+        db_rows += 1
+    connection.close()
+
+    elapsed = time.perf_counter() - started
+    checksum = digest.hexdigest()
+    db_checksum = db_digest.hexdigest()
+    verified = db_rows == loaded and db_checksum == checksum and not dropped_cells
+
+    print("=" * 70)
+    print(f"Rows in sheet: {loaded}, rows in table: {db_rows}")
+    print(f"Checksum sheet: {checksum[:16]}... table: {db_checksum[:16]}...")
+    if dropped_cells:
+        print(f"⚠️  {dropped_cells} non-empty cells lie beyond the {width} header columns and were not loaded")
+    print(f"Load time: {load_seconds:.2f}s ({loaded / load_seconds if load_seconds else 0:.0f} rows/sec), "
+          f"total with indexes and verification: {elapsed:.2f}s")
+    if verified:
+        print(f"✅ {table} matches {sheet_name}")
+    else:
+        print(f"❌ {table} does not match {sheet_name}")
+    print("=" * 70)
+
+    return {
+        'rows': loaded,
+        'db_rows': db_rows,
+        'dropped_cells': dropped_cells,
+        'seconds': elapsed,
+        'rows_per_sec': loaded / load_seconds if load_seconds else 0.0,
+        'checksum': checksum,
+        'db_checksum': db_checksum,
+        'verified': verified,
+    }
+
+if __name__ == "__main__":
+    try:
+        # Usage: python sqlite_loader.py [workbook] [database] [table]
+        load_stats = load_rawdata_to_sqlite(*sys.argv[1:4])
+        sys.exit(0 if load_stats['verified'] else 1)
+    except Exception as e:
+        print(f"Error during load: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,317 @@
+import math
+import random
+import sys
+import time
+
+import numpy as np
+from xlsx_reader import column_letter
+
+# Items a KLL sketch keeps in its top level; the rank error is about 1.7 / KLL_K
+KLL_K = 200
+
+# HyperLogLog uses 2 ** HLL_PRECISION one-byte registers (about 0.8% standard error)
+HLL_PRECISION = 14
+
+# Values fed to the sketches per step when a whole column is summarized
+STATS_CHUNK_VALUES = 65536
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+class QuantileSketch:
+    """
+    KLL quantile sketch over numbers, in bounded memory.
+
+    Values are kept in levels of sorted buffers; a value at level h stands
+    for 2 ** h values of the input. When a level outgrows its capacity it is
+    sorted and every other item (from a random start) moves one level up,
+    so memory grows with log(n) while any quantile stays within about
+    1.7 / k of its true rank. Sketches of disjoint inputs merge exactly like
+    one sketch fed with both.
+
+    Args:
+        k: Capacity of the top level
+        seed: Seed for the compaction coin flips
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """Add an array (or any sequence) of numbers."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        self.count += values.size
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # An odd item out stays behind so the total weight is kept
+                kept = items[:1] if len(items) % 2 else items[:0]
+                paired = items[len(kept):]
+                promoted = paired[self._random.getrandbits(1)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                # Capacities shrink when a level is added, so start over
+                level = 0
+                continue
+            level += 1
+
+    def merge(self, other):
+        """Fold in another sketch. Returns self."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, fractions=QUANTILES):
+        """
+        Return the estimated value at each fraction (0..1) of the input, or None when empty.
+        """
+        if not self.count:
+            return [None for _ in fractions]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        total = cumulative[-1]
+        picks = np.searchsorted(cumulative, [fraction * total for fraction in fractions], side="left")
+        return [float(values[min(pick, len(values) - 1)]) for pick in picks]
+
+    @property
+    def retained(self):
+        """Number of values held across all levels."""
+        return sum(len(items) for items in self.levels)
+
+def _hash64(values):
+    """splitmix64 of an int64 array, as uint64."""
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+class DistinctCounter:
+    """
+    HyperLogLog estimate of the number of distinct integers seen.
+
+    Uses 2 ** precision one-byte registers whatever the input size; counters
+    of disjoint inputs merge by taking the larger register.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Add an array (or any sequence) of integers."""
+        values = np.asarray(values, dtype=np.int64).ravel()
+        if not values.size:
+            return
+        hashed = _hash64(values)
+        tail_bits = 64 - self.precision
+        index = (hashed >> np.uint64(tail_bits)).astype(np.intp)
+        tail = hashed & np.uint64((1 << tail_bits) - 1)
+        # Position of the first 1 bit in the tail (tail_bits + 1 when the tail is all zeros);
+        # the tail is below 2 ** 53, so its float exponent is its exact bit length
+        bit_length = np.frexp(tail.astype(np.float64))[1]
+        rank = (tail_bits + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Fold in another counter with the same precision. Returns self."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Return the estimated number of distinct values."""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * size and zeros:
+            # Small-range correction (linear counting)
+            return size * math.log(size / zeros)
+        return float(raw)
+
+class ColumnStats:
+    """
+    One-pass summary of a column of integers: exact count, min, max and
+    mean, plus a quantile sketch and a distinct-value estimate whose memory
+    does not grow with the column.
+    """
+
+    def __init__(self, k=KLL_K, precision=HLL_PRECISION, seed=0):
+        self.count = 0
+        self.missing = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0
+        self.quantile_sketch = QuantileSketch(k, seed)
+        self.distinct = DistinctCounter(precision)
+
+    def update(self, values, missing=0):
+        """
+        Add a chunk of values.
+
+        Args:
+            values: int64 array of the values present in the chunk
+            missing: Number of cells of the chunk that had no value
+        """
+        self.missing += missing
+        if not len(values):
+            return
+        low, high = int(values.min()), int(values.max())
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+        if len(values) * max(abs(low), abs(high)) < 2 ** 63:
+            self.total += int(values.sum(dtype=np.int64))
+        else:
+            # The int64 sum could overflow: add up as Python ints
+            self.total += sum(values.tolist())
+        self.count += len(values)
+        self.quantile_sketch.update(values)
+        self.distinct.update(values)
+
+    def merge(self, other):
+        """Fold in the summary of other rows of the same column. Returns self."""
+        self.count += other.count
+        self.missing += other.missing
+        self.total += other.total
+        for name, pick in (('minimum', min), ('maximum', max)):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            setattr(self, name, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.distinct.merge(other.distinct)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantiles(self, fractions=QUANTILES):
+        return self.quantile_sketch.quantiles(fractions)
+
+def summarize_table(table, chunk_values=STATS_CHUNK_VALUES):
+    """
+    Stream every column of a cutoff_table.RankBlock through ColumnStats.
+
+    Returns:
+        dict: {header: ColumnStats}, in column order
+    """
+    summary = {}
+    for position, header in enumerate(table.headers):
+        stats = ColumnStats()
+        column = table.column(position)
+        missing = table.missing_mask(position)
+        for start in range(0, table.rows, chunk_values):
+            chunk_missing = missing[start:start + chunk_values]
+            stats.update(column[start:start + chunk_values][~chunk_missing], int(chunk_missing.sum()))
+        summary[header] = stats
+    return summary
+
+class RowStats:
+    """
+    Rank statistics of the converted columns start_col..end_col, fed one row at a time.
+
+    Meant as the on_row hook of validation_engine.scan_rows: the converted
+    target cells are packed into a cutoff_table.RankBlock during the
+    validation pass, chunk_rows rows at a time, instead of reading the sheet
+    a second time. summary() builds the block (kept in self.block) and
+    streams its columns through ColumnStats. Integer cells are ranks; any
+    other cell counts as missing.
+
+    Args:
+        start_col, end_col: Converted columns (1-based, inclusive)
+        start_row: First data row; row 1 gives the column headers
+        chunk_rows: Rows buffered before they are packed into the block
+    """
+
+    def __init__(self, start_col=4, end_col=27, start_row=2, chunk_rows=5000):
+        self.start_col = start_col
+        self.end_col = end_col
+        self.start_row = start_row
+        self.chunk_rows = chunk_rows
+        self.headers = [column_letter(col) for col in range(start_col, end_col + 1)]
+        self.builder = None
+        self.block = None
+        self.chunk = []
+        self.chunk_row = start_row
+        self.rows = 0
+
+    def __call__(self, row, original, converted):
+        if row == 1:
+            for position, value in enumerate(converted[self.start_col - 1:self.end_col]):
+                if value is not None and str(value).strip():
+                    self.headers[position] = str(value).strip()
+            return
+        if row < self.start_row:
+            return
+        if not self.chunk:
+            self.chunk_row = row
+        self.rows += 1
+        self.chunk.append(converted[self.start_col - 1:self.end_col])
+        if len(self.chunk) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self.builder is None:
+            # Imported here: cutoff_table builds on the converter modules
+            from cutoff_table import RankBlockBuilder
+            self.builder = RankBlockBuilder(self.headers, self.start_col)
+        self.builder.append(self.chunk, self.chunk_row)
+        self.chunk = []
+
+    def summary(self):
+        """
+        Build the RankBlock of every row seen and sketch its columns.
+
+        Returns:
+            dict: {header: ColumnStats}, in column order
+        """
+        self._flush()
+        self.block = self.builder.build()
+        return summarize_table(self.block)
+
+if __name__ == "__main__":
+    # Usage: python stream_stats.py [values, e.g. 1000000]
+    # Checks the sketches against exact answers on random ranks
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = np.random.default_rng(0)
+    ranks = rng.integers(1, 250001, size=count)
+
+    started = time.perf_counter()
+    column_stats = ColumnStats()
+    for offset in range(0, count, STATS_CHUNK_VALUES):
+        column_stats.update(ranks[offset:offset + STATS_CHUNK_VALUES])
+    seconds = time.perf_counter() - started
+
+    exact = np.quantile(ranks, QUANTILES)
+    sorted_ranks = np.sort(ranks)
+    print(f"{count} values in {seconds:.2f}s, {column_stats.quantile_sketch.retained} kept by the quantile sketch")
+    for fraction, estimate, truth in zip(QUANTILES, column_stats.quantiles(), exact):
+        rank_error = abs(np.searchsorted(sorted_ranks, estimate) / count - fraction)
+        print(f"  q{fraction:<5} estimate {estimate:>10.0f} exact {truth:>10.0f} (rank error {rank_error:.4f})")
+    distinct = len(np.unique(ranks))
+    estimate = column_stats.distinct.estimate()
+    print(f"  distinct estimate {estimate:.0f} exact {distinct} ({abs(estimate / distinct - 1) * 100:.2f}% off)")
+    print(f"  min {column_stats.minimum} max {column_stats.maximum} mean {column_stats.mean:.1f} "
+          f"(exact {ranks.mean():.1f})")
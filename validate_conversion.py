@@ -1,139 +1,105 @@
-import openpyxl
-from openpyxl import load_workbook
-import re
-
-def is_missing_data(value):
-    """Check if a value represents missing data."""
-    if value is None:
-        return True
-    str_value = str(value).strip()
-    return str_value in ["--", " --", "-- ", " -- ", "", "N/A", "NA", "n/a"]
-
-def is_number(value):
-    """Check if a value is a number."""
-    if value is None:
-        return False
-    try:
-        float(str(value))
-        return True
-    except (ValueError, TypeError):
-        return False
+import sys
+
+from convert_to_numbers import DEFAULT_FILE_PATH, DEFAULT_SHEETS, describe_columns
+from diff_report import DiffSink
+from instrumentation import Metrics, parse_script_options, report_stream, wait_for_exit
+from validation_engine import run_validation, run_validation_sharded, target_columns
+from xlsx_reader import column_letter
+
+def print_issue(issue):
+    """Print one validation issue in the report's two-line format."""
+    if issue['kind'] in ('header_mismatch', 'outside_range_changed', 'unexpected_change'):
+        # Reported by the comprehensive test, not by the basic validation
+        return
+
+    where = f"Row {issue['row']}, Col {column_letter(issue['column'])}"
+    original = issue['original']
+    converted = issue['converted']
+
+    if issue['kind'] == 'missing_not_preserved':
+        print(f"   ERROR: {where}: Missing data not preserved")
+        print(f"          Original: '{original}' -> Converted: '{converted}'")
+    elif issue['kind'] == 'incorrect_conversion':
+        print(f"   ERROR: {where}: Incorrect conversion")
+        print(f"          Original: {original} -> Expected: {issue['expected']} -> Got: {converted}")
+    elif issue['kind'] == 'float_type':
+        print(f"   WARNING: {where}: Still has float type but correct value")
+    elif issue['kind'] == 'still_decimal':
+        print(f"   ERROR: {where}: Still has decimals")
+        print(f"          Original: {original} -> Converted: {converted}")
+    elif issue['kind'] == 'not_converted':
+        print(f"   ERROR: {where}: Number not converted properly")
+        print(f"          Original: {original} -> Converted: {converted} (type: {type(converted)})")
+    else:
+        print(f"   ERROR: {where}: Could not validate number conversion")
 
-def validate_conversion():
+def validate_conversion(file_path=DEFAULT_FILE_PATH, metrics=None, workers=None, diff_path=None,
+                        columns=None, sheets=DEFAULT_SHEETS):
     """
     Validate the conversion results by comparing RawData and RawData_Numbers sheets.
-    """
-    file_path = r"d:\Anant\VSCodeProjects\Temp_projects\ToNumber.xlsx"
-
-    print("Loading Excel file for validation...")
-    workbook = load_workbook(file_path)
-
-    # Check if both sheets exist
-    if "RawData" not in workbook.sheetnames:
-        print("ERROR: RawData sheet not found!")
-        return False
 
-    if "RawData_Numbers" not in workbook.sheetnames:
-        print("ERROR: RawData_Numbers sheet not found!")
-        return False
+    Only the first issues are printed, followed by a per-column histogram;
+    diff_path receives every issue.
 
-    original_sheet = workbook["RawData"]
-    converted_sheet = workbook["RawData_Numbers"]
+    Args:
+        file_path: Workbook holding both sheets
+        metrics: Optional Metrics to record phases and counters in
+        workers: Validate row ranges on this many processes (None or 1 = one pass)
+        diff_path: Optional .jsonl or .csv file to stream every issue to
+        columns: Target column spec (default D:AA, or the category columns of a CSV file)
+        sheets: (source, converted) sheet names (default RawData, RawData_Numbers)
 
-    # Define the range to validate (columns D to AA, rows 2 to last row)
-    start_col = 4  # Column D
-    end_col = 27   # Column AA
-    start_row = 2
+    Returns:
+        bool: True when no errors were found
+    """
+    start_col, end_col = target_columns(file_path, columns)
+    print("Loading Excel file for validation...")
+    print(f"Validating conversion of columns {describe_columns(start_col, end_col)} from row 2")
+    print("=" * 70)
 
-    last_row = min(original_sheet.max_row, converted_sheet.max_row)
+    original_name, converted_name = sheets
+    with DiffSink(diff_path, sheet=converted_name, echo=print_issue) as diff:
+        if workers and workers > 1:
+            result = run_validation_sharded(file_path, workers, start_col, end_col, on_error=diff,
+                                            original_name=original_name, converted_name=converted_name,
+                                            metrics=metrics)
+        else:
+            result = run_validation(file_path, start_col, end_col, on_error=diff, original_name=original_name,
+                                    converted_name=converted_name, metrics=metrics)
 
-    print(f"Validating conversion from row {start_row} to {last_row}, columns D to AA")
-    print("=" * 70)
+    # Check if both sheets exist
+    if result.missing_sheets:
+        for name in result.missing_sheets:
+            print(f"ERROR: {name} sheet not found!")
+        return False
 
-    # Validation counters
-    total_cells = 0
-    converted_cells = 0
-    preserved_missing = 0
-    preserved_headers = 0
-    errors = 0
+    header_count = result.end_col - result.start_col + 1
 
     # Validate headers (row 1)
     print("1. Validating headers (row 1)...")
-    for col in range(start_col, end_col + 1):
-        original_header = original_sheet.cell(row=1, column=col).value
-        converted_header = converted_sheet.cell(row=1, column=col).value
+    for col, original_header, converted_header in result.header_mismatches:
+        if result.start_col <= col <= result.end_col:
+            print(f"   ERROR: Header mismatch in column {column_letter(col)}: "
+                  f"'{original_header}' vs '{converted_header}'")
+    print(f"   Headers preserved: {result.headers_preserved}/{header_count}")
 
-        if original_header == converted_header:
-            preserved_headers += 1
-        else:
-            print(f"   ERROR: Header mismatch in column {chr(64+col)}: '{original_header}' vs '{converted_header}'")
-            errors += 1
-
-    print(f"   Headers preserved: {preserved_headers}/{end_col - start_col + 1}")
-
-    # Validate data conversion (rows 2 onwards)
+    # Validate data conversion (rows 2 onwards), the first issues were printed as found
     print("\n2. Validating data conversion...")
-
-    for row in range(start_row, last_row + 1):
-        for col in range(start_col, end_col + 1):
-            total_cells += 1
-
-            original_value = original_sheet.cell(row=row, column=col).value
-            converted_value = converted_sheet.cell(row=row, column=col).value
-
-            # Check if original was missing data
-            if is_missing_data(original_value):
-                if converted_value == "" or converted_value is None:
-                    preserved_missing += 1
-                else:
-                    print(f"   ERROR: Row {row}, Col {chr(64+col)}: Missing data not preserved")
-                    print(f"          Original: '{original_value}' -> Converted: '{converted_value}'")
-                    errors += 1
-
-            # Check if original was a number
-            elif is_number(original_value):
-                try:
-                    original_num = float(str(original_value))
-
-                    # Check if converted value is an integer
-                    if isinstance(converted_value, int):
-                        expected_int = int(original_num)
-                        if converted_value == expected_int:
-                            converted_cells += 1
-                        else:
-                            print(f"   ERROR: Row {row}, Col {chr(64+col)}: Incorrect conversion")
-                            print(f"          Original: {original_value} -> Expected: {expected_int} -> Got: {converted_value}")
-                            errors += 1
-                    elif isinstance(converted_value, float):
-                        # Should not have decimals in converted data
-                        if converted_value == int(converted_value):
-                            print(f"   WARNING: Row {row}, Col {chr(64+col)}: Still has float type but correct value")
-                            converted_cells += 1
-                        else:
-                            print(f"   ERROR: Row {row}, Col {chr(64+col)}: Still has decimals")
-                            print(f"          Original: {original_value} -> Converted: {converted_value}")
-                            errors += 1
-                    else:
-                        print(f"   ERROR: Row {row}, Col {chr(64+col)}: Number not converted properly")
-                        print(f"          Original: {original_value} -> Converted: {converted_value} (type: {type(converted_value)})")
-                        errors += 1
-
-                except (ValueError, TypeError):
-                    print(f"   ERROR: Row {row}, Col {chr(64+col)}: Could not validate number conversion")
-                    errors += 1
-
-            # Progress indicator for large datasets
-            if total_cells % 5000 == 0:
-                print(f"   Validated {total_cells} cells...")
+    last_row = min(result.original_rows, result.converted_rows)
+    print(f"   Validated rows {result.start_row} to {last_row}")
+    if result.trimmed_cells:
+        print(f"   Skipped {result.trimmed_cells} blank cells after the last row with data")
+    diff.print_summary()
 
     # Generate validation report
+    errors = result.errors
     print("\n" + "=" * 70)
     print("VALIDATION REPORT")
     print("=" * 70)
-    print(f"Total cells validated: {total_cells}")
-    print(f"Headers preserved: {preserved_headers}/{end_col - start_col + 1}")
-    print(f"Numbers converted: {converted_cells}")
-    print(f"Missing data preserved: {preserved_missing}")
+    print(f"Total cells validated: {result.total_cells}")
+    print(f"Headers preserved: {result.headers_preserved}/{header_count}")
+    print(f"Numbers converted: {result.converted_cells}")
+    print(f"Missing data preserved: {result.preserved_missing}")
     print(f"Errors found: {errors}")
 
     # Sample data comparison
@@ -142,31 +108,9 @@ def validate_conversion():
     print(f"{'Row':<4} {'Col':<4} {'Original':<15} {'Converted':<15} {'Status':<10}")
     print("-" * 70)
 
-    sample_count = 0
-    for row in range(start_row, min(start_row + 5, last_row + 1)):
-        for col in range(start_col, min(start_col + 5, end_col + 1)):
-            original_value = original_sheet.cell(row=row, column=col).value
-            converted_value = converted_sheet.cell(row=row, column=col).value
-
-            # Determine status
-            if is_missing_data(original_value):
-                status = "Preserved" if (converted_value == "" or converted_value is None) else "ERROR"
-            elif is_number(original_value):
-                try:
-                    expected = int(float(str(original_value)))
-                    status = "Converted" if converted_value == expected else "ERROR"
-                except:
-                    status = "ERROR"
-            else:
-                status = "Unchanged"
-
-            print(f"{row:<4} {chr(64+col):<4} {str(original_value):<15} {str(converted_value):<15} {status:<10}")
-
-            sample_count += 1
-            if sample_count >= 10:  # Limit sample output
-                break
-        if sample_count >= 10:
-            break
+    for row, col, original_value, converted_value, status in result.sample_cells[:10]:  # Limit sample output
+        print(f"{row:<4} {column_letter(col):<4} {str(original_value):<15} "
+              f"{str(converted_value):<15} {status:<10}")
 
     # Final validation result
     print("\n" + "=" * 70)
@@ -179,19 +123,43 @@ def validate_conversion():
 
     print("=" * 70)
 
-    workbook.close()
     return success
 
 if __name__ == "__main__":
-    try:
-        validation_success = validate_conversion()
-        if validation_success:
-            print("\nConversion validation completed successfully!")
-        else:
-            print("\nConversion validation found issues. Please review the errors above.")
+    # Usage: python validate_conversion.py [--workers N] [--diff FILE.jsonl | FILE.csv]
+    #                                      [--columns D:AA] [--metrics FILE | -] [--non-interactive] [workbook]
+    args, options = parse_script_options(sys.argv[1:])
+    worker_count = None
+    if "--workers" in args:
+        position = args.index("--workers")
+        worker_count = int(args[position + 1])
+        del args[position:position + 2]
+    diff_file = None
+    if "--diff" in args:
+        position = args.index("--diff")
+        diff_file = args[position + 1]
+        del args[position:position + 2]
+    run_metrics = Metrics("validate_conversion", args[0] if args else DEFAULT_FILE_PATH)
+
+    with report_stream(options):
+        try:
+            with run_metrics.phase("report"):
+                validation_success = validate_conversion(*args[:1], metrics=run_metrics, workers=worker_count,
+                                                         diff_path=diff_file, columns=options['columns'])
+            if validation_success:
+                print("\nConversion validation completed successfully!")
+                status = "passed"
+            else:
+                print("\nConversion validation found issues. Please review the errors above.")
+                status = "failed"
+
+            wait_for_exit(options, "\nPress Enter to exit...")
 
-        input("\nPress Enter to exit...")
+        except Exception as e:
+            print(f"Error during validation: {str(e)}")
+            status = "error"
+            wait_for_exit(options)
 
-    except Exception as e:
-        print(f"Error during validation: {str(e)}")
-        input("Press Enter to exit...")
+    if options['metrics']:
+        run_metrics.emit(options['metrics'], status=status)
+    sys.exit(0 if status == "passed" else 1)
@@ -0,0 +1,947 @@
+import contextlib
+import math
+import os
+import pickle
+import random
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, zip_longest
+from statistics import NormalDist
+
+from convert_to_numbers import (DEFAULT_COLUMNS, DEFAULT_FILE_PATH, MISSING_DATA_VALUES, default_streaming_output,
+                                drop_blank_tail, is_blank_row)
+from csv_pipeline import csv_target_columns, is_csv_path, iter_csv_rows, read_csv_header
+from xlsx_reader import parse_columns
+
+# Number of sample rows/columns kept for the "first rows" comparison tables
+SAMPLE_ROWS = 5
+SAMPLE_COLS = 5
+
+# Per-column examples kept for the detailed analysis view
+COLUMN_SAMPLES = 5
+COLUMN_DECIMAL_CASES = 3
+
+# Quick check: rows drawn per run, row bands they are spread over, and the
+# confidence level of the reported error-rate bounds
+QUICK_SAMPLE_ROWS = 1000
+QUICK_BANDS = 10
+CONFIDENCE_LEVEL = 0.95
+
+def is_missing_data(value):
+    """Check if a value represents missing data."""
+    if value is None:
+        return True
+    str_value = str(value).strip()
+    return str_value in MISSING_DATA_VALUES
+
+def parse_number(value):
+    """
+    Parse a cell value the way the converter does (commas and spaces removed).
+
+    Returns:
+        float, or None when the value is not a number
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(re.sub(r'[,\s]', '', str(value).strip()))
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+class ValidationResult:
+    """
+    Everything the validators report, gathered in one pass over both sheets.
+
+    Counters cover the target range (start_col..end_col, rows from start_row)
+    unless their name says otherwise. Issue records are dicts with row,
+    column, kind, severity, original, converted and expected keys; only the
+    first max_error_samples of them are kept in error_samples.
+    """
+
+    def __init__(self, start_col=4, end_col=27, start_row=2, max_error_samples=100):
+        self.start_col = start_col
+        self.end_col = end_col
+        self.start_row = start_row
+        self.max_error_samples = max_error_samples
+
+        self.missing_sheets = []
+        self.original_rows = 0
+        self.converted_rows = 0
+        self.original_cols = 0
+        self.converted_cols = 0
+
+        # Header row (row 1)
+        self.headers_checked = 0
+        self.headers_preserved = 0
+        self.header_mismatches = []  # (column, original, converted) for every column
+
+        # Target range checks
+        self.total_cells = 0
+        self.converted_cells = 0
+        self.preserved_missing = 0
+        self.cell_errors = 0
+        self.float_warnings = 0
+        self.unexpected_changes = 0
+        self.decimal_removals = 0
+        self.converted_floats = 0
+        self.error_samples = []
+
+        # Outside the target range (every row, including the header)
+        self.outside_cells = 0
+        self.outside_range_errors = 0
+
+        # Histograms
+        self.original_types = defaultdict(int)
+        self.converted_types = defaultdict(int)
+        self.conversion_patterns = defaultdict(int)
+        self.missing_data_indicators = defaultdict(int)
+        self.column_stats = {
+            col: {
+                'original_numbers': 0,
+                'original_floats': 0,
+                'original_integers': 0,
+                'original_missing': 0,
+                'converted_integers': 0,
+                'converted_empty': 0,
+                'decimal_removals': 0,
+                'decimal_cases': [],
+                'samples': [],
+                'missing_tokens': defaultdict(int),
+            }
+            for col in range(start_col, end_col + 1)
+        }
+        self.sample_cells = []  # (row, column, original, converted, status)
+
+        # Target cells of the declared sheet size past the last row with data
+        self.trimmed_cells = 0
+
+    @property
+    def target_header_errors(self):
+        """Header mismatches inside the target range."""
+        return sum(1 for col, _, _ in self.header_mismatches
+                   if self.start_col <= col <= self.end_col)
+
+    @property
+    def errors(self):
+        """Errors counted by the basic validator (target headers + target cells)."""
+        return self.target_header_errors + self.cell_errors
+
+    @property
+    def total_errors(self):
+        """Errors counted by the comprehensive test (every check)."""
+        return (len(self.header_mismatches) + self.cell_errors
+                + self.unexpected_changes + self.outside_range_errors)
+
+    def record_issue(self, issue, on_error=None):
+        """Keep the first max_error_samples issues and forward every issue to on_error."""
+        if self.max_error_samples is None or len(self.error_samples) < self.max_error_samples:
+            self.error_samples.append(issue)
+        if on_error is not None:
+            on_error(issue)
+
+    def merge(self, other):
+        """
+        Fold in the result of the rows that follow this one's.
+
+        Counters and histograms add up, dimensions take the maximum, and
+        list-valued samples are concatenated and cut back to their limits, so
+        merging the results of consecutive row ranges in order gives exactly
+        what one pass over all the rows would have.
+
+        Returns:
+            self
+        """
+        self.original_rows = max(self.original_rows, other.original_rows)
+        self.converted_rows = max(self.converted_rows, other.converted_rows)
+        self.original_cols = max(self.original_cols, other.original_cols)
+        self.converted_cols = max(self.converted_cols, other.converted_cols)
+
+        for name in ('headers_checked', 'headers_preserved', 'total_cells', 'converted_cells',
+                     'preserved_missing', 'cell_errors', 'float_warnings', 'unexpected_changes',
+                     'decimal_removals', 'converted_floats', 'outside_cells', 'outside_range_errors',
+                     'trimmed_cells'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.header_mismatches.extend(other.header_mismatches)
+        self.sample_cells.extend(other.sample_cells)
+
+        self.error_samples.extend(other.error_samples)
+        if self.max_error_samples is not None:
+            del self.error_samples[self.max_error_samples:]
+
+        for name in ('original_types', 'converted_types', 'conversion_patterns', 'missing_data_indicators'):
+            histogram = getattr(self, name)
+            for key, count in getattr(other, name).items():
+                histogram[key] += count
+
+        for col, stats in self.column_stats.items():
+            other_stats = other.column_stats[col]
+            for key, value in other_stats.items():
+                if isinstance(value, list):
+                    stats[key].extend(value)
+                elif isinstance(value, dict):
+                    for token, count in value.items():
+                        stats[key][token] += count
+                else:
+                    stats[key] += value
+            del stats['samples'][COLUMN_SAMPLES:]
+            del stats['decimal_cases'][COLUMN_DECIMAL_CASES:]
+        return self
+
+def _issue(row, col, kind, original, converted, expected=None, severity="error"):
+    return {
+        'row': row,
+        'column': col,
+        'kind': kind,
+        'severity': severity,
+        'original': original,
+        'converted': converted,
+        'expected': expected,
+    }
+
+def _type_name(value):
+    """Bucket a value the way the analysis report groups original types."""
+    if value is None:
+        return 'None'
+    if isinstance(value, (int, float)):
+        return 'number'
+    return 'string'
+
+def _converted_type_name(value):
+    """Bucket a converted value the way the analysis report groups converted types."""
+    if value is None or value == "":
+        return 'empty'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'float'
+    return 'other'
+
+def check_cell(result, row, col, original_value, converted_value, on_error=None):
+    """
+    Run every per-cell check for one target-range cell and update result.
+
+    Returns:
+        str: Status for sample tables ("Preserved", "Converted", "Unchanged" or "ERROR")
+    """
+    result.total_cells += 1
+    stats = result.column_stats[col]
+
+    # Type histograms and conversion patterns
+    result.original_types[_type_name(original_value)] += 1
+    converted_type = _converted_type_name(converted_value)
+    result.converted_types[converted_type] += 1
+    result.conversion_patterns[f"{type(original_value).__name__} -> {type(converted_value).__name__}"] += 1
+    if converted_type == 'integer':
+        stats['converted_integers'] += 1
+    elif converted_type == 'empty':
+        stats['converted_empty'] += 1
+    elif converted_type == 'float':
+        result.converted_floats += 1
+
+    if len(stats['samples']) < COLUMN_SAMPLES:
+        stats['samples'].append((row, original_value, converted_value))
+
+    if isinstance(original_value, (int, float)):
+        stats['original_numbers'] += 1
+        if isinstance(original_value, float):
+            stats['original_floats'] += 1
+            if math.isfinite(original_value) and original_value != int(original_value):
+                stats['decimal_removals'] += 1
+                result.decimal_removals += 1
+                if len(stats['decimal_cases']) < COLUMN_DECIMAL_CASES:
+                    stats['decimal_cases'].append((row, original_value, converted_value))
+        else:
+            stats['original_integers'] += 1
+
+    # Missing data must come out empty
+    if is_missing_data(original_value):
+        stats['original_missing'] += 1
+        if original_value is not None:
+            token = str(original_value).strip()
+            result.missing_data_indicators[token] += 1
+            stats['missing_tokens'][token] += 1
+
+        if converted_value == "" or converted_value is None:
+            result.preserved_missing += 1
+            return "Preserved"
+        result.cell_errors += 1
+        result.record_issue(_issue(row, col, 'missing_not_preserved', original_value,
+                                   converted_value, ""), on_error)
+        return "ERROR"
+
+    # Numbers must come out as integers with the decimals removed
+    # (comma-formatted text such as "23,274" counts as a number, as it does for the converter)
+    original_num = parse_number(original_value)
+    if original_num is not None:
+        try:
+            expected_int = int(original_num)
+        except (ValueError, OverflowError):
+            result.cell_errors += 1
+            result.record_issue(_issue(row, col, 'unvalidated', original_value, converted_value), on_error)
+            return "ERROR"
+
+        if isinstance(converted_value, int):
+            if converted_value == expected_int:
+                result.converted_cells += 1
+                return "Converted"
+            result.cell_errors += 1
+            result.record_issue(_issue(row, col, 'incorrect_conversion', original_value,
+                                       converted_value, expected_int), on_error)
+            return "ERROR"
+
+        if isinstance(converted_value, float):
+            if converted_value.is_integer():
+                result.converted_cells += 1
+                result.float_warnings += 1
+                result.record_issue(_issue(row, col, 'float_type', original_value, converted_value,
+                                           expected_int, severity="warning"), on_error)
+                return "Converted"
+            result.cell_errors += 1
+            result.record_issue(_issue(row, col, 'still_decimal', original_value,
+                                       converted_value, expected_int), on_error)
+            return "ERROR"
+
+        result.cell_errors += 1
+        result.record_issue(_issue(row, col, 'not_converted', original_value,
+                                   converted_value, expected_int), on_error)
+        return "ERROR"
+
+    # Anything else (text) should pass through untouched
+    if original_value != converted_value and not (converted_value is None or converted_value == ""):
+        result.unexpected_changes += 1
+        result.record_issue(_issue(row, col, 'unexpected_change', original_value, converted_value,
+                                   original_value), on_error)
+    return "Unchanged"
+
+def _is_blank_pair(pair):
+    """Check if a row is blank in both sheets (or absent from one of them)."""
+    return all(values is None or is_blank_row(values) for values in pair)
+
+def scan_rows(result, original_rows, converted_rows, first_row=1, on_error=None, trimmed=None, on_row=None):
+    """
+    Walk two row iterators in lockstep and fold every check into result.
+
+    Args:
+        result: ValidationResult to update
+        original_rows: Iterable of RawData row tuples (values only)
+        converted_rows: Iterable of RawData_Numbers row tuples (values only)
+        first_row: Sheet row number of the first tuple of both iterables
+        on_error: Optional callable receiving each issue record as it is found
+        trimmed: Optional dict; when given, the rows after the last one that
+            holds a value in either sheet are skipped and added to trimmed['rows']
+        on_row: Optional callable receiving (row, original, converted) for
+            every row both sheets hold, header rows included, padded to the
+            same width (e.g. stream_stats.RowStats)
+
+    Returns:
+        result
+    """
+    start_col = result.start_col
+    end_col = result.end_col
+    start_row = result.start_row
+    empty = ()
+
+    pairs = zip_longest(original_rows, converted_rows)
+    if trimmed is not None:
+        pairs = drop_blank_tail(pairs, trimmed, _is_blank_pair)
+    for row, (original, converted) in enumerate(pairs, start=first_row):
+        if original is not None:
+            result.original_rows = row
+            result.original_cols = max(result.original_cols, len(original))
+        if converted is not None:
+            result.converted_rows = row
+            result.converted_cols = max(result.converted_cols, len(converted))
+        if original is None or converted is None:
+            # Past the end of the shorter sheet only the dimensions are tracked
+            continue
+
+        width = max(len(original), len(converted))
+        if len(original) < width:
+            original = tuple(original) + (None,) * (width - len(original))
+        if len(converted) < width:
+            converted = tuple(converted) + (None,) * (width - len(converted))
+        if on_row is not None:
+            on_row(row, original, converted)
+
+        if row == 1:
+            for col in range(1, width + 1):
+                original_header = original[col - 1]
+                converted_header = converted[col - 1]
+                if start_col <= col <= end_col:
+                    result.headers_checked += 1
+                    if original_header == converted_header:
+                        result.headers_preserved += 1
+                if original_header != converted_header:
+                    result.header_mismatches.append((col, original_header, converted_header))
+                    result.record_issue(_issue(row, col, 'header_mismatch', original_header,
+                                               converted_header, original_header), on_error)
+            continue
+
+        # Columns outside the target range must be identical
+        for col in range(1, width + 1):
+            if start_col <= col <= end_col:
+                continue
+            result.outside_cells += 1
+            if original[col - 1] != converted[col - 1]:
+                result.outside_range_errors += 1
+                result.record_issue(_issue(row, col, 'outside_range_changed', original[col - 1],
+                                           converted[col - 1], original[col - 1]), on_error)
+
+        if row < start_row:
+            continue
+
+        keep_sample = row < start_row + SAMPLE_ROWS
+        for col in range(start_col, end_col + 1):
+            original_value = original[col - 1] if col <= width else None
+            converted_value = converted[col - 1] if col <= width else None
+            status = check_cell(result, row, col, original_value, converted_value, on_error)
+            if keep_sample and col < start_col + SAMPLE_COLS:
+                result.sample_cells.append((row, col, original_value, converted_value, status))
+
+    return result
+
+def target_columns(file_path, columns=None):
+    """
+    Resolve a target column spec into (start_col, end_col) for a workbook or CSV file.
+
+    Workbooks take column letters (default D:AA); CSV files also take header
+    names and default to their category columns (see csv_target_columns).
+    """
+    if is_csv_path(file_path):
+        return csv_target_columns(read_csv_header(file_path), columns)
+    return parse_columns(columns or DEFAULT_COLUMNS)
+
+def _csv_sheet_rows(file_path, sheet_names, min_row=1, max_row=None):
+    """
+    Row iterators for a CSV source and its converted copy (<name>_Numbers.csv).
+
+    The first sheet name stands for the source file and the second for the
+    converted one; a file that does not exist is left out like a missing sheet.
+    """
+    paths = [file_path, default_streaming_output(file_path)]
+    return {name: islice(iter_csv_rows(path), min_row - 1, max_row)
+            for name, path in zip(sheet_names, paths) if os.path.exists(path)}
+
+def open_sheet_rows(file_path, sheet_names, backend="cache", cache_dir=None, min_row=1, max_row=None,
+                    trimmed=None, last_row=None):
+    """
+    Open row iterators (values only) for the requested sheets.
+
+    Args:
+        file_path: Workbook to read
+        sheet_names: Names of the sheets wanted
+        backend: "cache" reads the columnar snapshot from sheet_cache (building
+            it when missing or stale); "xlsx" streams the sheet XML with the
+            direct value reader; "openpyxl" uses openpyxl's read-only mode.
+            A .csv file_path is always read as CSV: the first sheet name gets
+            the file itself, the second its converted copy <name>_Numbers.csv
+        cache_dir: Cache root for the "cache" backend
+        min_row: First row to return (1-based)
+        max_row: Last row to return (None = to the end of each sheet)
+        trimmed: Optional dict; with the cache backend, rows after the last
+            one holding a value in any of the sheets are left out and added
+            to trimmed['rows'] (the other backends leave this to scan_rows)
+        last_row: Last row holding a value in any of the sheets, when the
+            caller already knows it (the cache backend then skips its scan)
+
+    Returns:
+        (rows, close) where rows maps each existing sheet name to a row
+        iterator and close releases the underlying file
+    """
+    if is_csv_path(file_path):
+        return _csv_sheet_rows(file_path, sheet_names, min_row, max_row), lambda: None
+
+    if backend == "cache":
+        try:
+            from sheet_cache import open_cached_sheets
+            snapshots = open_cached_sheets(file_path, sheet_names, cache_dir=cache_dir)
+            if trimmed is not None:
+                # Every sheet stops at the same row so they stay in step
+                if last_row is None:
+                    last_row = max((snapshot.extent()[0] for snapshot in snapshots.values()), default=0)
+                end = max((snapshot.rows for snapshot in snapshots.values()), default=0)
+                if max_row is not None:
+                    end = min(end, max_row)
+                max_row = min(end, last_row)
+                trimmed['rows'] = trimmed.get('rows', 0) + max(0, end - max(max_row, min_row - 1))
+            return {name: snapshot.iter_rows(min_row, max_row) for name, snapshot in snapshots.items()}, lambda: None
+        except OSError as e:
+            print(f"Sheet cache unavailable ({e}), reading the workbook directly...")
+            backend = "xlsx"
+
+    if backend == "xlsx":
+        from xlsx_reader import XlsxValueReader
+        reader = XlsxValueReader(file_path)
+        rows = {name: reader.iter_rows(name, min_row, max_row) for name in sheet_names if name in reader.sheetnames}
+        return rows, reader.close
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True)
+    rows = {name: workbook[name].iter_rows(min_row=min_row, max_row=max_row, values_only=True)
+            for name in sheet_names if name in workbook.sheetnames}
+    return rows, workbook.close
+
+def run_validation(file_path=DEFAULT_FILE_PATH, start_col=4, end_col=27, start_row=2,
+                   on_error=None, max_error_samples=100,
+                   original_name="RawData", converted_name="RawData_Numbers",
+                   backend="cache", cache_dir=None, metrics=None, on_row=None):
+    """
+    Read both sheets once and validate them in a single pass.
+
+    Blank rows after the last row holding a value are not checked; the
+    target cells they would have added are reported as trimmed_cells.
+
+    Args:
+        file_path: Workbook holding both sheets
+        start_col: First converted column (4 = D)
+        end_col: Last converted column (27 = AA)
+        start_row: First data row (row 1 holds the headers)
+        on_error: Optional callable receiving each issue record as it is found
+        max_error_samples: How many issue records to keep on the result (None = all)
+        original_name: Name of the source sheet
+        converted_name: Name of the converted sheet
+        backend: "cache" (columnar snapshot, default), "xlsx" (direct XML reader) or "openpyxl"
+        cache_dir: Cache root for the "cache" backend
+        metrics: Optional Metrics; gets the load and validate phases and the
+            cells_read, missing_tokens, errors and warnings counters
+        on_row: Optional callable fed every row pair as it is scanned (see scan_rows)
+
+    Returns:
+        ValidationResult (missing_sheets is non-empty when a sheet is absent)
+    """
+    result = ValidationResult(start_col, end_col, start_row, max_error_samples)
+    timed = metrics.phase if metrics is not None else (lambda name: contextlib.nullcontext())
+
+    sheet_names = (original_name, converted_name)
+    trimmed = {'rows': 0}
+    with timed("load"):
+        rows, close = open_sheet_rows(file_path, sheet_names, backend, cache_dir, trimmed=trimmed)
+    try:
+        for name in sheet_names:
+            if name not in rows:
+                result.missing_sheets.append(name)
+        if result.missing_sheets:
+            return result
+
+        with timed("validate"):
+            scan_rows(result, rows[original_name], rows[converted_name], on_error=on_error, trimmed=trimmed,
+                      on_row=on_row)
+        result.trimmed_cells = trimmed['rows'] * (end_col - start_col + 1)
+    finally:
+        close()
+
+    _count_metrics(metrics, result)
+    return result
+
+def _count_metrics(metrics, result):
+    if metrics is not None:
+        metrics.count('cells_read', result.total_cells + result.outside_cells)
+        metrics.count('missing_tokens', sum(result.missing_data_indicators.values()))
+        metrics.count('errors', result.total_errors)
+        metrics.count('warnings', result.float_warnings)
+        metrics.count('cells_trimmed', result.trimmed_cells)
+
+def sheet_row_counts(file_path, sheet_names, backend="cache", cache_dir=None):
+    """
+    Return the number of rows of each existing sheet without reading its cells.
+
+    The cache backend takes the last row holding a value from the snapshot
+    (building it if needed), the others the sheet's declared dimension.
+
+    Returns:
+        dict: {sheet name: row count, or None when the sheet declares no
+        dimension or is a CSV file}
+    """
+    if is_csv_path(file_path):
+        return {name: None for name in _csv_sheet_rows(file_path, sheet_names)}
+
+    if backend == "cache":
+        try:
+            from sheet_cache import open_cached_sheets
+            snapshots = open_cached_sheets(file_path, sheet_names, cache_dir=cache_dir)
+            return {name: snapshot.extent()[0] for name, snapshot in snapshots.items()}
+        except OSError as e:
+            print(f"Sheet cache unavailable ({e}), reading the workbook directly...")
+
+    from xlsx_reader import XlsxValueReader
+    with XlsxValueReader(file_path) as reader:
+        counts = {}
+        for name in sheet_names:
+            if name in reader.sheetnames:
+                dimension = reader.dimension(name)
+                counts[name] = dimension[3] if dimension else None
+        return counts
+
+def _validate_shard(file_path, min_row, max_row, start_col, end_col, start_row, max_error_samples,
+                    sheet_names, backend, cache_dir, trim=True, issue_path=None, last_row=None):
+    """
+    Worker body: validate rows min_row..max_row of both sheets.
+
+    last_row is passed on to open_sheet_rows, so workers do not each
+    repeat the extent scan the parent already made.
+
+    With issue_path every issue is also pickled to that file as it is
+    found, for the parent to replay (see _replay_issues).
+
+    Returns:
+        (ValidationResult, blank rows skipped at the end of the range)
+    """
+    result = ValidationResult(start_col, end_col, start_row, max_error_samples)
+    trimmed = {'rows': 0} if trim else None
+    rows, close = open_sheet_rows(file_path, sheet_names, backend, cache_dir, min_row, max_row, trimmed,
+                                  last_row)
+    issues = open(issue_path, "wb") if issue_path is not None else None
+    try:
+        on_error = (lambda issue: pickle.dump(issue, issues, pickle.HIGHEST_PROTOCOL)) if issues else None
+        scan_rows(result, rows[sheet_names[0]], rows[sheet_names[1]], first_row=min_row, on_error=on_error,
+                  trimmed=trimmed)
+    finally:
+        if issues is not None:
+            issues.close()
+        close()
+    return result, trimmed['rows'] if trim else 0
+
+def _replay_issues(issue_path, on_error):
+    """Pass the issues a shard pickled to issue_path to on_error, in the order they were found."""
+    with open(issue_path, "rb") as handle:
+        while True:
+            try:
+                issue = pickle.load(handle)
+            except EOFError:
+                break
+            on_error(issue)
+
+def run_validation_sharded(file_path=DEFAULT_FILE_PATH, workers=None, start_col=4, end_col=27, start_row=2,
+                           on_error=None, max_error_samples=100,
+                           original_name="RawData", converted_name="RawData_Numbers",
+                           backend="cache", cache_dir=None, metrics=None):
+    """
+    Validate both sheets with row ranges spread over worker processes.
+
+    Rows 1..N are cut into one contiguous range per worker; each worker opens
+    the workbook itself, validates its range with scan_rows and sends its
+    ValidationResult back. The partial results are merged in row order, so
+    counters, histograms, samples and the first max_error_samples issues are
+    identical to run_validation's. With on_error every worker streams its
+    issues to its own temporary file, and the parent replays the files in row
+    order once every shard has finished, so memory and the results sent back
+    stay the same size however many issues there are.
+
+    With the cache backend every worker reads its rows straight from the
+    memory-mapped snapshot. The xlsx and openpyxl backends have no random
+    access, so each worker still parses (without decoding) the rows before
+    its range; they fall back to one serial pass when a sheet declares no
+    dimension.
+
+    Every worker skips the blank rows at the end of its range. When a later
+    range turns out to hold data, the skipped rows are checked after all,
+    so only the blank tail of the whole sheet goes uncounted.
+
+    Args:
+        file_path: Workbook holding both sheets
+        workers: Number of worker processes (default: number of CPU cores)
+        (other arguments as for run_validation)
+
+    Returns:
+        ValidationResult
+    """
+    workers = workers or os.cpu_count() or 1
+    sheet_names = (original_name, converted_name)
+    timed = metrics.phase if metrics is not None else (lambda name: contextlib.nullcontext())
+
+    with timed("load"):
+        counts = sheet_row_counts(file_path, sheet_names, backend, cache_dir)
+    missing = [name for name in sheet_names if name not in counts]
+    if missing or workers == 1 or None in counts.values() or not any(counts.values()):
+        if not missing and workers > 1:
+            print("Row counts unknown, validating in a single pass...")
+        return run_validation(file_path, start_col, end_col, start_row, on_error, max_error_samples,
+                              original_name, converted_name, backend, cache_dir, metrics)
+
+    total_rows = max(counts.values())
+    # With the cache backend the counts are already the last rows holding a value
+    last_row = total_rows if backend == "cache" else None
+    workers = max(1, min(workers, total_rows))
+    step = -(-total_rows // workers)
+    ranges = [(first, first + step - 1) for first in range(1, total_rows + 1, step)]
+    # The last range stays open in case a sheet holds rows past its declared dimension
+    ranges[-1] = (ranges[-1][0], None)
+
+    issue_dir = tempfile.mkdtemp(prefix="kcet_issues_") if on_error is not None else None
+
+    def issue_path(first):
+        return os.path.join(issue_dir, f"{first}.pkl") if issue_dir else None
+
+    try:
+        with timed("validate"):
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(_validate_shard, file_path, first, last, start_col, end_col,
+                                           start_row, max_error_samples, sheet_names, backend, cache_dir,
+                                           issue_path=issue_path(first), last_row=last_row)
+                           for first, last in ranges]
+                partials = [future.result() for future in futures]
+
+        result = ValidationResult(start_col, end_col, start_row, max_error_samples)
+        blank_runs = []  # (first row, row count) skipped by the shards so far
+        for (first, _), (partial, trimmed_rows) in zip(ranges, partials):
+            if blank_runs and (partial.original_rows or partial.converted_rows):
+                # Data follows, so the skipped rows are inside the sheet after all
+                for run_first, run_rows in blank_runs:
+                    result.merge(_validate_shard(file_path, run_first, run_first + run_rows - 1, start_col,
+                                                 end_col, start_row, max_error_samples, sheet_names, backend,
+                                                 cache_dir, trim=False, issue_path=issue_path(run_first))[0])
+                    if on_error is not None:
+                        _replay_issues(issue_path(run_first), on_error)
+                blank_runs = []
+            result.merge(partial)
+            if on_error is not None:
+                _replay_issues(issue_path(first), on_error)
+            if trimmed_rows:
+                blank_runs.append((max(partial.original_rows, partial.converted_rows, first - 1) + 1, trimmed_rows))
+        result.trimmed_cells = sum(rows for _, rows in blank_runs) * (end_col - start_col + 1)
+    finally:
+        if issue_dir is not None:
+            shutil.rmtree(issue_dir, ignore_errors=True)
+
+    _count_metrics(metrics, result)
+    return result
+
+def wilson_interval(errors, trials, confidence=CONFIDENCE_LEVEL):
+    """
+    Wilson score interval for an error rate of errors out of trials.
+
+    Unlike the plain p +/- z*sqrt(p(1-p)/n) interval it stays inside [0, 1]
+    and gives a useful upper bound when no error was seen at all.
+
+    Returns:
+        (low, high) as fractions; (0.0, 1.0) when nothing was checked
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = errors / trials
+    spread = z * z / trials
+    centre = (rate + spread / 2) / (1 + spread)
+    margin = z * math.sqrt(rate * (1 - rate) / trials + spread / (4 * trials)) / (1 + spread)
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def stratified_rows(first_row, last_row, sample_rows=QUICK_SAMPLE_ROWS, bands=QUICK_BANDS, seed=0):
+    """
+    Draw a seeded sample of row numbers spread over the whole sheet.
+
+    first_row..last_row is cut into equal row bands and the same number of
+    rows is drawn at random from each band, so the top, middle and bottom of
+    the sheet are all represented whatever order the data is in.
+
+    Returns:
+        list of (band, row) sorted by row (every row when the sheet is smaller than the sample)
+    """
+    total = last_row - first_row + 1
+    if total <= 0:
+        return []
+    rng = random.Random(seed)
+    bands = max(1, min(bands, total))
+    per_band = -(-sample_rows // bands)
+    picked = []
+    for band in range(bands):
+        low = first_row + band * total // bands
+        high = first_row + (band + 1) * total // bands
+        picked.extend((band, row) for row in rng.sample(range(low, high), min(per_band, high - low)))
+    picked.sort(key=lambda item: item[1])
+    return picked
+
+def _reservoir_rows(original_rows, converted_rows, first_row, sample_rows, seed):
+    """
+    Keep a uniform sample of row pairs from one pass when the row count is unknown.
+
+    Returns:
+        (sampled (row, original, converted) sorted by row, header pair or None,
+        original row count, converted row count)
+    """
+    rng = random.Random(seed)
+    reservoir = []
+    header = None
+    original_count = converted_count = 0
+    seen = 0
+    for row, (original, converted) in enumerate(zip_longest(original_rows, converted_rows), start=1):
+        if original is not None:
+            original_count = row
+        if converted is not None:
+            converted_count = row
+        if original is None or converted is None:
+            continue
+        if row == 1:
+            header = (1, original, converted)
+        if row < first_row:
+            continue
+        # Algorithm R: row number seen replaces a random kept row with probability sample_rows / seen
+        seen += 1
+        if len(reservoir) < sample_rows:
+            reservoir.append((row, original, converted))
+        else:
+            slot = rng.randrange(seen)
+            if slot < sample_rows:
+                reservoir[slot] = (row, original, converted)
+    reservoir.sort(key=lambda item: item[0])
+    return reservoir, header, original_count, converted_count
+
+class QuickCheckResult:
+    """
+    Outcome of run_quick_check.
+
+    validation is a ValidationResult over the header row and the sampled
+    rows only. Every sampled target cell is tallied per column and per row
+    band, and error counts are turned into rate estimates with Wilson
+    bounds. A target cell counts as an error when it has an error-severity
+    issue (float-type warnings do not count).
+    """
+
+    def __init__(self, validation, bands, seed):
+        self.validation = validation
+        self.bands = bands
+        self.seed = seed
+        self.total_rows = 0
+        self.sampled_rows = 0
+        self.stratified = True
+        self.band_ranges = []  # (first row, last row) of every band
+        self.column_cells = defaultdict(int)
+        self.column_errors = defaultdict(int)
+        self.band_cells = defaultdict(int)
+        self.band_errors = defaultdict(int)
+
+    @property
+    def checked_cells(self):
+        return sum(self.column_cells.values())
+
+    @property
+    def error_cells(self):
+        return sum(self.column_errors.values())
+
+    @property
+    def exhaustive(self):
+        """True when every data row was checked, so the rates are exact."""
+        return self.sampled_rows >= self.total_rows - self.validation.start_row + 1
+
+    def estimate(self, errors, cells):
+        """
+        Returns:
+            (rate, low, high) for errors out of cells, as fractions
+        """
+        low, high = wilson_interval(errors, cells)
+        return (errors / cells if cells else 0.0), low, high
+
+    def band_of(self, row):
+        """Index of the band holding row."""
+        for band, (first, last) in enumerate(self.band_ranges):
+            if first <= row <= last:
+                return band
+        return len(self.band_ranges) - 1
+
+def run_quick_check(file_path=DEFAULT_FILE_PATH, sample_rows=QUICK_SAMPLE_ROWS, bands=QUICK_BANDS, seed=0,
+                    start_col=4, end_col=27, start_row=2, max_error_samples=100,
+                    original_name="RawData", converted_name="RawData_Numbers",
+                    backend="cache", cache_dir=None, metrics=None):
+    """
+    Validate a seeded, stratified sample of rows instead of the whole sheet.
+
+    The header row and sample_rows data rows drawn with stratified_rows go
+    through the same scan_rows checks as a full validation. With the cache
+    backend the sampled rows are read straight from the memory-mapped
+    snapshot, so a warm cache answers in well under a second whatever the
+    sheet size. The xlsx and openpyxl backends stream the sheets up to the
+    last sampled row; when a sheet declares no dimension they fall back to
+    reservoir sampling over one full pass (uniform, but not stratified).
+
+    Args:
+        file_path: Workbook holding both sheets
+        sample_rows: Number of data rows to check
+        bands: Number of row bands the sample is spread over
+        seed: Random seed; the same seed checks the same rows
+        (other arguments as for run_validation)
+
+    Returns:
+        QuickCheckResult (validation.missing_sheets is non-empty when a sheet is absent)
+    """
+    sheet_names = (original_name, converted_name)
+    result = QuickCheckResult(ValidationResult(start_col, end_col, start_row, max_error_samples), bands, seed)
+    validation = result.validation
+    timed = metrics.phase if metrics is not None else (lambda name: contextlib.nullcontext())
+
+    snapshots = None
+    with timed("load"):
+        if backend == "cache" and not is_csv_path(file_path):
+            try:
+                from sheet_cache import open_cached_sheets
+                snapshots = open_cached_sheets(file_path, sheet_names, cache_dir=cache_dir)
+                # Sample only up to the last row holding a value
+                counts = {name: snapshot.extent()[0] for name, snapshot in snapshots.items()}
+            except OSError as e:
+                print(f"Sheet cache unavailable ({e}), reading the workbook directly...")
+                backend = "xlsx"
+        if snapshots is None:
+            counts = sheet_row_counts(file_path, sheet_names, backend)
+
+    validation.missing_sheets = [name for name in sheet_names if name not in counts]
+    if validation.missing_sheets:
+        return result
+
+    with timed("validate"):
+        if None in counts.values():
+            rows, close = open_sheet_rows(file_path, sheet_names, backend, cache_dir)
+            try:
+                sampled, header, original_count, converted_count = _reservoir_rows(
+                    rows[original_name], rows[converted_name], start_row, sample_rows, seed)
+            finally:
+                close()
+            counts = {original_name: original_count, converted_name: converted_count}
+            result.stratified = False
+        else:
+            # Rows present in only one sheet are a dimension mismatch, not something to sample
+            picked = stratified_rows(start_row, min(counts.values()), sample_rows, bands, seed)
+            wanted = [1] + [row for _, row in picked]
+            if snapshots is not None:
+                sampled = list(zip(wanted, snapshots[original_name].take_rows(wanted),
+                                   snapshots[converted_name].take_rows(wanted)))
+            else:
+                sampled = []
+                wanted_set = set(wanted)
+                rows, close = open_sheet_rows(file_path, sheet_names, backend, cache_dir, max_row=wanted[-1])
+                try:
+                    for row, pair in enumerate(zip(rows[original_name], rows[converted_name]), start=1):
+                        if row in wanted_set:
+                            sampled.append((row,) + pair)
+                finally:
+                    close()
+            header = sampled.pop(0) if sampled and sampled[0][0] == 1 else None
+
+        result.total_rows = max(counts.values())
+        data_rows = min(counts.values()) - start_row + 1
+        band_count = max(1, min(bands, data_rows))
+        result.band_ranges = [(start_row + band * data_rows // band_count,
+                               start_row + (band + 1) * data_rows // band_count - 1)
+                              for band in range(band_count)]
+
+        def tally(issue):
+            col = issue['column']
+            if issue['severity'] == "error" and issue['row'] >= start_row and start_col <= col <= end_col:
+                result.column_errors[col] += 1
+                result.band_errors[result.band_of(issue['row'])] += 1
+
+        if header is not None:
+            scan_rows(validation, [header[1]], [header[2]], first_row=1)
+        for row, original, converted in sampled:
+            scan_rows(validation, [original], [converted], first_row=row, on_error=tally)
+            for col in range(start_col, end_col + 1):
+                result.column_cells[col] += 1
+            result.band_cells[result.band_of(row)] += end_col - start_col + 1
+        result.sampled_rows = len(sampled)
+
+    validation.original_rows = counts[original_name]
+    validation.converted_rows = counts[converted_name]
+    _count_metrics(metrics, validation)
+    return result
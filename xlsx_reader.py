@@ -0,0 +1,371 @@
+import functools
+import posixpath
+import re
+import sys
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_TAG = MAIN_NS + "row"
+CELL_TAG = MAIN_NS + "c"
+VALUE_TAG = MAIN_NS + "v"
+INLINE_TAG = MAIN_NS + "is"
+TEXT_TAG = MAIN_NS + "t"
+RUN_TAG = MAIN_NS + "r"
+STRING_ITEM_TAG = MAIN_NS + "si"
+DIMENSION_TAG = MAIN_NS + "dimension"
+SHEET_DATA_TAG = MAIN_NS + "sheetData"
+
+# Highest column openpyxl accepts (ZZZ)
+MAX_COLUMN = 18278
+
+CELL_REFERENCE = re.compile(r"\$?([A-Za-z]{1,3})?\$?(\d+)?")
+
+@functools.lru_cache(maxsize=None)
+def column_index(letters):
+    """Turn column letters into a 1-based index ("AA" -> 27), like openpyxl's column_index_from_string."""
+    index = 0
+    for letter in letters.upper():
+        if not "A" <= letter <= "Z":
+            index = 0
+            break
+        index = index * 26 + ord(letter) - 64
+    if not 1 <= index <= MAX_COLUMN or len(letters) > 3:
+        raise ValueError(f"{letters} is not a valid column name")
+    return index
+
+@functools.lru_cache(maxsize=None)
+def column_letter(index):
+    """Turn a 1-based column index into letters (27 -> "AA"), like openpyxl's get_column_letter."""
+    if not 1 <= index <= MAX_COLUMN:
+        raise ValueError(f"Invalid column index {index}")
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def range_bounds(reference):
+    """
+    Return (min_col, min_row, max_col, max_row) of a range such as "A1:AB200", like openpyxl's range_boundaries.
+
+    A single cell ("B2") gives the same corner twice; parts left out ("A:C") are None.
+    """
+    bounds = []
+    for part in reference.split(":"):
+        match = CELL_REFERENCE.fullmatch(part)
+        if match is None or not part:
+            raise ValueError(f"{reference} is not a valid range")
+        letters, digits = match.groups()
+        bounds.append((column_index(letters) if letters else None, int(digits) if digits else None))
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+    if len(bounds) != 2:
+        raise ValueError(f"{reference} is not a valid range")
+    (min_col, min_row), (max_col, max_row) = bounds
+    return min_col, min_row, max_col, max_row
+
+def _number(text):
+    """Cast a numeric cell the way openpyxl does (int unless it has a point or exponent)."""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+def _text_content(element):
+    """Plain text of an <si> or <is> element: <t> plus the <t> of every rich-text run."""
+    snippets = []
+    for child in element:
+        if child.tag == TEXT_TAG:
+            snippets.append(child.text or "")
+        elif child.tag == RUN_TAG:
+            text = child.find(TEXT_TAG)
+            if text is not None and text.text is not None:
+                snippets.append(text.text)
+    return "".join(snippets)
+
+class XlsxValueReader:
+    """
+    Value-only reader for .xlsx files that skips openpyxl's object model.
+
+    The archive is opened with zipfile and each sheet's XML is streamed with
+    iterparse, so no Cell objects, styles or whole-sheet trees are built.
+    Rows come back like openpyxl's read-only iter_rows(values_only=True):
+    padded to the sheet's declared dimension, with gaps filled by empty rows.
+
+    Cell values: shared and inline strings become str, numbers int or float,
+    booleans bool, errors their code ("#N/A"). Formulas give their cached
+    value (as with data_only=True), and date-formatted numbers stay as their
+    serial number, since styles are never read.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.archive = zipfile.ZipFile(file_path)
+        self._shared_strings = None
+        self._sheet_parts, self._shared_strings_part = self._read_workbook()
+
+    @property
+    def sheetnames(self):
+        return list(self._sheet_parts)
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_workbook(self):
+        """Map sheet names to their XML part through workbook.xml and its relationships."""
+        targets = {}
+        shared_strings_part = None
+        with self.archive.open("xl/_rels/workbook.xml.rels") as source:
+            for _, element in iterparse(source):
+                if element.tag == PACKAGE_REL_NS + "Relationship":
+                    target = element.get("Target")
+                    # Targets are relative to xl/ unless they start at the package root
+                    part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(
+                        posixpath.join("xl", target))
+                    targets[element.get("Id")] = part
+                    if element.get("Type", "").endswith("/sharedStrings"):
+                        shared_strings_part = part
+
+        sheet_parts = {}
+        with self.archive.open("xl/workbook.xml") as source:
+            for _, element in iterparse(source):
+                if element.tag == MAIN_NS + "sheet":
+                    sheet_parts[element.get("name")] = targets[element.get(REL_NS + "id")]
+        return sheet_parts, shared_strings_part
+
+    @property
+    def shared_strings(self):
+        """The shared string table, streamed from sharedStrings.xml on first use."""
+        if self._shared_strings is None:
+            strings = []
+            if self._shared_strings_part and self._shared_strings_part in self.archive.namelist():
+                with self.archive.open(self._shared_strings_part) as source:
+                    for _, element in iterparse(source):
+                        if element.tag == STRING_ITEM_TAG:
+                            # openpyxl drops the escape Excel puts in front of literal "_x...._"
+                            strings.append(_text_content(element).replace("x005F_", ""))
+                            element.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    def _cell_value(self, cell):
+        """Value of one <c> element."""
+        data_type = cell.get("t", "n")
+        if data_type == "inlineStr":
+            inline = cell.find(INLINE_TAG)
+            return None if inline is None else _text_content(inline)
+
+        text = None
+        for child in cell:
+            if child.tag == VALUE_TAG:
+                text = child.text
+                break
+        if not text:
+            return None
+        if data_type == "n":
+            return _number(text)
+        if data_type == "s":
+            return self.shared_strings[int(text)]
+        if data_type == "b":
+            return bool(int(text))
+        # "str" (formula string), "e" (error) and "d" (ISO date) stay as text
+        return text
+
+    def dimension(self, sheet_name):
+        """
+        Return the sheet's declared (min_col, min_row, max_col, max_row), or None.
+
+        Only the start of the sheet XML is read.
+        """
+        rows = self._parse_rows(sheet_name)
+        try:
+            return next(rows)[1]
+        finally:
+            rows.close()
+
+    def extent(self, sheet_name, min_col=1, max_col=None):
+        """
+        Return (last_row, last_col) of the cells that hold a value.
+
+        Empty cells and cells holding "" do not count, so rows and columns
+        that only carry formatting (which inflate the declared dimension)
+        are ignored. last_row looks at every column, last_col only at
+        min_col..max_col; either is 0 when nothing is found.
+        """
+        last_row = last_col = 0
+        rows = self._parse_rows(sheet_name)
+        next(rows)
+        for number, cells in rows:
+            for column, value in cells:
+                if value is None or value == "":
+                    continue
+                last_row = number
+                if column > last_col and column >= min_col and (max_col is None or column <= max_col):
+                    last_col = column
+        return last_row, last_col
+
+    def _parse_rows(self, sheet_name, min_row=1):
+        """
+        Yield (row number, [(column, value), ...]) for every <row> of a sheet.
+
+        The first item is (0, dimension boundaries or None). Rows before
+        min_row are skipped without decoding their cells.
+        """
+        if sheet_name not in self._sheet_parts:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+        column_cache = {}
+        cell_value = self._cell_value
+        with self.archive.open(self._sheet_parts[sheet_name]) as source:
+            dimension_seen = False
+            sheet_data = None
+            row_number = 0
+            for event, element in iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if element.tag == SHEET_DATA_TAG:
+                        sheet_data = element
+                        if not dimension_seen:
+                            dimension_seen = True
+                            yield 0, None
+                    continue
+
+                tag = element.tag
+                if tag == ROW_TAG:
+                    number = element.get("r")
+                    row_number = int(float(number)) if number else row_number + 1
+                    if row_number < min_row:
+                        sheet_data.clear()
+                        continue
+                    cells = []
+                    column = 0
+                    for cell in element:
+                        if cell.tag != CELL_TAG:
+                            continue
+                        reference = cell.get("r")
+                        if reference:
+                            letters = reference.rstrip("0123456789")
+                            column = column_cache.get(letters)
+                            if column is None:
+                                column = column_cache[letters] = column_index(letters)
+                        else:
+                            column += 1
+                        cells.append((column, cell_value(cell)))
+                    yield row_number, cells
+                    sheet_data.clear()
+                elif tag == DIMENSION_TAG and not dimension_seen:
+                    dimension_seen = True
+                    try:
+                        boundaries = range_bounds(element.get("ref"))
+                    except (TypeError, ValueError):
+                        boundaries = None
+                    yield 0, boundaries
+
+            if not dimension_seen:
+                yield 0, None
+
+    def iter_rows(self, sheet_name, min_row=1, max_row=None, min_col=1, max_col=None):
+        """
+        Yield value tuples for a sheet, like openpyxl's read-only iter_rows(values_only=True).
+
+        Args:
+            sheet_name: Worksheet to read
+            min_row: First row to yield (1-based)
+            max_row: Last row to yield (default: the sheet's declared last row)
+            min_col: First column of each tuple (e.g. 4 for D)
+            max_col: Last column of each tuple (default: the sheet's declared
+                last column, or each row's last cell when none is declared)
+        """
+        rows = self._parse_rows(sheet_name, min_row)
+        _, dimension = next(rows)
+        if dimension is not None:
+            max_col = max_col or dimension[2]
+            max_row = max_row or dimension[3]
+        empty_row = (None,) * (max_col + 1 - min_col) if max_col is not None else ()
+
+        expected = min_row
+        last = 0
+        for number, cells in rows:
+            last = number
+            if max_row is not None and number > max_row:
+                break
+            if number < expected:
+                continue
+            # Rows absent from the XML come back empty
+            for _ in range(expected, number):
+                yield empty_row
+            expected = number + 1
+
+            if not cells and max_col is None:
+                yield ()
+                continue
+            width_col = max_col or cells[-1][0]
+            values = [None] * (width_col + 1 - min_col)
+            for column, value in cells:
+                if min_col <= column <= width_col:
+                    values[column - min_col] = value
+            yield tuple(values)
+
+        # Like openpyxl, trailing empty rows are only filled in up to a break
+        if max_row is not None and max_row < last:
+            for _ in range(expected, max_row + 1):
+                yield empty_row
+
+    def iter_cells(self, sheet_name, min_row=1, max_row=None, min_col=1, max_col=None):
+        """
+        Yield (row, column, value) for every non-empty cell in a range.
+
+        Args:
+            sheet_name: Worksheet to read
+            min_row, max_row: Row range (1-based, max_row None = to the end)
+            min_col, max_col: Column range (1-based, max_col None = every column)
+        """
+        rows = self._parse_rows(sheet_name, min_row)
+        next(rows)
+        for number, cells in rows:
+            if number < min_row:
+                continue
+            if max_row is not None and number > max_row:
+                break
+            for column, value in cells:
+                if value is not None and column >= min_col and (max_col is None or column <= max_col):
+                    yield number, column, value
+
+def parse_columns(spec):
+    """Turn "D:AA" (or "D") into a (min_col, max_col) pair."""
+    first, _, last = spec.partition(":")
+    return column_index(first.strip()), column_index((last or first).strip())
+
+if __name__ == "__main__":
+    # Usage: python xlsx_reader.py workbook [sheet] [columns, e.g. D:AA]
+    # Times the direct reader against openpyxl's read-only mode and checks they agree
+    from openpyxl import load_workbook
+
+    workbook_path = sys.argv[1]
+    sheet = sys.argv[2] if len(sys.argv) > 2 else "RawData"
+    first_col, last_col = parse_columns(sys.argv[3]) if len(sys.argv) > 3 else (1, None)
+
+    started = time.perf_counter()
+    with XlsxValueReader(workbook_path) as reader:
+        direct_rows = list(reader.iter_rows(sheet, min_col=first_col, max_col=last_col))
+    direct_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    workbook = load_workbook(workbook_path, read_only=True)
+    openpyxl_rows = list(workbook[sheet].iter_rows(min_col=first_col, max_col=last_col, values_only=True))
+    workbook.close()
+    openpyxl_seconds = time.perf_counter() - started
+
+    print(f"Rows: {len(direct_rows)}")
+    print(f"Direct reader: {direct_seconds:.2f}s, openpyxl read-only: {openpyxl_seconds:.2f}s "
+          f"({openpyxl_seconds / direct_seconds if direct_seconds else 0:.1f}x)")
+    print("✅ Values identical" if direct_rows == openpyxl_rows else "❌ Values differ")